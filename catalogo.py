@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Registro de Lecturas - catalogo.py
+
+Autor: Sebastian Sanchez Bentolila
+Email: sebastiansb3004@gmail.com
+Versión: 1.0.0
+Última modificación: 29/07/2025
+Licencia: MIT
+Copyright: © 2025 - Todos los derechos reservados
+
+Descripción:
+- Interfaz de proveedores de metadatos de libros por ISBN
+- Catálogo local sin conexión en un archivo SQLite aparte (importable desde
+  un volcado de ediciones de Open Library o un CSV)
+- Completado de datos por ISBN, individual o en lotes con hilos acotados
+
+
+Dependencias:
+- Python 3.13.3
+- Módulos estándar: csv, gzip, json, os, sqlite3, threading, concurrent.futures, typing
+"""
+
+import csv
+import gzip
+import json
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from modelo import normalizar_isbn
+
+# Campos que un proveedor puede aportar
+CAMPOS_METADATOS = ('titulo', 'autor', 'editorial', 'paginas', 'genero')
+
+class ProveedorMetadatos:
+    """Fuente de metadatos de libros por ISBN.
+
+    Los proveedores reciben ISBN-13 normalizados y retornan diccionarios con
+    algunos de CAMPOS_METADATOS. Basta con implementar buscar_varios.
+    """
+
+    nombre = 'proveedor'
+
+    def buscar(self, isbn: str) -> Optional[Dict]:
+        """Retorna los metadatos de un ISBN, o None si no se conoce"""
+        return self.buscar_varios([isbn]).get(isbn)
+
+    def buscar_varios(self, isbns: List[str]) -> Dict[str, Dict]:
+        """Retorna los metadatos conocidos de varios ISBN, por ISBN"""
+        raise NotImplementedError
+
+class CatalogoLocal(ProveedorMetadatos):
+    """Catálogo sin conexión guardado en su propio archivo SQLite.
+
+    La tabla está ordenada por ISBN (WITHOUT ROWID), así una búsqueda es un
+    solo recorrido del árbol. Cada hilo usa su propia conexión de solo
+    lectura con el archivo mapeado en memoria.
+    """
+
+    nombre = 'catálogo local'
+    TAMANIO_LOTE = 500
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self._local = threading.local()
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        with sqlite3.connect(ruta) as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS catalogo (
+                    isbn TEXT PRIMARY KEY,
+                    titulo TEXT,
+                    autor TEXT,
+                    editorial TEXT,
+                    paginas INTEGER,
+                    genero TEXT
+                ) WITHOUT ROWID
+            ''')
+
+    def _conexion(self) -> sqlite3.Connection:
+        """Conexión de lectura del hilo actual (se abre una sola vez por hilo)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.ruta)
+            conn.execute('PRAGMA query_only = ON')
+            conn.execute('PRAGMA mmap_size = 268435456')
+            self._local.conn = conn
+        return conn
+
+    def buscar_varios(self, isbns: List[str]) -> Dict[str, Dict]:
+        """Retorna los metadatos de los ISBN presentes en el catálogo"""
+        conn = self._conexion()
+        resultado = {}
+        for inicio in range(0, len(isbns), self.TAMANIO_LOTE):
+            lote = isbns[inicio:inicio + self.TAMANIO_LOTE]
+            filas = conn.execute(
+                f"SELECT isbn, {', '.join(CAMPOS_METADATOS)} FROM catalogo "
+                f"WHERE isbn IN ({', '.join('?' * len(lote))})",
+                lote
+            )
+            for fila in filas:
+                resultado[fila[0]] = {
+                    campo: valor for campo, valor in zip(CAMPOS_METADATOS, fila[1:]) if valor
+                }
+        return resultado
+
+    def cantidad(self) -> int:
+        """Cantidad de ediciones en el catálogo"""
+        return self._conexion().execute('SELECT COUNT(*) FROM catalogo').fetchone()[0]
+
+    def importar(self, ruta: str, tamanio_lote: int = 10000,
+                 progreso: Optional[Callable[[int], None]] = None) -> int:
+        """Importa un volcado de ediciones de Open Library (.txt o .txt.gz) o un CSV.
+
+        El CSV debe tener encabezado con isbn y algunos de CAMPOS_METADATOS.
+        Retorna la cantidad de ediciones importadas.
+        """
+        abrir = gzip.open if ruta.endswith('.gz') else open
+        with abrir(ruta, 'rt', encoding='utf-8', newline='') as archivo:
+            primera = archivo.readline()
+            archivo.seek(0)
+            if '\t' in primera:
+                filas = self._leer_open_library(archivo)
+            else:
+                filas = self._leer_csv(archivo)
+            return self._guardar(filas, tamanio_lote, progreso)
+
+    @staticmethod
+    def _leer_open_library(archivo) -> Iterator[Tuple]:
+        """Filas del volcado de ediciones: tipo, clave, revisión, fecha y JSON"""
+        for linea in archivo:
+            partes = linea.rstrip('\n').split('\t')
+            if len(partes) < 5 or partes[0] != '/type/edition':
+                continue
+            try:
+                edicion = json.loads(partes[4])
+            except ValueError:
+                continue
+
+            titulo = edicion.get('title')
+            if edicion.get('subtitle'):
+                titulo = f"{titulo}: {edicion['subtitle']}"
+            datos = (
+                titulo,
+                edicion.get('by_statement'),
+                (edicion.get('publishers') or [None])[0],
+                edicion.get('number_of_pages'),
+                (edicion.get('subjects') or [None])[0]
+            )
+            for isbn in edicion.get('isbn_13', []) + edicion.get('isbn_10', []):
+                isbn = normalizar_isbn(isbn)
+                if isbn:
+                    yield (isbn,) + datos
+
+    @staticmethod
+    def _leer_csv(archivo) -> Iterator[Tuple]:
+        """Filas de un CSV con columnas isbn y CAMPOS_METADATOS"""
+        for fila in csv.DictReader(archivo):
+            isbn = normalizar_isbn(fila.get('isbn'))
+            if not isbn:
+                continue
+            paginas = fila.get('paginas')
+            yield (
+                isbn,
+                fila.get('titulo') or None,
+                fila.get('autor') or None,
+                fila.get('editorial') or None,
+                int(paginas) if paginas and paginas.isdigit() else None,
+                fila.get('genero') or None
+            )
+
+    def _guardar(self, filas: Iterable[Tuple], tamanio_lote: int,
+                 progreso: Optional[Callable[[int], None]]) -> int:
+        """Inserta las filas en lotes; una edición repetida completa la existente"""
+        query = f'''
+            INSERT INTO catalogo (isbn, {', '.join(CAMPOS_METADATOS)}) VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (isbn) DO UPDATE SET
+                {', '.join(f'{c} = COALESCE(excluded.{c}, {c})' for c in CAMPOS_METADATOS)}
+        '''
+        total = 0
+        lote: List[Tuple] = []
+        with sqlite3.connect(self.ruta) as conn:
+            conn.execute('PRAGMA journal_mode = WAL')
+            for fila in filas:
+                lote.append(fila)
+                if len(lote) >= tamanio_lote:
+                    conn.executemany(query, lote)
+                    conn.commit()
+                    total += len(lote)
+                    lote = []
+                    if progreso:
+                        progreso(total)
+            if lote:
+                conn.executemany(query, lote)
+                total += len(lote)
+        return total
+
+class TareaCompletado:
+    """Completado en lotes que corre en un hilo aparte y expone su progreso"""
+
+    def __init__(self):
+        self.total = 0
+        self.procesados = 0
+        self.completados = 0
+        self.error: Optional[Exception] = None
+        self.terminado = False
+
+    @property
+    def porcentaje(self) -> float:
+        """Porcentaje de libros procesados"""
+        if not self.total:
+            return 100.0 if self.terminado else 0.0
+        return 100.0 * self.procesados / self.total
+
+class Enriquecedor:
+    """Completa los datos vacíos de libros a partir de su ISBN.
+
+    Lo que cargó el usuario nunca se pisa: solo se llenan los campos vacíos.
+    """
+
+    def __init__(self, proveedor: ProveedorMetadatos, hilos: int = 4, tamanio_lote: int = 200):
+        self.proveedor = proveedor
+        self.hilos = hilos
+        self.tamanio_lote = tamanio_lote
+
+    @staticmethod
+    def _vacio(valor) -> bool:
+        """Indica si un campo se considera sin cargar"""
+        return valor is None or valor == '' or valor == 0
+
+    def completar(self, libro_data: Dict) -> Dict:
+        """Retorna una copia del libro con los campos vacíos completados por ISBN"""
+        libro = dict(libro_data)
+        isbn = normalizar_isbn(libro.get('isbn'))
+        if not isbn:
+            return libro
+        libro['isbn'] = isbn
+        datos = self.proveedor.buscar(isbn) or {}
+        for campo, valor in datos.items():
+            if self._vacio(libro.get(campo)):
+                libro[campo] = valor
+        return libro
+
+    def completar_lote(self, libros: List[Dict],
+                       progreso: Optional[Callable[[int], None]] = None) -> List[Tuple[int, Dict]]:
+        """Busca los metadatos de varios libros con un conjunto acotado de hilos.
+
+        Retorna (índice del libro, campos a completar) de los que se encontraron.
+        Nunca hay más de dos lotes por hilo en espera, así la memoria no crece
+        con el tamaño de la entrada.
+        """
+        isbns = [normalizar_isbn(libro.get('isbn')) for libro in libros]
+        lotes = [
+            range(inicio, min(inicio + self.tamanio_lote, len(libros)))
+            for inicio in range(0, len(libros), self.tamanio_lote)
+        ]
+
+        def buscar(indices: range) -> List[Tuple[int, Dict]]:
+            encontrados = self.proveedor.buscar_varios([isbns[i] for i in indices if isbns[i]])
+            resultado = []
+            for i in indices:
+                datos = encontrados.get(isbns[i]) or {}
+                faltantes = {
+                    campo: valor for campo, valor in datos.items()
+                    if self._vacio(libros[i].get(campo))
+                }
+                if faltantes:
+                    resultado.append((i, faltantes))
+            return resultado
+
+        resultado: List[Tuple[int, Dict]] = []
+        with ThreadPoolExecutor(max_workers=self.hilos, thread_name_prefix='catalogo') as ejecutor:
+            en_curso = []
+            for indices in lotes:
+                en_curso.append((indices, ejecutor.submit(buscar, indices)))
+                if len(en_curso) >= self.hilos * 2:
+                    indices_listos, futuro = en_curso.pop(0)
+                    resultado.extend(futuro.result())
+                    if progreso:
+                        progreso(len(indices_listos))
+            for indices_listos, futuro in en_curso:
+                resultado.extend(futuro.result())
+                if progreso:
+                    progreso(len(indices_listos))
+        return resultado
+
+    def completar_biblioteca(self, libro_model, campos: Tuple[str, ...] = ('editorial', 'paginas', 'genero'),
+                             tarea: Optional[TareaCompletado] = None) -> int:
+        """Completa los libros del perfil que tienen ISBN y campos vacíos.
+
+        Título y autor son obligatorios, así que por defecto no se tocan.
+        Retorna la cantidad de libros actualizados.
+        """
+        libros = libro_model.obtener_libros_incompletos(campos)
+        if tarea:
+            tarea.total = len(libros)
+
+        def avanzar(cantidad: int):
+            if tarea:
+                tarea.procesados += cantidad
+
+        encontrados = self.completar_lote(libros, avanzar)
+        datos = [
+            (libros[i]['id'], {c: v for c, v in faltantes.items() if c in campos})
+            for i, faltantes in encontrados
+        ]
+        datos = [(libro_id, valores) for libro_id, valores in datos if valores]
+        if datos:
+            libro_model.completar_libros(campos, datos)
+        if tarea:
+            tarea.completados = len(datos)
+        return len(datos)
+
+    def completar_en_segundo_plano(self, libro_model) -> TareaCompletado:
+        """Inicia el completado de la biblioteca en un hilo y retorna la tarea"""
+        tarea = TareaCompletado()
+
+        def ejecutar():
+            try:
+                self.completar_biblioteca(libro_model, tarea=tarea)
+            except Exception as e:
+                tarea.error = e
+            finally:
+                tarea.terminado = True
+
+        threading.Thread(target=ejecutar, daemon=True).start()
+        return tarea
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Registro de Lecturas - configuracion.py
+
+Autor: Sebastian Sanchez Bentolila
+Email: sebastiansb3004@gmail.com
+Versión: 1.0.0
+Última modificación: 29/07/2025
+Licencia: MIT
+Copyright: © 2025 - Todos los derechos reservados
+
+Descripción:
+- Configuración de la base de datos: ruta, almacenamiento, PRAGMAs y
+  bibliotecas adicionales para adjuntar
+- Se combina, de menor a mayor prioridad: valores por defecto, archivo de
+  configuración (JSON), variables de entorno y opciones de línea de comandos
+
+
+Dependencias:
+- Python 3.13.3
+- Módulos estándar: argparse, json, os, re, sys, dataclasses, typing
+
+Archivo de configuración (config.json junto a la aplicación, o el indicado
+con --config / LECTURAS_CONFIG):
+    {
+        "db": "/ruta/rapida/lecturas.db",
+        "almacenamiento": "sqlite",
+        "pragmas": {"journal_mode": "WAL", "cache_size": -65536},
+        "bibliotecas": {"club": "/ruta/club.db"}
+    }
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+# Carpeta de la aplicación (la del ejecutable si está empaquetada)
+DIRECTORIO_APP = os.path.dirname(
+    sys.executable if getattr(sys, 'frozen', False) else os.path.abspath(__file__)
+)
+RUTA_DB_POR_DEFECTO = os.path.join(DIRECTORIO_APP, 'db', 'lecturas.db')
+RUTA_CONFIG_POR_DEFECTO = os.path.join(DIRECTORIO_APP, 'config.json')
+
+_NOMBRE = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+_VALOR_PRAGMA = re.compile(r'^-?[A-Za-z0-9_.]+$')
+
+@dataclass
+class Configuracion:
+    """Dónde está la base y cómo se abre"""
+    db: str = RUTA_DB_POR_DEFECTO
+    almacenamiento: str = 'sqlite'
+    pragmas: Dict[str, str] = field(default_factory=dict)
+    bibliotecas: Dict[str, str] = field(default_factory=dict)
+
+def validar_pragma(nombre: str, valor) -> str:
+    """Retorna el valor del PRAGMA como texto, o lanza ValueError si no es seguro
+    incluirlo en la sentencia (los PRAGMA no aceptan parámetros)"""
+    valor = str(valor).strip()
+    if not _NOMBRE.match(nombre) or not _VALOR_PRAGMA.match(valor):
+        raise ValueError(f"PRAGMA inválido: {nombre} = {valor}")
+    return valor
+
+def validar_alias(alias: str) -> str:
+    """Retorna el alias de una biblioteca adjunta, o lanza ValueError si no es un nombre válido"""
+    if not _NOMBRE.match(alias) or alias.lower() in ('main', 'temp'):
+        raise ValueError(f"Alias de biblioteca inválido: {alias}")
+    return alias
+
+def _pares(texto: str, separador: str) -> Dict[str, str]:
+    """Convierte 'a=1;b=2' en {'a': '1', 'b': '2'}"""
+    pares = {}
+    for parte in filter(None, (p.strip() for p in texto.split(separador))):
+        nombre, igual, valor = parte.partition('=')
+        if not igual:
+            raise ValueError(f"Se esperaba nombre=valor: {parte}")
+        pares[nombre.strip()] = valor.strip()
+    return pares
+
+def _aplicar(config: Configuracion, datos: Dict):
+    """Pisa la configuración con los valores presentes en datos"""
+    if datos.get('db'):
+        config.db = os.path.expanduser(datos['db'])
+    if datos.get('almacenamiento'):
+        config.almacenamiento = datos['almacenamiento']
+    for nombre, valor in (datos.get('pragmas') or {}).items():
+        config.pragmas[nombre] = validar_pragma(nombre, valor)
+    for alias, ruta in (datos.get('bibliotecas') or {}).items():
+        validar_alias(alias)
+        # La ruta se valida acá porque la base se abre recién cuando se usa
+        ruta = os.path.expanduser(ruta)
+        if not os.path.isfile(ruta):
+            raise ValueError(f"No existe la biblioteca '{alias}': {ruta}")
+        config.bibliotecas[alias] = ruta
+
+def cargar_configuracion(args: Optional[argparse.Namespace] = None,
+                         entorno: Optional[Dict[str, str]] = None) -> Configuracion:
+    """Arma la configuración a partir del archivo, el entorno y los argumentos.
+
+    Variables de entorno: LECTURAS_CONFIG, LECTURAS_DB, LECTURAS_ALMACENAMIENTO,
+    LECTURAS_PRAGMAS ('nombre=valor;...') y LECTURAS_BIBLIOTECAS ('alias=ruta;...').
+    """
+    entorno = os.environ if entorno is None else entorno
+    config = Configuracion()
+
+    ruta_config = getattr(args, 'config', None) or entorno.get('LECTURAS_CONFIG')
+    if ruta_config or os.path.exists(RUTA_CONFIG_POR_DEFECTO):
+        with open(ruta_config or RUTA_CONFIG_POR_DEFECTO, encoding='utf-8') as archivo:
+            _aplicar(config, json.load(archivo))
+
+    _aplicar(config, {
+        'db': entorno.get('LECTURAS_DB'),
+        'almacenamiento': entorno.get('LECTURAS_ALMACENAMIENTO'),
+        'pragmas': _pares(entorno.get('LECTURAS_PRAGMAS', ''), ';'),
+        'bibliotecas': _pares(entorno.get('LECTURAS_BIBLIOTECAS', ''), ';')
+    })
+
+    if args is not None:
+        _aplicar(config, {
+            'db': getattr(args, 'db', None),
+            'pragmas': _pares(';'.join(getattr(args, 'pragma', None) or []), ';'),
+            'bibliotecas': _pares(';'.join(getattr(args, 'adjuntar', None) or []), ';')
+        })
+    return config
+
+def agregar_argumentos(parser: argparse.ArgumentParser):
+    """Agrega al parser las opciones de configuración de la base"""
+    parser.add_argument('--config', metavar='ARCHIVO',
+                        help='Archivo de configuración JSON (por defecto config.json junto a la aplicación)')
+    parser.add_argument('--db', metavar='RUTA', help='Ruta de la base de datos')
+    parser.add_argument('--pragma', action='append', metavar='NOMBRE=VALOR',
+                        help='PRAGMA de SQLite para cada conexión (se puede repetir)')
+    parser.add_argument('--adjuntar', action='append', metavar='ALIAS=RUTA',
+                        help='Adjunta otra biblioteca para consultas combinadas (se puede repetir)')
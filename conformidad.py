@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Registro de Lecturas - conformidad.py
+
+Autor: Sebastian Sanchez Bentolila
+Email: sebastiansb3004@gmail.com
+Versión: 1.0.0
+Última modificación: 29/07/2025
+Licencia: MIT
+Copyright: © 2025 - Todos los derechos reservados
+
+Descripción:
+- Verificación de conformidad de los almacenamientos del modelo
+- Ejecuta el mismo conjunto de comprobaciones sobre cada almacenamiento
+  (altas, ediciones, bajas, diario, transacciones, versión de datos y
+  consultas analíticas) y reporta las que fallan
+
+
+Dependencias:
+- Python 3.13.3
+- Módulos estándar: argparse, os, sys, tempfile, typing
+
+Uso:
+    python conformidad.py [--almacenamiento sqlite|memoria|duckdb]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+from typing import Callable, List, Tuple
+
+from modelo import (
+    ALMACENAMIENTOS, Almacenamiento, CambioModel, LibroModel, UsuarioModel, crear_almacenamiento
+)
+
+LIBRO_PRUEBA = {
+    'titulo': 'Rayuela', 'autor': 'Julio Cortázar', 'genero': 'Novela',
+    'anio_lectura': 2024, 'fecha_lectura': '2024-03-10', 'calificacion': 4.5, 'paginas': 600
+}
+
+def _alta_y_lectura(db: Almacenamiento):
+    """Un libro creado se puede leer con los mismos datos"""
+    libros = LibroModel(db)
+    libro_id = libros.crear_libro(dict(LIBRO_PRUEBA))
+    leidos = [libro for libro in libros.obtener_libros() if libro['id'] == libro_id]
+    assert len(leidos) == 1, 'el libro creado no aparece'
+    for campo, valor in LIBRO_PRUEBA.items():
+        assert leidos[0][campo] == valor, f'{campo}: {leidos[0][campo]!r} != {valor!r}'
+
+def _edicion_y_baja(db: Almacenamiento):
+    """Editar cambia los datos y eliminar quita el libro"""
+    libros = LibroModel(db)
+    libro_id = libros.crear_libro(dict(LIBRO_PRUEBA))
+    libros.actualizar_libro(libro_id, dict(LIBRO_PRUEBA, titulo='Rayuela (2.ª ed.)'))
+    titulos = {libro['id']: libro['titulo'] for libro in libros.obtener_libros()}
+    assert titulos.get(libro_id) == 'Rayuela (2.ª ed.)', 'la edición no se ve'
+    libros.eliminar_libro(libro_id)
+    assert libro_id not in {libro['id'] for libro in libros.obtener_libros()}, 'la baja no se ve'
+
+def _version_de_datos(db: Almacenamiento):
+    """La versión de datos cambia con cada escritura"""
+    antes = db.obtener_version_datos()
+    LibroModel(db).crear_libro(dict(LIBRO_PRUEBA))
+    assert db.obtener_version_datos() != antes, 'la versión no cambió tras un alta'
+
+def _diario_y_deshacer(db: Almacenamiento):
+    """El diario de cambios registra un alta y puede deshacerla"""
+    libros, cambios = LibroModel(db), CambioModel(db)
+    libro_id = libros.crear_libro(dict(LIBRO_PRUEBA))
+    version = cambios.obtener_version_actual()
+    assert cambios.deshacer(version) is not None, 'no se pudo deshacer el alta'
+    assert libro_id not in {libro['id'] for libro in libros.obtener_libros()}, 'el alta sigue tras deshacer'
+
+def _transaccion_revertida(db: Almacenamiento):
+    """Una transacción que falla no deja escrituras"""
+    libros = LibroModel(db)
+    total = len(libros.obtener_libros())
+    try:
+        with libros.transaccion():
+            libros.crear_libro(dict(LIBRO_PRUEBA))
+            libros.crear_libro(dict(LIBRO_PRUEBA, titulo='Final del juego'))
+            raise KeyError('falla a propósito')
+    except KeyError:
+        pass
+    assert len(libros.obtener_libros()) == total, 'quedaron escrituras de una transacción revertida'
+
+def _transaccion_confirmada(db: Almacenamiento):
+    """Una transacción que termina bien deja todas sus escrituras"""
+    libros = LibroModel(db)
+    total = len(libros.obtener_libros())
+    with libros.transaccion():
+        for numero in range(3):
+            libros.crear_libro(dict(LIBRO_PRUEBA, titulo=f'Historias de cronopios {numero}'))
+    assert len(libros.obtener_libros()) == total + 3, 'faltan escrituras de la transacción'
+
+def _consultas_analiticas(db: Almacenamiento):
+    """Las estadísticas coinciden con los libros leídos del perfil"""
+    libros = LibroModel(db)
+    libros.crear_libro(dict(LIBRO_PRUEBA))
+    leidos = [libro for libro in libros.obtener_libros() if libro['estado'] == 'leído']
+    stats = libros.obtener_estadisticas()
+    assert stats['total_libros'] == len(leidos), 'el total no coincide'
+    assert sum(cantidad for _, cantidad in stats['libros_por_anio']) == len(leidos), \
+        'los libros por año no suman el total'
+
+def _perfiles(db: Almacenamiento):
+    """Cada perfil ve solo sus libros"""
+    usuarios = UsuarioModel(db)
+    otro = usuarios.crear_usuario({'nombre': 'Lectora de prueba'})
+    libros = LibroModel(db, otro)
+    assert libros.obtener_libros() == [], 'un perfil nuevo ve libros ajenos'
+    libros.crear_libro(dict(LIBRO_PRUEBA))
+    assert len(libros.obtener_libros()) == 1, 'el perfil no ve su libro'
+
+COMPROBACIONES: List[Callable[[Almacenamiento], None]] = [
+    _alta_y_lectura, _edicion_y_baja, _version_de_datos, _diario_y_deshacer,
+    _transaccion_revertida, _transaccion_confirmada, _consultas_analiticas, _perfiles
+]
+
+def verificar_almacenamiento(crear: Callable[[], Almacenamiento]) -> List[Tuple[str, str]]:
+    """Corre cada comprobación sobre un almacenamiento nuevo y retorna las fallidas
+    como (comprobación, motivo)"""
+    fallidas = []
+    for comprobacion in COMPROBACIONES:
+        try:
+            comprobacion(crear())
+        except Exception as e:
+            fallidas.append((comprobacion.__name__.strip('_'), f'{type(e).__name__}: {e}'))
+    return fallidas
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='Conformidad de los almacenamientos del modelo')
+    parser.add_argument('--almacenamiento', choices=list(ALMACENAMIENTOS),
+                        help='Verifica solo este almacenamiento (por defecto, todos)')
+    args = parser.parse_args(argv)
+
+    errores = 0
+    with tempfile.TemporaryDirectory() as directorio:
+        contador = iter(range(10 ** 6))
+        for tipo in [args.almacenamiento] if args.almacenamiento else list(ALMACENAMIENTOS):
+            def crear(tipo=tipo):
+                return crear_almacenamiento(tipo, os.path.join(directorio, f'{tipo}-{next(contador)}.db'))
+            try:
+                crear()
+            except RuntimeError as e:
+                print(f'{tipo}: omitido ({e})')
+                continue
+
+            fallidas = verificar_almacenamiento(crear)
+            print(f'{tipo}: {len(COMPROBACIONES) - len(fallidas)}/{len(COMPROBACIONES)} comprobaciones')
+            for nombre, motivo in fallidas:
+                print(f'  ✗ {nombre}: {motivo}')
+            errores += len(fallidas)
+    return 1 if errores else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
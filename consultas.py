@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Registro de Lecturas - consultas.py
+
+Autor: Sebastian Sanchez Bentolila
+Email: sebastiansb3004@gmail.com
+Versión: 1.0.0
+Última modificación: 29/07/2025
+Licencia: MIT
+Copyright: © 2025 - Todos los derechos reservados
+
+Descripción:
+- Lenguaje de consultas del buscador, por ejemplo:
+  autor:borges año:2020..2023 calif>=4 paginas<300 "texto libre" -estado:leído
+- Se analiza a un árbol tipado (Texto, Comparacion, Rango) con los valores
+  ya convertidos al tipo de cada campo, y se compila a SQL con parámetros
+- Los planes compilados se guardan en una caché por texto de la consulta
+- El texto libre y los campos de texto se buscan en un índice FTS5 (con
+  LIKE como alternativa si SQLite no lo trae)
+
+
+Dependencias:
+- Python 3.13.3
+- Módulos estándar: re, threading, unicodedata, collections, dataclasses, typing
+"""
+
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+# Un término: [-]campo<op>valor (sin espacios en medio), "frase" o palabra suelta
+_TERMINO = re.compile(r'''
+    (?P<negado>-)?
+    (?:
+        (?P<campo>[^\W\d]\w*)(?P<operador>:|!=|>=|<=|=|>|<)
+        (?:"(?P<valor_frase>[^"]*)"|(?P<valor>[^\s"]+))
+      | "(?P<frase>[^"]*)"
+      | (?P<palabra>[^\s"]+)
+    )''', re.VERBOSE)
+_SIN_VALOR = re.compile(r'^([^\W\d]\w*)(:|!=|>=|<=|=|>|<)$')
+_FECHA = re.compile(r'^\d{4}(-\d{2}(-\d{2})?)?$')
+
+OPERADORES_ORDEN = ('<', '<=', '>', '>=')
+
+@dataclass(frozen=True)
+class CampoConsulta:
+    """Un campo del lenguaje: columna, tipo y nombres con que se escribe.
+
+    tipo es 'texto', 'entero', 'real', 'fecha', 'opcion' o 'subconsulta'.
+    Los de texto con fts=True se buscan en el índice de texto completo; una
+    subconsulta usa sql con un único parámetro (por ejemplo, id IN (...)).
+    """
+    nombre: str
+    columna: Optional[str] = None
+    tipo: str = 'texto'
+    alias: Tuple[str, ...] = ()
+    fts: bool = False
+    opciones: Optional[Sequence[str]] = None
+    sql: Optional[str] = None
+    transformar: Optional[Callable[[str], str]] = None
+
+class ErrorConsulta(ValueError):
+    """Consulta mal escrita; posicion es el carácter donde está el problema"""
+
+    def __init__(self, mensaje: str, posicion: Optional[int] = None):
+        super().__init__(mensaje if posicion is None else f"{mensaje} (posición {posicion + 1})")
+        self.posicion = posicion
+
+@dataclass(frozen=True)
+class Texto:
+    """Texto libre: una palabra (busca por prefijo) o una frase entre comillas"""
+    texto: str
+    frase: bool = False
+    negado: bool = False
+
+@dataclass(frozen=True)
+class Comparacion:
+    """campo operador valor, con el valor convertido al tipo del campo.
+
+    En los campos de texto ':' busca el valor dentro del campo e '=' lo
+    compara completo; '!=' se representa como '=' negado.
+    """
+    campo: CampoConsulta
+    operador: str
+    valor: Any
+    frase: bool = False
+    negado: bool = False
+
+@dataclass(frozen=True)
+class Rango:
+    """campo:desde..hasta (cualquiera de los dos extremos puede faltar)"""
+    campo: CampoConsulta
+    desde: Any = None
+    hasta: Any = None
+    negado: bool = False
+
+Termino = Union[Texto, Comparacion, Rango]
+
+@dataclass(frozen=True)
+class Plan:
+    """Condición SQL compilada (para un WHERE) y sus parámetros.
+
+    usa_indice_texto indica que la condición restringe los libros con una
+    búsqueda FTS, que conviene que conduzca la consulta.
+    """
+    sql: str
+    params: Tuple
+    usa_indice_texto: bool = False
+
+def _clave(nombre: str) -> str:
+    """Nombre de campo sin tildes ni mayúsculas (año -> ano, Calif -> calif)"""
+    descompuesto = unicodedata.normalize('NFKD', nombre.lower())
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c))
+
+class LenguajeConsultas:
+    """Analiza y compila consultas sobre una tabla con los campos dados.
+
+    Los términos se combinan con Y; un '-' adelante niega el término. Las
+    consultas compiladas se guardan en una caché LRU por texto, así repetir
+    una búsqueda no vuelve a analizarla.
+    """
+
+    def __init__(self, campos: List[CampoConsulta], tabla_fts: Optional[str] = None,
+                 max_planes: int = 256):
+        self.campos = campos
+        self.tabla_fts = tabla_fts
+        self.max_planes = max_planes
+        self._por_nombre: Dict[str, CampoConsulta] = {}
+        for campo in campos:
+            for nombre in (campo.nombre,) + tuple(campo.alias):
+                self._por_nombre[_clave(nombre)] = campo
+        self._planes: 'OrderedDict[Tuple[str, bool], Plan]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    # Análisis
+    def analizar(self, texto: str) -> List[Termino]:
+        """Convierte el texto de la consulta en una lista de términos tipados"""
+        terminos = []
+        posicion = 0
+        while True:
+            while posicion < len(texto) and texto[posicion].isspace():
+                posicion += 1
+            if posicion >= len(texto):
+                return terminos
+            coincidencia = _TERMINO.match(texto, posicion)
+            if not coincidencia:
+                raise ErrorConsulta("Comillas sin cerrar", posicion)
+            terminos.append(self._termino(coincidencia))
+            posicion = coincidencia.end()
+
+    def _termino(self, coincidencia: re.Match) -> Termino:
+        """Término de una coincidencia de _TERMINO"""
+        negado = bool(coincidencia['negado'])
+        if coincidencia['frase'] is not None:
+            return Texto(coincidencia['frase'], frase=True, negado=negado)
+        if coincidencia['palabra'] is not None:
+            palabra = coincidencia['palabra']
+            sin_valor = _SIN_VALOR.match(palabra)
+            if sin_valor and _clave(sin_valor.group(1)) in self._por_nombre:
+                raise ErrorConsulta(f"Falta el valor de {sin_valor.group(1)}", coincidencia.start())
+            return Texto(palabra, negado=negado)
+
+        nombre, operador = coincidencia['campo'], coincidencia['operador']
+        frase = coincidencia['valor_frase'] is not None
+        valor = coincidencia['valor_frase'] if frase else coincidencia['valor']
+        campo = self._por_nombre.get(_clave(nombre))
+        if campo is None:
+            # No es un campo: texto libre con dos puntos ("Star Wars: Episode", "Re:Zero")
+            return Texto(f'{nombre}{operador}{valor}', frase=frase, negado=negado)
+        try:
+            return self._comparacion(campo, operador, valor, frase, negado)
+        except ValueError as e:
+            raise ErrorConsulta(f"{nombre}: {e}", coincidencia.start('campo')) from None
+
+    def _comparacion(self, campo: CampoConsulta, operador: str, valor: str,
+                     frase: bool, negado: bool) -> Termino:
+        """Comparación o rango con el valor convertido al tipo del campo"""
+        if operador == '!=':
+            operador, negado = '=', not negado
+        if operador in OPERADORES_ORDEN and campo.tipo not in ('entero', 'real', 'fecha'):
+            raise ValueError(f"no admite {operador}")
+
+        if campo.tipo in ('entero', 'real', 'fecha'):
+            if operador == ':' and '..' in valor:
+                desde, _, hasta = valor.partition('..')
+                if not desde and not hasta:
+                    raise ValueError("el rango necesita al menos un extremo")
+                return Rango(
+                    campo, self._valor(campo, desde) if desde else None,
+                    self._valor(campo, hasta) if hasta else None, negado
+                )
+            return Comparacion(campo, '=' if operador == ':' else operador,
+                               self._valor(campo, valor), negado=negado)
+
+        if campo.tipo == 'opcion':
+            buscado = _clave(valor)
+            for opcion in campo.opciones or ():
+                if _clave(opcion) == buscado:
+                    return Comparacion(campo, '=', opcion, negado=negado)
+            raise ValueError(f"valor desconocido {valor} (opciones: {', '.join(campo.opciones or ())})")
+
+        if campo.transformar:
+            valor = campo.transformar(valor)
+        if campo.tipo == 'subconsulta':
+            return Comparacion(campo, '=', valor, negado=negado)
+        if not valor.strip():
+            raise ValueError("el valor está vacío")
+        return Comparacion(campo, operador, valor, frase=frase, negado=negado)
+
+    @staticmethod
+    def _valor(campo: CampoConsulta, valor: str):
+        """Convierte un valor al tipo del campo (ValueError si no corresponde)"""
+        if campo.tipo == 'entero':
+            try:
+                return int(valor)
+            except ValueError:
+                raise ValueError(f"se esperaba un número entero y llegó {valor}") from None
+        if campo.tipo == 'real':
+            try:
+                return float(valor.replace(',', '.'))
+            except ValueError:
+                raise ValueError(f"se esperaba un número y llegó {valor}") from None
+        if not _FECHA.match(valor):
+            raise ValueError(f"se esperaba una fecha AAAA, AAAA-MM o AAAA-MM-DD y llegó {valor}")
+        return valor
+
+    # Compilación
+    def compilar(self, texto: str, fts: bool = True) -> Plan:
+        """Plan SQL de la consulta, desde la caché si ya se compiló antes.
+
+        Con fts=False el texto se busca con LIKE en lugar del índice FTS5.
+        """
+        clave = (texto.strip(), bool(fts and self.tabla_fts))
+        with self._lock:
+            plan = self._planes.get(clave)
+            if plan is not None:
+                self._planes.move_to_end(clave)
+                self.aciertos += 1
+                return plan
+            self.fallos += 1
+
+        plan = self.compilar_terminos(self.analizar(clave[0]), clave[1])
+        with self._lock:
+            self._planes[clave] = plan
+            if len(self._planes) > self.max_planes:
+                self._planes.popitem(last=False)
+        return plan
+
+    def compilar_terminos(self, terminos: List[Termino], fts: bool = True) -> Plan:
+        """Compila los términos a una condición SQL (todos deben cumplirse)"""
+        condiciones, params = [], []
+        coincidir = []
+        for termino in terminos:
+            usa_fts = fts and self._es_fts(termino)
+            if usa_fts and not termino.negado:
+                # Todo el texto positivo va en una sola búsqueda del índice
+                coincidir.append(self._expresion_fts(termino))
+            elif usa_fts:
+                condiciones.append(f'id NOT IN (SELECT rowid FROM {self.tabla_fts} WHERE {self.tabla_fts} MATCH ?)')
+                params.append(self._expresion_fts(termino))
+            else:
+                sql, valores = self._condicion(termino)
+                # Negar también deja pasar los libros sin dato en el campo
+                condiciones.append(f'NOT IFNULL({sql}, 0)' if termino.negado else sql)
+                params.extend(valores)
+
+        if coincidir:
+            condiciones.insert(0, f'id IN (SELECT rowid FROM {self.tabla_fts} WHERE {self.tabla_fts} MATCH ?)')
+            params.insert(0, ' AND '.join(coincidir))
+        return Plan(' AND '.join(condiciones) or '1', tuple(params), bool(coincidir))
+
+    def _es_fts(self, termino: Termino) -> bool:
+        """Si el término se resuelve con el índice de texto completo"""
+        if isinstance(termino, Texto):
+            return True
+        return (isinstance(termino, Comparacion) and termino.campo.fts
+                and termino.operador == ':')
+
+    @staticmethod
+    def _expresion_fts(termino: Termino) -> str:
+        """Expresión MATCH de FTS5 para el término: frase exacta o prefijo"""
+        if isinstance(termino, Texto):
+            texto, frase, columna = termino.texto, termino.frase, None
+        else:
+            texto, frase, columna = termino.valor, termino.frase, termino.campo.columna
+        expresion = '"' + texto.replace('"', '""') + '"' + ('' if frase else '*')
+        return f'{columna} : {expresion}' if columna else expresion
+
+    def _condicion(self, termino: Termino) -> Tuple[str, List]:
+        """Condición SQL (sin FTS) de un término y sus parámetros"""
+        if isinstance(termino, Texto):
+            columnas = [campo.columna for campo in self.campos if campo.fts]
+            patron = self._patron_like(termino.texto)
+            return ('(' + ' OR '.join(f"{columna} LIKE ? ESCAPE '\\'" for columna in columnas) + ')',
+                    [patron] * len(columnas))
+
+        campo = termino.campo
+        if isinstance(termino, Rango):
+            desde, hasta = termino.desde, termino.hasta
+            if campo.tipo == 'fecha':
+                desde = self._inicio_periodo(desde) if desde else None
+                hasta = hasta + '~' if hasta else None
+            if desde is not None and hasta is not None:
+                return f'({campo.columna} BETWEEN ? AND ?)', [desde, hasta]
+            if desde is not None:
+                return f'({campo.columna} >= ?)', [desde]
+            return f'({campo.columna} <= ?)', [hasta]
+
+        if campo.tipo == 'subconsulta':
+            return f'({campo.sql})', [termino.valor]
+        if campo.tipo == 'opcion':
+            # Literal (es una de las opciones) para que SQLite pueda usar índices parciales
+            return f"({campo.columna} = '{termino.valor.replace(chr(39), chr(39) * 2)}')", []
+        if campo.tipo == 'texto':
+            if termino.operador == ':':
+                return f"({campo.columna} LIKE ? ESCAPE '\\')", [self._patron_like(termino.valor)]
+            return f'({campo.columna} = ? COLLATE NOCASE)', [termino.valor]
+        if campo.tipo == 'fecha':
+            # Una fecha incompleta (2023, 2023-05) abarca todo su período:
+            # '2023-' <= fecha <= '2023~' porque '~' va después de dígitos y guiones
+            valor, operador = termino.valor, termino.operador
+            if operador == '=':
+                return f'({campo.columna} BETWEEN ? AND ?)', [self._inicio_periodo(valor), valor + '~']
+            valor = valor + '~' if operador in ('>', '<=') else self._inicio_periodo(valor)
+            return f'({campo.columna} {operador} ?)', [valor]
+        return f'({campo.columna} {termino.operador} ?)', [termino.valor]
+
+    @staticmethod
+    def _inicio_periodo(fecha: str) -> str:
+        """Cota inferior de un período como texto: '2023' solo se compararía
+        como número contra la columna DATE, '2023-' se compara como texto"""
+        return fecha if '-' in fecha else fecha + '-'
+
+    @staticmethod
+    def _patron_like(texto: str) -> str:
+        """Patrón LIKE que busca el texto en cualquier parte, sin comodines propios"""
+        return '%' + re.sub(r'([\\%_])', r'\\\1', texto) + '%'
+
+    def estadisticas(self) -> Dict:
+        """Retorna contadores de uso de la caché de planes"""
+        with self._lock:
+            return {
+                'planes': len(self._planes), 'max_planes': self.max_planes,
+                'aciertos': self.aciertos, 'fallos': self.fallos
+            }
@@ -19,49 +19,131 @@ Descripción:
 
 Dependencias:
 - Python 3.13.3
-- Módulos estándar: typing, os, datetime
+- Módulos estándar: typing, os, re, datetime
 """
 
-from modelo import libro_model, usuario_model, informe_model
+import modelo
+from modelo import normalizar_isbn, ESQUEMA_LIBRO, CONSULTA_LIBRO
+from validacion import ErrorValidacion
+from consultas import ErrorConsulta
+from mantenimiento import MantenimientoModel
+from sincronizacion import SincronizacionModel
+from perfilado import Perfilador
+from recomendador import Recomendador
+from portadas import CachePortadas
+from catalogo import CatalogoLocal, Enriquecedor, TareaCompletado
 from vista import MainView
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import os
+import re
+import threading
 from datetime import datetime
 
 class MainController:
     """Controlador principal de la aplicación"""
     
-    def __init__(self):
-        # Inicializar modelos
-        self.libro_model = libro_model
-        self.usuario_model = usuario_model
-        self.informe_model = informe_model
+    def __init__(self, profiler: Optional[Perfilador] = None, view_class: type = MainView):
+        # En modo perfilado los métodos se envuelven antes de que la vista los enlace
+        self.profiler = profiler
+        if profiler:
+            # El bucle de la interfaz no es una acción: quedaría todo anidado en él
+            profiler.instrumentar(self, 'controlador', excluir=['run'])
         
-        # Inicializar vista
-        self.view = MainView(self)
+        # Inicializar modelos (la base se abre acá, con la configuración ya fijada)
+        self.db_manager = modelo.db_manager
+        self.libro_model = modelo.libro_model
+        self.usuario_model = modelo.usuario_model
+        self.informe_model = modelo.informe_model
+        self.sesion_model = modelo.sesion_model
+        self.cambio_model = modelo.cambio_model
+        self.meta_model = modelo.meta_model
+        self.bibliotecas_model = modelo.bibliotecas_model
+        self.mantenimiento_model = MantenimientoModel(self.db_manager)
+        self.sincronizacion_model = SincronizacionModel(self.db_manager)
+        self.recomendador = Recomendador(self.db_manager)
+        self.catalogo = CatalogoLocal(
+            os.path.join(os.path.dirname(self.db_manager.db_name) or '.', 'catalogo.db')
+        )
+        self.enriquecedor = Enriquecedor(self.catalogo)
+        self._backup_task = None
+        self._catalogue_task = None
+        self._stats_thread = None
+        
+        # Inicializar vista (presupuestos.py usa una vista falsa, sin Tk)
+        self.view = view_class(self)
+        self.view.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.covers = CachePortadas(
+            os.path.join(os.path.dirname(self.db_manager.db_name) or '.', 'portadas')
+        )
+        self.view.set_cover_cache(self.covers)
+        self._prefs_job = None
+        if profiler:
+            self._instrument_layers()
+        
+        # Pilas de versiones del diario de cambios para deshacer/rehacer
+        self._undo_stack: List[int] = []
+        self._redo_stack: List[int] = []
         
         # Cargar datos iniciales
         self._load_initial_data()
         
-        # Iniciar la aplicación
+        # Compactación programada, fuera del arranque
+        self.view.after(5000, self._run_scheduled_maintenance)
+        
+        # Precalentar el recomendador sin demorar el arranque
+        self.view.after(8000, lambda: threading.Thread(
+            target=self.recomendador.actualizar, daemon=True
+        ).start())
+    
+    def run(self):
+        """Inicia el bucle de la interfaz y cierra la sesión al terminar"""
         self.view.mainloop()
+        
+        # Actualizar estadísticas del planificador al cerrar
+        self.mantenimiento_model.optimizar()
+        
+        if self.profiler:
+            print(self.profiler.resumen())
+            print(f"Perfil guardado en {self.profiler.escribir()}")
+    
+    def _instrument_layers(self):
+        """Agrega tramos a los modelos y a la carga de la vista"""
+        self.profiler.instrumentar(self.libro_model, 'libro_model')
+        self.profiler.instrumentar(self.usuario_model, 'usuario_model')
+        self.profiler.instrumentar(self.sesion_model, 'sesion_model')
+        self.profiler.instrumentar(self.cambio_model, 'cambio_model')
+        self.profiler.instrumentar(self.meta_model, 'meta_model')
+        self.profiler.instrumentar(self.view, 'vista', [
+            'populate_books_table', '_insert_book_batch', 'populate_filters', 'set_filters',
+            'apply_preferences', 'show_stats', 'show_duplicates', 'show_maintenance'
+        ])
+        self.profiler.iniciar(self.view)
     
     def _load_initial_data(self):
         """Carga los datos iniciales en la aplicación"""
-        # Cargar datos del usuario
+        # Cargar datos del usuario y perfiles disponibles
         user_data = self.usuario_model.obtener_usuario()
         self.view.update_user_info(user_data)
+        self.view.populate_profiles(self.usuario_model.obtener_usuarios(), user_data['id'])
         
-        # Cargar libros y configurar filtros
-        self._refresh_books_table()
+        # Restaurar el estado de la interfaz y los últimos filtros usados
+        self._apply_preferences()
         
         # Establecer valores por defecto en el formulario
         self.view.clear_form()
     
+    def _apply_preferences(self):
+        """Aplica las preferencias del perfil activo y carga sus libros"""
+        prefs = self.usuario_model.obtener_preferencias()
+        self.view.apply_preferences(prefs)
+        self._refresh_books_table(prefs.ultimos_filtros)
+    
     def _refresh_books_table(self, filters: Optional[Dict] = None):
         """Actualiza la tabla de libros con los filtros dados"""
+        prefs = self.usuario_model.obtener_preferencias()
+        
         # Obtener libros con filtros
-        books = self.libro_model.obtener_libros(filters)
+        books = self.libro_model.obtener_libros(filters, prefs.orden, prefs.orden_desc)
         self.view.populate_books_table(books)
         
         # Actualizar filtros disponibles
@@ -69,7 +151,37 @@ class MainController:
         years = {book['anio_lectura'] for book in all_books if book.get('anio_lectura')}
         genres = {book['genero'] for book in all_books if book.get('genero')}
         
-        self.view.populate_filters(sorted(years, reverse=True), sorted(genres))
+        tags = [nombre for nombre, _ in self.libro_model.obtener_tags()]
+        self.view.populate_filters(sorted(years, reverse=True), sorted(genres), tags)
+        self.view.set_filters(filters or {})
+        self._update_goal_progress()
+    
+    def _update_goal_progress(self):
+        """Muestra en el encabezado el avance de la meta del año"""
+        self.view.update_goal_progress(self.meta_model.obtener_progreso())
+    
+    def _schedule_preferences_save(self):
+        """Agrupa los cambios de preferencias y los guarda unos segundos después"""
+        if self._prefs_job is None:
+            self._prefs_job = self.view.after(2000, self._save_preferences)
+    
+    def _save_preferences(self):
+        """Guarda las preferencias modificadas"""
+        self._prefs_job = None
+        self.usuario_model.guardar_preferencias()
+    
+    def on_close(self):
+        """Guarda el estado de la interfaz y cierra la aplicación"""
+        try:
+            self.usuario_model.obtener_preferencias().actualizar(
+                anchos_columnas=self.view.get_column_widths(),
+                geometria=self.view.geometry()
+            )
+            self.usuario_model.guardar_preferencias()
+        finally:
+            self.covers.cerrar()
+            self.db_manager.confirmar()
+            self.view.destroy()
     
     def add_book(self):
         """Agrega un nuevo libro desde el formulario"""
@@ -77,34 +189,37 @@ class MainController:
             # Obtener datos del formulario
             book_data = self.view.get_form_data()
             
-            # Validar campos obligatorios
-            if not book_data.get('titulo') or not book_data.get('autor'):
-                self.view.show_message(
-                    "Error", 
-                    "Título y autor son campos obligatorios", 
-                    'error'
-                )
-                return
+            # Completar lo que falte desde el catálogo si el ISBN es válido
+            if normalizar_isbn(book_data.get('isbn')):
+                book_data = self.enriquecedor.completar(book_data)
             
-            # Convertir tipos de datos
-            if book_data.get('anio_lectura'):
-                try:
-                    book_data['anio_lectura'] = int(book_data['anio_lectura'])
-                except ValueError:
-                    book_data['anio_lectura'] = datetime.now().year
+            # Validar y convertir tipos con el esquema del modelo
+            try:
+                book_data = ESQUEMA_LIBRO.validar(book_data)
+            except ErrorValidacion as e:
+                self._show_validation_errors(e)
+                return
             
-            if book_data.get('paginas'):
-                try:
-                    book_data['paginas'] = int(book_data['paginas'])
-                except ValueError:
-                    book_data['paginas'] = 0
+            # Advertir si el libro ya parece estar registrado
+            duplicates = self.libro_model.buscar_duplicados(book_data)
+            if duplicates:
+                listado = "\n".join(
+                    f"- {book['titulo']} ({book['autor']}, {book['anio_lectura']})"
+                    for book in duplicates[:5]
+                )
+                if not self.view.ask_confirmation(
+                    "Posible duplicado",
+                    f"Ya existen libros parecidos:\n{listado}\n\n¿Agregar de todos modos?"
+                ):
+                    return
             
             # Crear el libro
             self.libro_model.crear_libro(book_data)
+            self._record_change()
             
             # Actualizar la vista
             self.view.clear_form()
-            self._refresh_books_table()
+            self._refresh_books_table(self.view.get_filters())
             
             self.view.show_message(
                 "Éxito", 
@@ -118,14 +233,58 @@ class MainController:
                 'error'
             )
     
+    def lookup_isbn(self):
+        """Completa el formulario con los datos del ISBN ingresado"""
+        isbn = normalizar_isbn(self.view.get_form_data().get('isbn'))
+        if not isbn:
+            self.view.show_message("Error", "El ISBN no es válido", 'error')
+            return
+        
+        data = self.catalogo.buscar(isbn)
+        if not data:
+            self.view.show_message(
+                "ISBN", 
+                "El ISBN no está en el catálogo local", 
+                'info'
+            )
+            return
+        self.view.fill_form(data)
+    
     def filter_books(self):
         """Filtra los libros según los criterios seleccionados"""
         filters = self.view.get_filters()
+        prefs = self.usuario_model.obtener_preferencias()
+        
+        # Una búsqueda mal escrita no se aplica: se avisa dónde está el error
+        # y se vuelve a los últimos filtros aplicados
+        if filters.get('consulta'):
+            try:
+                CONSULTA_LIBRO.analizar(filters['consulta'])
+            except ErrorConsulta as e:
+                self.view.show_message("Búsqueda", f"No se entiende la búsqueda: {str(e)}", 'warning')
+                self.view.set_filters(prefs.ultimos_filtros)
+                return
+        
+        if prefs.actualizar(ultimos_filtros=filters):
+            self._schedule_preferences_save()
         self._refresh_books_table(filters)
     
     def clear_filters(self):
-        """Limpia todos los filtros aplicados"""
-        self._refresh_books_table()
+        """Limpia los filtros aplicados, manteniendo la vista por estado"""
+        filters = {key: value for key, value in self.view.get_filters().items() if key == 'estado'}
+        if self.usuario_model.obtener_preferencias().actualizar(ultimos_filtros=filters):
+            self._schedule_preferences_save()
+        self._refresh_books_table(filters)
+    
+    def sort_books(self, column: str):
+        """Ordena la tabla por una columna (un segundo clic invierte el orden)"""
+        prefs = self.usuario_model.obtener_preferencias()
+        desc = not prefs.orden_desc if prefs.orden == column else False
+        prefs.actualizar(orden=column, orden_desc=desc)
+        self._schedule_preferences_save()
+        
+        self.view.show_sort_indicator(column, desc)
+        self._refresh_books_table(self.view.get_filters())
     
     def show_book_details(self):
         """Muestra los detalles del libro seleccionado"""
@@ -144,7 +303,10 @@ class MainController:
         """Abre el diálogo para editar un libro"""
         book_id = self.view.get_selected_book_id()
         if book_id:
-            book = self.libro_model.obtener_libros({'id': book_id})[0]
+            book = dict(
+                self.libro_model.obtener_libros({'id': book_id})[0],
+                tags=', '.join(self.libro_model.obtener_tags_libro(book_id))
+            )
             self.view.show_book_edit_dialog(book)
         else:
             self.view.show_message(
@@ -156,33 +318,21 @@ class MainController:
     def update_book(self, book_id: int, book_data: Dict):
         """Actualiza un libro existente"""
         try:
-            # Validar campos obligatorios
-            if not book_data.get('titulo') or not book_data.get('autor'):
-                self.view.show_message(
-                    "Error", 
-                    "Título y autor son campos obligatorios", 
-                    'error'
-                )
+            # El modelo valida con el esquema y conserva los campos que no
+            # vienen en el diálogo (por ejemplo, la fecha de lectura)
+            try:
+                self.libro_model.actualizar_libro(book_id, book_data)
+            except ErrorValidacion as e:
+                self._show_validation_errors(e)
                 return
+            self._record_change()
             
-            # Convertir tipos de datos
-            if book_data.get('anio_lectura'):
-                try:
-                    book_data['anio_lectura'] = int(book_data['anio_lectura'])
-                except ValueError:
-                    book_data['anio_lectura'] = datetime.now().year
-            
-            if book_data.get('paginas'):
-                try:
-                    book_data['paginas'] = int(book_data['paginas'])
-                except ValueError:
-                    book_data['paginas'] = 0
-            
-            # Actualizar el libro
-            self.libro_model.actualizar_libro(book_id, book_data)
+            # El archivo de la portada pudo haber cambiado aunque la ruta sea la misma
+            if book_data.get('portada'):
+                self.covers.invalidar(book_data['portada'])
             
             # Actualizar la vista
-            self._refresh_books_table()
+            self._refresh_books_table(self.view.get_filters())
             
             self.view.show_message(
                 "Éxito", 
@@ -196,6 +346,14 @@ class MainController:
                 'error'
             )
     
+    def _show_validation_errors(self, error: ErrorValidacion):
+        """Muestra los errores de validación de un libro, uno por campo"""
+        self.view.show_message(
+            "Error", 
+            "Revisa los siguientes datos:\n" + "\n".join(f"- {e}" for e in error.errores), 
+            'error'
+        )
+    
     def delete_book(self):
         """Elimina el libro seleccionado"""
         book_id = self.view.get_selected_book_id()
@@ -208,7 +366,8 @@ class MainController:
             if confirm:
                 try:
                     self.libro_model.eliminar_libro(book_id)
-                    self._refresh_books_table()
+                    self._record_change()
+                    self._refresh_books_table(self.view.get_filters())
                     self.view.show_message(
                         "Éxito", 
                         "Libro eliminado correctamente", 
@@ -227,6 +386,78 @@ class MainController:
                 'warning'
             )
     
+    def log_session(self):
+        """Abre el diálogo para registrar una sesión de lectura"""
+        book_id = self.view.get_selected_book_id()
+        if book_id:
+            self.view.show_session_dialog(book_id)
+        else:
+            self.view.show_message(
+                "Advertencia", 
+                "Por favor selecciona un libro primero", 
+                'warning'
+            )
+    
+    def add_session(self, book_id: int, session_data: Dict):
+        """Registra una sesión de lectura para un libro"""
+        try:
+            try:
+                pages = int(session_data.get('paginas') or 0)
+            except ValueError:
+                pages = 0
+            
+            self.sesion_model.registrar_sesion(
+                book_id,
+                session_data['inicio'],
+                session_data['fin'],
+                pages
+            )
+            
+            self.view.show_message(
+                "Éxito", 
+                "Sesión registrada correctamente", 
+                'info'
+            )
+        except Exception as e:
+            self.view.show_message(
+                "Error", 
+                f"No se pudo registrar la sesión: {str(e)}", 
+                'error'
+            )
+    
+    def _record_change(self):
+        """Apila la última versión del diario como acción deshacible"""
+        self._undo_stack.append(self.cambio_model.obtener_version_actual())
+        self._redo_stack.clear()
+    
+    def _revert(self, source: List[int], target: List[int], label: str):
+        """Revierte la última acción de una pila y apila su inversa en la otra"""
+        if not source:
+            self.view.show_message("Información", f"No hay nada para {label}", 'info')
+            return
+        
+        version = self.cambio_model.deshacer(source.pop())
+        if version is None:
+            self.view.show_message(
+                "Advertencia", 
+                f"No se pudo {label}: el libro cambió desde entonces", 
+                'warning'
+            )
+            return
+        
+        target.append(version)
+        self.libro_model.duplicados.invalidar()
+        self.libro_model.indice_tags.invalidar()
+        self._refresh_books_table(self.view.get_filters())
+    
+    def undo(self, event=None):
+        """Deshace la última alta, modificación o baja de un libro"""
+        self._revert(self._undo_stack, self._redo_stack, "deshacer")
+    
+    def redo(self, event=None):
+        """Rehace la última acción deshecha"""
+        self._revert(self._redo_stack, self._undo_stack, "rehacer")
+    
     def generate_report(self):
         """Genera un informe para el libro seleccionado"""
         book_id = self.view.get_selected_book_id()
@@ -271,10 +502,395 @@ class MainController:
                 'error'
             )
     
+    def import_from_csv(self):
+        """Importa libros desde un archivo CSV al perfil activo"""
+        file_path = self.view.get_open_path([('CSV', '*.csv'), ('Todos', '*.*')])
+        if not file_path:
+            return
+        
+        try:
+            result = self.libro_model.importar_desde_csv(file_path)
+        except Exception as e:
+            self.view.show_message("Error", f"No se pudo importar el archivo: {str(e)}", 'error')
+            return
+        
+        if result.validas:
+            self._refresh_books_table(self.view.get_filters())
+        self.view.show_message(
+            "Importación" if not result.errores else "Importación con errores",
+            result.resumen(),
+            'warning' if result.errores else 'info'
+        )
+    
     def show_stats(self):
-        """Muestra las estadísticas de lectura"""
-        stats = self.libro_model.obtener_estadisticas()
-        self.view.show_stats(stats)
+        """Calcula las estadísticas en segundo plano y las muestra al terminar.
+        
+        Si los datos no cambiaron desde la última vez, el modelo las retorna
+        de su caché y la ventana aparece en el siguiente sondeo.
+        """
+        if self._stats_thread and self._stats_thread.is_alive():
+            return
+        
+        result = {}
+        user_id = self.usuario_model.usuario_id
+        
+        def run():
+            try:
+                result['stats'] = self.libro_model.obtener_estadisticas(user_id)
+                result['heatmap'] = self.sesion_model.obtener_mapa_calor()
+            except Exception as e:
+                result['error'] = e
+        
+        self._stats_thread = threading.Thread(target=run, daemon=True)
+        self._stats_thread.start()
+        self.view.set_status("Calculando estadísticas...")
+        self.view.after(20, self._check_stats, result)
+    
+    def _check_stats(self, result: Dict):
+        """Muestra las estadísticas cuando el hilo de cálculo terminó"""
+        if self._stats_thread.is_alive():
+            self.view.after(50, self._check_stats, result)
+            return
+        
+        self.view.set_status("")
+        if 'error' in result:
+            self.view.show_message(
+                "Error", 
+                f"No se pudieron calcular las estadísticas: {str(result['error'])}", 
+                'error'
+            )
+            return
+        self.view.show_stats(result['stats'], result['heatmap'])
+    
+    def show_similar_books(self):
+        """Muestra los libros más parecidos al seleccionado"""
+        book_id = self.view.get_selected_book_id()
+        if not book_id:
+            self.view.show_message(
+                "Advertencia", 
+                "Por favor selecciona un libro primero", 
+                'warning'
+            )
+            return
+        
+        books = self.recomendador.similares(book_id)
+        if not books:
+            self.view.show_message(
+                "Libros Similares", 
+                "No se encontraron libros parecidos", 
+                'info'
+            )
+            return
+        
+        book = self.libro_model.obtener_libros({'id': book_id})[0]
+        self.view.show_similar_books(book['titulo'], books)
+    
+    def show_goals(self):
+        """Abre el diálogo de metas del año actual"""
+        year = datetime.now().year
+        goal = self.meta_model.obtener_meta(year) or {}
+        self.view.show_goals_dialog(year, goal, self.meta_model.obtener_progreso(year))
+    
+    def save_goals(self, year: int, goal_data: Dict):
+        """Guarda la meta anual de libros y páginas"""
+        try:
+            books = int(goal_data.get('libros') or 0)
+            pages = int(goal_data.get('paginas') or 0)
+            if books < 0 or pages < 0:
+                raise ValueError("Las metas no pueden ser negativas")
+        except ValueError as e:
+            self.view.show_message(
+                "Error", 
+                f"Meta inválida: {str(e)}", 
+                'error'
+            )
+            return
+        
+        self.meta_model.fijar_meta(year, books, pages)
+        self._update_goal_progress()
+    
+    def show_duplicates(self):
+        """Muestra los grupos de libros duplicados o casi duplicados"""
+        groups = self.libro_model.agrupar_duplicados()
+        if not groups:
+            self.view.show_message(
+                "Duplicados", 
+                "No se encontraron libros duplicados", 
+                'info'
+            )
+            return
+        self.view.show_duplicates(groups)
+    
+    def _run_scheduled_maintenance(self):
+        """Ejecuta la compactación programada en segundo plano"""
+        result = {}
+        
+        def run():
+            try:
+                result['compacted'] = self.mantenimiento_model.ejecutar_programado()
+            except Exception as e:
+                result['error'] = e
+        
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        self.view.after(200, self._check_scheduled_maintenance, thread, result)
+    
+    def _check_scheduled_maintenance(self, thread: threading.Thread, result: Dict):
+        """Informa el resultado de la compactación programada cuando termina"""
+        if thread.is_alive():
+            self.view.after(200, self._check_scheduled_maintenance, thread, result)
+            return
+        
+        if 'error' in result:
+            self.view.show_message(
+                "Error", 
+                f"No se pudo compactar la base: {str(result['error'])}", 
+                'error'
+            )
+        elif result.get('compacted'):
+            self.view.set_status("Compactación programada completa")
+    
+    def show_maintenance(self):
+        """Muestra el informe de tamaño y fragmentación de la base"""
+        report = self.mantenimiento_model.obtener_informe()
+        report['cache_consultas'] = self.libro_model.cache_consultas.estadisticas()
+        report['catalogo'] = self.catalogo.cantidad()
+        report['bibliotecas'] = list(self.db_manager.bibliotecas)
+        self.view.show_maintenance(report)
+    
+    def attach_library(self):
+        """Adjunta otro archivo de biblioteca para las estadísticas combinadas"""
+        file_path = self.view.get_open_path([('Base SQLite', '*.db'), ('Todos', '*.*')])
+        if not file_path:
+            return
+        
+        # El alias sale del nombre del archivo (solo letras, números y _)
+        alias = re.sub(r'\W', '_', os.path.splitext(os.path.basename(file_path))[0]) or 'biblioteca'
+        if not alias[0].isalpha():
+            alias = 'b_' + alias
+        base, number = alias, 2
+        while alias in self.db_manager.bibliotecas or alias.lower() in ('main', 'temp'):
+            alias, number = f'{base}_{number}', number + 1
+        
+        try:
+            self.db_manager.adjuntar(alias, file_path)
+        except Exception as e:
+            self.view.show_message("Error", f"No se pudo adjuntar la biblioteca: {str(e)}", 'error')
+            return
+        self.view.update_maintenance_status(f"Biblioteca '{alias}' adjuntada")
+    
+    def show_combined_stats(self):
+        """Muestra los totales de la biblioteca propia y de las adjuntas"""
+        try:
+            stats = self.bibliotecas_model.obtener_estadisticas()
+        except Exception as e:
+            self.view.show_message("Error", f"No se pudieron calcular las estadísticas: {str(e)}", 'error')
+            return
+        
+        lines = [
+            f"Total: {stats['total_libros']} libros, {stats['total_paginas']} páginas, "
+            f"promedio {stats['promedio_calificacion']}",
+            ""
+        ]
+        for name, library in stats['por_biblioteca'].items():
+            label = 'Esta biblioteca' if name == 'main' else name
+            lines.append(
+                f"{label}: {library['total_libros']} libros, {library['total_paginas']} páginas, "
+                f"promedio {library['promedio_calificacion']}"
+            )
+        if stats['autores_compartidos']:
+            lines.append("")
+            lines.append("Autores en común:")
+            lines += [f"- {author} ({count} libros)" for author, _, count in stats['autores_compartidos'][:10]]
+        self.view.show_message("Estadísticas combinadas", "\n".join(lines), 'info')
+    
+    def backup_database(self):
+        """Respalda la base en un archivo sin bloquear la interfaz"""
+        if self._backup_task and not self._backup_task.terminado:
+            self.view.show_message(
+                "Advertencia", 
+                "Ya hay un respaldo en curso", 
+                'warning'
+            )
+            return
+        
+        default_name = f"lecturas_respaldo_{datetime.now().strftime('%Y%m%d_%H%M')}.db"
+        file_path = self.view.get_save_path(default_name, '.db', [('Base SQLite', '*.db')])
+        if file_path:
+            self._backup_task = self.mantenimiento_model.respaldar_en_segundo_plano(file_path)
+            self._backup_path = file_path
+            self.view.after(100, self._check_backup)
+    
+    def _check_backup(self):
+        """Consulta el progreso del respaldo en curso"""
+        task = self._backup_task
+        self.view.update_maintenance_status(f"Respaldando... {task.porcentaje:.0f}%")
+        if not task.terminado:
+            self.view.after(100, self._check_backup)
+            return
+        
+        if task.error:
+            self.view.update_maintenance_status("")
+            self.view.show_message(
+                "Error", 
+                f"No se pudo respaldar la base: {str(task.error)}", 
+                'error'
+            )
+        else:
+            self.view.update_maintenance_status("Respaldo completo")
+            self.view.show_message(
+                "Éxito", 
+                f"Base respaldada correctamente en {self._backup_path}", 
+                'info'
+            )
+    
+    def compact_database(self):
+        """Compacta la base y actualiza el informe"""
+        try:
+            report = self.mantenimiento_model.compactar()
+            self.mantenimiento_model.optimizar(analizar=True)
+            self.view.update_maintenance_status(
+                f"Compactada: {report['tamanio_bytes'] / 1024:.0f} KB"
+            )
+        except Exception as e:
+            self.view.show_message(
+                "Error", 
+                f"No se pudo compactar la base: {str(e)}", 
+                'error'
+            )
+    
+    def import_catalogue(self):
+        """Importa un volcado de Open Library o un CSV al catálogo local"""
+        if self._catalogue_task and not self._catalogue_task.terminado:
+            self.view.show_message("Advertencia", "Ya hay una tarea del catálogo en curso", 'warning')
+            return
+        
+        file_path = self.view.get_open_path([
+            ('Volcado de Open Library', '*.txt *.gz'), ('CSV', '*.csv'), ('Todos', '*.*')
+        ])
+        if not file_path:
+            return
+        
+        task = TareaCompletado()
+        
+        def run():
+            try:
+                task.completados = self.catalogo.importar(
+                    file_path, progreso=lambda count: setattr(task, 'procesados', count)
+                )
+            except Exception as e:
+                task.error = e
+            finally:
+                task.terminado = True
+        
+        threading.Thread(target=run, daemon=True).start()
+        self._catalogue_task = task
+        self.view.after(200, self._check_catalogue_task, "Importando", "ediciones importadas")
+    
+    def enrich_library(self):
+        """Completa editorial, páginas y género de los libros con ISBN"""
+        if self._catalogue_task and not self._catalogue_task.terminado:
+            self.view.show_message("Advertencia", "Ya hay una tarea del catálogo en curso", 'warning')
+            return
+        
+        self._catalogue_task = self.enriquecedor.completar_en_segundo_plano(self.libro_model)
+        self.view.after(200, self._check_catalogue_task, "Completando", "libros completados")
+    
+    def _check_catalogue_task(self, action: str, done_label: str):
+        """Consulta el progreso de la tarea del catálogo en curso"""
+        task = self._catalogue_task
+        if not task.terminado:
+            self.view.update_maintenance_status(f"{action}... {task.procesados}")
+            self.view.after(200, self._check_catalogue_task, action, done_label)
+            return
+        
+        if task.error:
+            self.view.update_maintenance_status("")
+            self.view.show_message(
+                "Error", 
+                f"No se pudo completar la tarea: {str(task.error)}", 
+                'error'
+            )
+            return
+        
+        self.view.update_maintenance_status(f"{task.completados} {done_label}")
+        if task.completados and action == "Completando":
+            # Los cambios en lote no pasan por la pila de deshacer
+            self._undo_stack.clear()
+            self._redo_stack.clear()
+            self._refresh_books_table(self.view.get_filters())
+    
+    def sync_library(self):
+        """Sincroniza la biblioteca en ambos sentidos con una réplica local"""
+        file_path = self.view.get_save_path(
+            "lecturas_replica.db", '.db', [('Base SQLite', '*.db')], confirm_overwrite=False
+        )
+        if not file_path:
+            return
+        
+        try:
+            result = self.sincronizacion_model.sincronizar_con(file_path)
+        except Exception as e:
+            self.view.show_message(
+                "Error", 
+                f"No se pudo sincronizar: {str(e)}", 
+                'error'
+            )
+            return
+        
+        # Los cambios recibidos no pasan por la pila de deshacer
+        self._undo_stack.clear()
+        self._redo_stack.clear()
+        self.libro_model.duplicados.invalidar()
+        self.libro_model.indice_tags.invalidar()
+        self._refresh_books_table(self.view.get_filters())
+        
+        sent, received = result['enviados'], result['recibidos']
+        self.view.show_message(
+            "Sincronización", 
+            f"Enviados: {sent['insertados']} nuevos, {sent['actualizados']} modificados, "
+            f"{sent['borrados']} eliminados\n"
+            f"Recibidos: {received['insertados']} nuevos, {received['actualizados']} modificados, "
+            f"{received['borrados']} eliminados", 
+            'info'
+        )
+    
+    def switch_profile(self, user_id: int):
+        """Cambia el perfil activo y recarga sus libros"""
+        if user_id == self.usuario_model.usuario_id:
+            return
+        
+        # Guardar el estado de la interfaz del perfil anterior
+        self.usuario_model.obtener_preferencias().actualizar(
+            anchos_columnas=self.view.get_column_widths()
+        )
+        self._schedule_preferences_save()
+        
+        for model in (self.usuario_model, self.libro_model, self.sesion_model, self.meta_model,
+                      self.bibliotecas_model):
+            model.seleccionar_usuario(user_id)
+        self._undo_stack.clear()
+        self._redo_stack.clear()
+        
+        self.view.update_user_info(self.usuario_model.obtener_usuario())
+        self._apply_preferences()
+    
+    def create_profile(self):
+        """Crea un nuevo perfil y lo activa"""
+        name = self.view.ask_text("Nuevo Perfil", "Nombre del lector:")
+        if not name or not name.strip():
+            return
+        
+        try:
+            user_id = self.usuario_model.crear_usuario({'nombre': name.strip()})
+            self.view.populate_profiles(self.usuario_model.obtener_usuarios(), user_id)
+            self.switch_profile(user_id)
+        except Exception as e:
+            self.view.show_message(
+                "Error", 
+                f"No se pudo crear el perfil: {str(e)}", 
+                'error'
+            )
     
     def edit_user(self):
         """Abre el diálogo para editar los datos del usuario"""
@@ -300,6 +916,7 @@ class MainController:
             
             # Actualizar la vista
             self.view.update_user_info(updated_data)
+            self.view.populate_profiles(self.usuario_model.obtener_usuarios(), updated_data['id'])
             
             self.view.show_message(
                 "Éxito", 
@@ -321,10 +938,19 @@ class MainController:
         1. Agregar Libros:
            - Completa el formulario en la sección "Agregar Nuevo Libro".
            - Los campos Título y Autor son obligatorios.
+           - En "Etiquetas" podés poner varias separadas por comas.
         
         2. Filtrar Libros:
            - Usa los filtros arriba de la tabla para buscar libros específicos.
            - Puedes filtrar por año, género y calificación.
+           - En "Buscar" podés combinar campos y texto libre, por ejemplo:
+             autor:borges año:2020..2023 calif>=4 paginas<300 "texto libre"
+             Campos: titulo, autor, editorial, comentario, genero, estado,
+             año, fecha, calif, paginas, etiqueta, isbn, escritos sin
+             espacios (autor:borges). Un "-" adelante excluye
+             (-estado:leído) y a..b es un rango.
+           - En "Etiquetas" escribí o elegí varias, separadas por comas, y
+             elegí si el libro debe tener todas o alguna.
         
         3. Acciones sobre Libros:
            - Haz clic derecho en un libro para ver opciones:
@@ -332,19 +958,55 @@ class MainController:
              * Editar Libro: Modifica los datos del libro.
              * Eliminar Libro: Borra el libro del registro.
              * Generar Informe: Crea un informe detallado.
+             * Registrar Sesión: Anota cuándo y cuántas páginas leíste.
+             * Libros Similares: Busca libros parecidos por autor, género y editorial.
         
         4. Exportar Datos:
            - Usa el botón "Exportar CSV" para guardar tus libros en un archivo.
+           - "Importar CSV" agrega los libros de un archivo con encabezado (por
+             ejemplo, uno exportado); las filas con errores se informan y no se cargan.
         
         5. Estadísticas:
            - El botón "Estadísticas" muestra un resumen de tus lecturas.
+        
+        6. Duplicados:
+           - Al agregar un libro se avisa si ya hay uno igual o parecido.
+           - El botón "Duplicados" revisa toda la biblioteca.
+        
+        7. Perfiles:
+           - Elegí el lector activo en el panel de usuario o creá uno nuevo con "➕".
+           - Cada perfil tiene sus propios libros y estadísticas.
+        
+        8. Deshacer y Rehacer:
+           - Ctrl+Z deshace la última alta, edición o eliminación de un libro.
+           - Ctrl+Y la vuelve a aplicar.
+        
+        9. Mantenimiento:
+           - Muestra el tamaño de la base y permite respaldarla o compactarla.
+        
+        10. Metas:
+           - Fijá cuántos libros y páginas querés leer este año con "Metas".
+           - El encabezado muestra tu avance y avisa si a tu ritmo actual no llegás.
+        
+        11. Sincronizar:
+           - Intercambia solo los cambios desde la última vez con otra copia de la base.
+           - Si un libro cambió en ambas, gana la modificación más reciente.
+        
+        12. ISBN:
+           - Escribí el ISBN y tocá "🔎" para completar título, autor y demás datos.
+           - En Mantenimiento podés importar un catálogo (volcado de Open Library o CSV)
+             y completar los libros ya cargados que tengan ISBN.
         """
         
         self.view.show_message("Ayuda", help_text.strip(), 'info')
 
-def run_app():
+def run_app(profile: bool = False, use_cprofile: bool = False, profile_dir: str = 'perfil',
+            group_commit: Optional[Tuple[int, int]] = None):
     """Función para iniciar la aplicación"""
-    controller = MainController()
+    if group_commit:
+        modelo.db_manager.activar_escritura_agrupada(*group_commit)
+    profiler = Perfilador(profile_dir, use_cprofile) if profile or use_cprofile else None
+    MainController(profiler).run()
 
 if __name__ == "__main__":
     run_app()
\ No newline at end of file
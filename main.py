@@ -19,10 +19,53 @@ Descripción:
 
 Dependencias:
 - Python 3.13.3
-- Módulos estándar: tkinter, typing, os, datetime
+- Módulos estándar: argparse, sys, tkinter, typing, os, datetime
+
+Uso:
+    python main.py [--profile] [--cprofile] [--profile-dir perfil]
+                   [--group-commit] [--group-commit-ops 50] [--group-commit-ms 200]
+    python main.py --import-csv libros.csv
+    python main.py [--config config.json] [--db ruta.db] [--pragma nombre=valor]
+                   [--adjuntar alias=otra.db]
 """
 
+import argparse
+import sys
+
+import modelo
+from configuracion import agregar_argumentos, cargar_configuracion
 from controlador import run_app
 
 if __name__ == "__main__":
-    run_app()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Registro de Lecturas')
+    agregar_argumentos(parser)
+    parser.add_argument('--profile', action='store_true',
+                        help='Mide cada acción y la latencia de la interfaz')
+    parser.add_argument('--cprofile', action='store_true',
+                        help='Además guarda un perfil cProfile por acción (implica --profile)')
+    parser.add_argument('--profile-dir', default='perfil',
+                        help='Directorio donde se guardan los resultados del perfilado')
+    parser.add_argument('--group-commit', action='store_true',
+                        help='Confirma las escrituras en grupos (más rápido; ante un corte '
+                             'se pierden a lo sumo las últimas operaciones del grupo)')
+    parser.add_argument('--group-commit-ops', type=int, default=50,
+                        help='Operaciones por grupo en --group-commit')
+    parser.add_argument('--group-commit-ms', type=int, default=200,
+                        help='Milisegundos máximos antes de confirmar un grupo')
+    parser.add_argument('--import-csv', metavar='ARCHIVO',
+                        help='Importa libros desde un CSV sin abrir la interfaz y muestra los errores')
+    args = parser.parse_args()
+    
+    # La base se abre con la configuración del archivo, el entorno y la línea de comandos
+    try:
+        modelo.configurar(cargar_configuracion(args))
+    except (OSError, ValueError) as e:
+        parser.error(f"Configuración inválida: {e}")
+    
+    if args.import_csv:
+        resultado = modelo.libro_model.importar_desde_csv(args.import_csv)
+        print(resultado.resumen(limite=50))
+        sys.exit(1 if resultado.errores else 0)
+    
+    group_commit = (args.group_commit_ops, args.group_commit_ms) if args.group_commit else None
+    run_app(args.profile, args.cprofile, args.profile_dir, group_commit)
\ No newline at end of file
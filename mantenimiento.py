@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Registro de Lecturas - mantenimiento.py
+
+Autor: Sebastian Sanchez Bentolila
+Email: sebastiansb3004@gmail.com
+Versión: 1.0.0
+Última modificación: 29/07/2025
+Licencia: MIT
+Copyright: © 2025 - Todos los derechos reservados
+
+Descripción:
+- Respaldos en caliente de la base con la API de backup de sqlite3
+- Compactación (VACUUM / VACUUM INTO) programada
+- Optimización de estadísticas del planificador e informe de tamaño
+
+
+Dependencias:
+- Python 3.13.3
+- Módulos estándar: sqlite3, os, threading, time, datetime, typing
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+
+from modelo import DatabaseManager
+
+class TareaRespaldo:
+    """Respaldo que corre en un hilo aparte y expone su progreso"""
+
+    def __init__(self):
+        self.total = 0
+        self.restantes = 0
+        self.error: Optional[Exception] = None
+        self.terminado = False
+
+    @property
+    def porcentaje(self) -> float:
+        """Porcentaje de páginas copiadas"""
+        if not self.total:
+            return 100.0 if self.terminado else 0.0
+        return 100.0 * (self.total - self.restantes) / self.total
+
+class MantenimientoModel:
+    """Tareas de mantenimiento sobre el archivo de la base de datos"""
+
+    def __init__(self, db_manager: DatabaseManager):
+        self.db = db_manager
+        self.db.execute_query('''
+            CREATE TABLE IF NOT EXISTS mantenimiento (
+                clave TEXT PRIMARY KEY,
+                valor TEXT
+            )
+        ''')
+
+    def respaldar(self, destino: str, paginas_por_paso: int = 256, pausa: float = 0.005,
+                  progreso: Optional[Callable[[int, int], None]] = None) -> bool:
+        """Copia la base a destino mientras sigue en uso.
+
+        La copia avanza de a paginas_por_paso páginas y cede el lock entre
+        pasos, así las escrituras de la aplicación no quedan bloqueadas.
+        """
+        # La copia incluye las escrituras agrupadas todavía sin confirmar
+        self.db.confirmar()
+        origen = self.db._conectar()
+        copia = sqlite3.connect(destino)
+        try:
+            with copia:
+                origen.backup(
+                    copia,
+                    pages=paginas_por_paso,
+                    progress=lambda estado, restantes, total: self._paso_respaldo(
+                        restantes, total, pausa, progreso
+                    )
+                )
+        finally:
+            copia.close()
+            origen.close()
+
+        self._guardar_valor('ultimo_respaldo', datetime.now().isoformat(timespec='seconds'))
+        return True
+
+    @staticmethod
+    def _paso_respaldo(restantes: int, total: int, pausa: float,
+                       progreso: Optional[Callable[[int, int], None]]):
+        """Informa el progreso y cede el lock entre pasos del respaldo"""
+        if progreso:
+            progreso(restantes, total)
+        if pausa:
+            time.sleep(pausa)
+
+    def respaldar_en_segundo_plano(self, destino: str, paginas_por_paso: int = 256) -> TareaRespaldo:
+        """Inicia un respaldo en un hilo y retorna la tarea para consultar su progreso"""
+        tarea = TareaRespaldo()
+
+        def actualizar(restantes, total):
+            tarea.restantes = restantes
+            tarea.total = total
+
+        def ejecutar():
+            try:
+                self.respaldar(destino, paginas_por_paso, progreso=actualizar)
+            except Exception as e:
+                tarea.error = e
+            finally:
+                tarea.terminado = True
+
+        threading.Thread(target=ejecutar, daemon=True).start()
+        return tarea
+
+    def compactar(self, destino: Optional[str] = None) -> Dict:
+        """Compacta la base y retorna el informe resultante.
+
+        Con destino escribe una copia compacta con VACUUM INTO sin tocar la
+        base en uso; sin destino ejecuta VACUUM sobre la propia base.
+        
+        Corre con el lock de la unidad de trabajo tomado: las escrituras de
+        la aplicación (transacciones y escritura agrupada) esperan a que
+        termine en lugar de colarse entre el volcado y el VACUUM.
+        """
+        with self.db._lock_trabajo:
+            # VACUUM no puede correr con una transacción abierta en otra conexión
+            self.db.confirmar()
+            conn = self.db._conectar()
+            try:
+                if destino:
+                    if os.path.exists(destino):
+                        os.remove(destino)
+                    conn.execute('VACUUM INTO ?', (destino,))
+                else:
+                    conn.execute('VACUUM')
+            finally:
+                conn.close()
+
+        self._guardar_valor('ultima_compactacion', datetime.now().isoformat(timespec='seconds'))
+        return self.obtener_informe()
+
+    def optimizar(self, analizar: bool = False):
+        """Actualiza las estadísticas del planificador tras cambios masivos"""
+        conn = self.db._conectar()
+        try:
+            if analizar:
+                conn.execute('ANALYZE')
+            conn.execute('PRAGMA optimize')
+            conn.commit()
+        finally:
+            conn.close()
+
+    def obtener_informe(self) -> Dict:
+        """Retorna el tamaño y la fragmentación de la base"""
+        conn = self.db._conectar()
+        try:
+            tamanio_pagina = conn.execute('PRAGMA page_size').fetchone()[0]
+            paginas = conn.execute('PRAGMA page_count').fetchone()[0]
+            libres = conn.execute('PRAGMA freelist_count').fetchone()[0]
+
+            # Tamaño por tabla e índice (solo si SQLite se compiló con dbstat)
+            tablas = {}
+            try:
+                filas = conn.execute('''
+                    SELECT name, SUM(pgsize), SUM(unused)
+                    FROM dbstat GROUP BY name ORDER BY SUM(pgsize) DESC
+                ''').fetchall()
+                tablas = {nombre: {'bytes': total, 'sin_usar': sin_usar}
+                          for nombre, total, sin_usar in filas}
+            except sqlite3.OperationalError:
+                pass
+        finally:
+            conn.close()
+
+        # Páginas libres más el espacio sin usar dentro de las páginas ocupadas
+        sin_usar = libres * tamanio_pagina + sum(t['sin_usar'] for t in tablas.values())
+        total = paginas * tamanio_pagina
+
+        wal = self.db.db_name + '-wal'
+        return {
+            'archivo': self.db.db_name,
+            'tamanio_bytes': os.path.getsize(self.db.db_name) if self.db.persistente else total,
+            'tamanio_wal_bytes': os.path.getsize(wal) if os.path.exists(wal) else 0,
+            'tamanio_pagina': tamanio_pagina,
+            'paginas': paginas,
+            'paginas_libres': libres,
+            'fragmentacion': sin_usar / total if total else 0.0,
+            'tablas': tablas,
+            'ultimo_respaldo': self._leer_valor('ultimo_respaldo'),
+            'ultima_compactacion': self._leer_valor('ultima_compactacion')
+        }
+
+    def ejecutar_programado(self, dias: int = 7, umbral_fragmentacion: float = 0.3) -> bool:
+        """Compacta la base si pasaron más de `dias` desde la última vez y está fragmentada.
+        
+        Compacta en el lugar (VACUUM con el lock de la unidad de trabajo, ver
+        compactar); los errores, como una base bloqueada por otro proceso,
+        se propagan para que quien la programó los informe.
+        """
+        ultima = self._leer_valor('ultima_compactacion')
+        if ultima and datetime.fromisoformat(ultima) > datetime.now() - timedelta(days=dias):
+            return False
+
+        if self.obtener_informe()['fragmentacion'] < umbral_fragmentacion:
+            return False
+
+        self.compactar()
+        self.optimizar(analizar=True)
+        return True
+
+    def _leer_valor(self, clave: str) -> Optional[str]:
+        """Lee un valor de la tabla de mantenimiento"""
+        filas = self.db.execute_query(
+            'SELECT valor FROM mantenimiento WHERE clave = ?', (clave,), fetch=True
+        )
+        return filas[0][0] if filas else None
+
+    def _guardar_valor(self, clave: str, valor: str):
+        """Guarda un valor en la tabla de mantenimiento"""
+        self.db.execute_query('''
+            INSERT INTO mantenimiento (clave, valor) VALUES (?, ?)
+            ON CONFLICT (clave) DO UPDATE SET valor = excluded.valor
+        ''', (clave, valor))
@@ -15,24 +15,271 @@ Descripción:
 - Gestiona toda la interacción con la base de datos
 - Define las estructuras de datos principales
 - Maneja la lógica de persistencia
+- Almacenamientos intercambiables: SQLite, en memoria y DuckDB (opcional)
+- Esquema de validación de libros compartido por formulario, importación y CLI
+- Etiquetas libres por libro con filtros Y/O resueltos con bitsets en memoria
+- Búsqueda con el lenguaje de consultas (consultas.py) e índice de texto
+  completo FTS5 sobre título, autor, editorial y comentario
+- Ruta, PRAGMAs y bibliotecas adjuntas según la configuración (configuracion.py);
+  la base de la aplicación se abre recién cuando se usa por primera vez
 
 
 Dependencias:
 - Python 3.13.3
-- Módulos estándar: sqlite3, json, typing, os, datetime
+- Módulos estándar: sqlite3, atexit, contextlib, itertools, json, typing, os, datetime, threading
+- Opcional: duckdb (almacenamiento 'duckdb' para consultas analíticas)
 """
 
 import sqlite3
+import atexit
 import json
 import os
-from datetime import datetime
-from typing import List, Dict, Optional, Tuple
+import hashlib
+import itertools
+import string
+import threading
+import unicodedata
+import uuid
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field, fields
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Dict, Optional, Protocol, Tuple, Set
+
+from configuracion import Configuracion, RUTA_DB_POR_DEFECTO, cargar_configuracion, validar_alias, validar_pragma
+from validacion import Campo, Esquema, ResultadoLote
+from consultas import CampoConsulta, LenguajeConsultas
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+# Columnas públicas de la tabla libros, en el orden en que se devuelven
+LIBRO_COLUMNAS = [
+    'id', 'titulo', 'autor', 'genero', 'subgenero', 'anio_lectura',
+    'fecha_lectura', 'calificacion', 'paginas', 'editorial',
+    'comentario', 'fecha_creacion', 'fecha_actualizacion', 'usuario_id', 'estado',
+    'portada', 'isbn'
+]
+
+# Estados de lectura de un libro; solo los leídos tienen año y fecha de lectura
+ESTADOS = ('leído', 'leyendo', 'por leer')
+ESTADO_POR_DEFECTO = 'leído'
+
+_TABLA_PUNTUACION = str.maketrans({c: ' ' for c in string.punctuation + '¡¿«»“”‘’–—…'})
+
+def normalizar_texto(texto: str) -> str:
+    """Normaliza un texto para comparar: sin acentos, sin puntuación y en minúsculas"""
+    texto = unicodedata.normalize('NFKD', texto or '')
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    texto = texto.casefold().translate(_TABLA_PUNTUACION)
+    return ' '.join(texto.split())
+
+def clave_duplicado(titulo: str, autor: str) -> str:
+    """Retorna la clave de deduplicación (hash del título y autor normalizados)"""
+    base = f"{normalizar_texto(titulo)}|{normalizar_texto(autor)}"
+    return hashlib.sha1(base.encode('utf-8')).hexdigest()[:16]
+
+def normalizar_tags(tags: List[str]) -> List[str]:
+    """Etiquetas en minúsculas, con espacios simples y sin repetidas"""
+    normalizadas = []
+    for tag in tags:
+        tag = ' '.join(tag.lower().split())[:40]
+        if tag and tag not in normalizadas:
+            normalizadas.append(tag)
+    return normalizadas
+
+def normalizar_isbn(texto: str) -> Optional[str]:
+    """Retorna el ISBN-13 de un ISBN-10 o ISBN-13 válido (con o sin guiones), o None"""
+    digitos = ''.join(c for c in (texto or '').upper() if c.isdigit() or c == 'X')
+    if len(digitos) == 10 and digitos[:9].isdigit():
+        valores = [10 if c == 'X' else int(c) for c in digitos]
+        if sum((10 - i) * v for i, v in enumerate(valores)) % 11:
+            return None
+        digitos = '978' + digitos[:9]
+    elif len(digitos) == 13 and digitos.isdigit():
+        if digitos[12] != _control_isbn13(digitos):
+            return None
+        return digitos
+    else:
+        return None
+    return digitos + _control_isbn13(digitos)
+
+def _control_isbn13(digitos: str) -> str:
+    """Dígito de control de los primeros 12 dígitos de un ISBN-13"""
+    suma = sum((3 if i % 2 else 1) * int(c) for i, c in enumerate(digitos[:12]))
+    return str((10 - suma % 10) % 10)
+
+def _fechas_solo_leidos(columnas: Dict[str, List]):
+    """Solo los libros leídos tienen año y fecha de lectura"""
+    for i, estado in enumerate(columnas['estado']):
+        if estado != 'leído':
+            columnas['anio_lectura'][i] = None
+            columnas['fecha_lectura'][i] = None
+
+# Esquema de un libro: lo usan el formulario, el diálogo de edición, la
+# importación de CSV y la línea de comandos
+ESQUEMA_LIBRO = Esquema([
+    Campo('titulo', requerido=True, etiqueta='Título'),
+    Campo('autor', requerido=True, etiqueta='Autor'),
+    Campo('genero', defecto='', etiqueta='Género'),
+    Campo('subgenero', defecto='', etiqueta='Subgénero'),
+    Campo('estado', defecto=ESTADO_POR_DEFECTO, opciones=ESTADOS, etiqueta='Estado'),
+    Campo('anio_lectura', 'entero', defecto=lambda: datetime.now().year,
+          minimo=1000, maximo=2100, etiqueta='Año de lectura'),
+    Campo('fecha_lectura', 'fecha', defecto=lambda: date.today().isoformat(),
+          etiqueta='Fecha de lectura'),
+    Campo('calificacion', 'real', defecto=0.0, minimo=0, maximo=5, etiqueta='Calificación'),
+    Campo('paginas', 'entero', defecto=0, minimo=0, etiqueta='Páginas'),
+    Campo('editorial', defecto='', etiqueta='Editorial'),
+    Campo('comentario', defecto='', etiqueta='Comentario'),
+    Campo('portada', etiqueta='Portada'),
+    Campo('isbn', transformar=normalizar_isbn, etiqueta='ISBN'),
+    Campo('tags', 'lista', transformar=normalizar_tags, etiqueta='Etiquetas')
+], ajustes=[_fechas_solo_leidos])
+
+# Campos del buscador (autor:borges año:2020..2023 calif>=4 "texto libre")
+CONSULTA_LIBRO = LenguajeConsultas([
+    CampoConsulta('titulo', 'titulo', alias=('título',), fts=True),
+    CampoConsulta('autor', 'autor', fts=True),
+    CampoConsulta('editorial', 'editorial', fts=True),
+    CampoConsulta('comentario', 'comentario', alias=('nota',), fts=True),
+    CampoConsulta('genero', 'genero', alias=('género',)),
+    CampoConsulta('subgenero', 'subgenero', alias=('subgénero',)),
+    CampoConsulta('isbn', 'isbn', transformar=lambda valor: normalizar_isbn(valor) or valor),
+    CampoConsulta('estado', 'estado', 'opcion', opciones=ESTADOS),
+    CampoConsulta('año', 'anio_lectura', 'entero', alias=('anio', 'anio_lectura')),
+    CampoConsulta('fecha', 'fecha_lectura', 'fecha'),
+    CampoConsulta('calif', 'calificacion', 'real', alias=('calificacion', 'calificación')),
+    CampoConsulta('paginas', 'paginas', 'entero', alias=('páginas',)),
+    CampoConsulta(
+        'etiqueta', tipo='subconsulta', alias=('tag', 'etiquetas', 'tags'),
+        sql='id IN (SELECT lt.libro_id FROM libro_tags lt JOIN tags t ON t.id = lt.tag_id WHERE t.nombre = ?)',
+        transformar=lambda valor: ' '.join(valor.lower().split())
+    )
+], tabla_fts='libros_fts')
+
+class Almacenamiento(Protocol):
+    """Lo que los modelos necesitan de un almacenamiento.
+    
+    Los modelos hablan SQL de SQLite (triggers, índices parciales, UPSERT),
+    así que el contrato es a nivel de conexión: conexiones compatibles con
+    sqlite3, una versión de datos para invalidar cachés, transacciones y una
+    vía aparte para las consultas analíticas de solo lectura.
+    """
+    
+    db_name: str
+    persistente: bool
+    tiene_fts: bool
+    
+    def _get_connection(self): ...
+    
+    def _conectar(self, **opciones) -> sqlite3.Connection: ...
+    
+    def execute_query(self, query: str, params: Tuple = (), fetch: bool = False): ...
+    
+    def consultar_analitica(self, query: str, params: Tuple = ()) -> List[Tuple]: ...
+    
+    def obtener_version_datos(self) -> int: ...
+    
+    def obtener_usuario_por_defecto(self) -> int: ...
+    
+    def transaccion(self): ...
+    
+    def confirmar(self): ...
+    
+    def cerrar(self): ...
+
+class _ConexionTrabajo:
+    """Conexión compartida que ven los modelos mientras hay una unidad de trabajo.
+    
+    Cada bloque with es un savepoint: si falla se deshace solo ese bloque, y
+    commit() no confirma en disco sino que anota la operación para el
+    próximo volcado del DatabaseManager.
+    """
+    
+    def __init__(self, db: 'DatabaseManager'):
+        self._db = db
+    
+    def __getattr__(self, nombre):
+        return getattr(self._db._conexion_trabajo, nombre)
+    
+    def __enter__(self):
+        self._db._lock_trabajo.acquire()
+        try:
+            self._db._abrir_savepoint()
+        except Exception:
+            self._db._lock_trabajo.release()
+            raise
+        return self
+    
+    def __exit__(self, tipo, valor, traza):
+        try:
+            self._db._cerrar_savepoint(exito=tipo is None)
+        finally:
+            self._db._lock_trabajo.release()
+        return False
+    
+    def commit(self):
+        """Marca el bloque actual como escritura (se confirma en el volcado)"""
+        self._db._pila_savepoints[-1] = True
+    
+    def rollback(self):
+        """Deshace solo lo hecho en el bloque actual"""
+        self._db._conexion_trabajo.execute(f'ROLLBACK TO sp{len(self._db._pila_savepoints) - 1}')
+        self._db._pila_savepoints[-1] = False
 
 class DatabaseManager:
-    """Clase para manejar la conexión y operaciones con la base de datos SQLite"""
+    """Clase para manejar la conexión y operaciones con la base de datos SQLite.
     
-    def __init__(self, db_name: str = 'db\\lecturas.db'):
+    Es el almacenamiento por defecto (ver Almacenamiento y crear_almacenamiento).
+    
+    Por defecto cada escritura se confirma (y sincroniza a disco) por su cuenta.
+    Con transaccion() o el modo de escritura agrupada, las operaciones pasan
+    por una única conexión y se confirman juntas:
+    
+    - transaccion(): el bloque entero se confirma o se deshace junto.
+    - Escritura agrupada: las operaciones se acumulan y se confirman en una
+      sola transacción cada max_operaciones o max_ms milisegundos. Si el
+      proceso muere antes del volcado se pierden a lo sumo esas últimas
+      operaciones, pero nunca queda una operación a medias: cada una es un
+      savepoint y el diario de SQLite descarta la transacción sin confirmar.
+      Las lecturas del propio proceso ya ven lo pendiente; otros procesos
+      y conexiones propias (servidor, respaldo) solo ven lo confirmado.
+    """
+    
+    persistente = True
+    tiene_fts = False
+    
+    def __init__(self, db_name: str = RUTA_DB_POR_DEFECTO, pragmas: Optional[Dict[str, str]] = None,
+                 bibliotecas: Optional[Dict[str, str]] = None):
         self.db_name = db_name
+        directorio = os.path.dirname(db_name)
+        if directorio and db_name != ':memory:':
+            os.makedirs(directorio, exist_ok=True)
+        self.pragmas = {nombre: validar_pragma(nombre, valor) for nombre, valor in (pragmas or {}).items()}
+        self._conexion_version = None
+        self._lock_version = threading.Lock()
+        
+        # Unidad de trabajo (transacciones explícitas y escritura agrupada)
+        self._conexion_trabajo: Optional[sqlite3.Connection] = None
+        self._vista_trabajo = _ConexionTrabajo(self)
+        self._lock_trabajo = threading.RLock()
+        self._pila_savepoints: List[bool] = []
+        self._operaciones_pendientes = 0
+        self._escrituras_locales = 0
+        self._agrupado = False
+        self.max_operaciones = 50
+        self.max_ms = 200
+        self._temporizador: Optional[threading.Timer] = None
+        
+        # Otras bibliotecas adjuntas a cada conexión (alias -> ruta)
+        self.bibliotecas: Dict[str, str] = {}
+        for alias, ruta in (bibliotecas or {}).items():
+            self.adjuntar(alias, ruta)
+        
         self._initialize_database()
         
     def _initialize_database(self):
@@ -59,6 +306,16 @@ class DatabaseManager:
                 )
             ''')
             
+            # Clave de deduplicación (se agrega a bases existentes)
+            self._asegurar_columna(cursor, 'libros', 'clave_dedup', 'TEXT')
+            pendientes = cursor.execute(
+                'SELECT id, titulo, autor FROM libros WHERE clave_dedup IS NULL'
+            ).fetchall()
+            cursor.executemany(
+                'UPDATE libros SET clave_dedup = ? WHERE id = ?',
+                [(clave_duplicado(titulo, autor), libro_id) for libro_id, titulo, autor in pendientes]
+            )
+            
             # Tabla de usuario
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS usuario (
@@ -72,6 +329,21 @@ class DatabaseManager:
                 )
             ''')
             
+            # Sesiones de lectura: tabla de solo agregado ordenada por tiempo
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS sesiones (
+                    inicio TEXT NOT NULL,
+                    libro_id INTEGER NOT NULL,
+                    fin TEXT NOT NULL,
+                    paginas INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (inicio, libro_id)
+                ) WITHOUT ROWID
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_sesiones_libro
+                ON sesiones (libro_id, inicio)
+            ''')
+            
             # Insertar usuario por defecto si no existe
             cursor.execute('SELECT COUNT(*) FROM usuario')
             if cursor.fetchone()[0] == 0:
@@ -80,11 +352,413 @@ class DatabaseManager:
                     VALUES (?, ?, ?, ?)
                 ''', ('Lector', 'lector@example.com', 'default_avatar.png', '{}'))
             
+            # Perfil dueño de cada libro (los existentes pasan al primer perfil)
+            self._asegurar_columna(cursor, 'libros', 'usuario_id', 'INTEGER REFERENCES usuario(id)')
+            cursor.execute('''
+                UPDATE libros SET usuario_id = (SELECT MIN(id) FROM usuario)
+                WHERE usuario_id IS NULL
+            ''')
+            
+            # Identificador global para sincronizar entre copias de la base
+            self._asegurar_columna(cursor, 'libros', 'uuid', 'TEXT')
+            sin_uuid = cursor.execute('SELECT id FROM libros WHERE uuid IS NULL').fetchall()
+            cursor.executemany(
+                'UPDATE libros SET uuid = ? WHERE id = ?',
+                [(uuid.uuid4().hex, libro_id) for (libro_id,) in sin_uuid]
+            )
+            cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_libros_uuid ON libros (uuid)')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_libros_actualizacion
+                ON libros (fecha_actualizacion)
+            ''')
+            
+            # Lápidas de libros eliminados, para propagar las bajas al sincronizar
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS libros_borrados (
+                    uuid TEXT PRIMARY KEY,
+                    usuario_id INTEGER,
+                    fecha_borrado TIMESTAMP NOT NULL
+                ) WITHOUT ROWID
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_libros_borrados_fecha
+                ON libros_borrados (fecha_borrado)
+            ''')
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_libros_lapida AFTER DELETE ON libros
+                WHEN OLD.uuid IS NOT NULL
+                BEGIN
+                    INSERT OR REPLACE INTO libros_borrados (uuid, usuario_id, fecha_borrado)
+                    VALUES (OLD.uuid, OLD.usuario_id, CURRENT_TIMESTAMP);
+                END
+            ''')
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_libros_revive AFTER INSERT ON libros
+                BEGIN
+                    DELETE FROM libros_borrados WHERE uuid = NEW.uuid;
+                END
+            ''')
+            
+            # Estado de lectura, con un índice parcial por estado para que la vista
+            # de leídos no recorra la lista de pendientes (y viceversa). El parcial
+            # de leídos reemplaza al índice completo por perfil y fecha de lectura.
+            self._asegurar_columna(
+                cursor, 'libros', 'estado',
+                f"TEXT NOT NULL DEFAULT '{ESTADO_POR_DEFECTO}' "
+                f"CHECK (estado IN ({', '.join(repr(e) for e in ESTADOS)}))"
+            )
+            for nombre, columnas, estado in [
+                ('idx_libros_leidos', 'usuario_id, fecha_lectura', 'leído'),
+                ('idx_libros_leyendo', 'usuario_id, fecha_actualizacion', 'leyendo'),
+                ('idx_libros_por_leer', 'usuario_id, fecha_creacion', 'por leer')
+            ]:
+                cursor.execute(
+                    f"CREATE INDEX IF NOT EXISTS {nombre} ON libros ({columnas}) WHERE estado = '{estado}'"
+                )
+            
+            # Ruta de la imagen de portada (las miniaturas se cachean aparte)
+            self._asegurar_columna(cursor, 'libros', 'portada', 'TEXT')
+            
+            # ISBN-13 normalizado, para completar datos desde el catálogo
+            self._asegurar_columna(cursor, 'libros', 'isbn', 'TEXT')
+            cursor.execute(
+                'CREATE INDEX IF NOT EXISTS idx_libros_usuario_isbn ON libros (usuario_id, isbn) '
+                'WHERE isbn IS NOT NULL'
+            )
+            
+            # Etiquetas libres por perfil y su relación con los libros, indexada
+            # en ambos sentidos (etiquetas de un libro y libros de una etiqueta)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS tags (
+                    id INTEGER PRIMARY KEY,
+                    usuario_id INTEGER NOT NULL,
+                    nombre TEXT NOT NULL,
+                    UNIQUE (usuario_id, nombre)
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS libro_tags (
+                    libro_id INTEGER NOT NULL,
+                    tag_id INTEGER NOT NULL,
+                    PRIMARY KEY (libro_id, tag_id)
+                ) WITHOUT ROWID
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_libro_tags_tag ON libro_tags (tag_id, libro_id)')
+
+            # Las etiquetas de cada libro también van en libros.tags (arreglo JSON)
+            # para que viajen en el diario de cambios y en la sincronización; los
+            # triggers mantienen libro_tags a partir de esa columna
+            if self._asegurar_columna(cursor, 'libros', 'tags', 'TEXT'):
+                cursor.execute('''
+                    UPDATE libros SET tags = (
+                        SELECT json_group_array(nombre) FROM (
+                            SELECT t.nombre FROM libro_tags lt JOIN tags t ON t.id = lt.tag_id
+                            WHERE lt.libro_id = libros.id ORDER BY t.nombre
+                        )
+                    )
+                    WHERE id IN (SELECT libro_id FROM libro_tags)
+                ''')
+            vincular = '''
+                INSERT OR IGNORE INTO tags (usuario_id, nombre)
+                SELECT NEW.usuario_id, value FROM json_each(NEW.tags);
+                INSERT OR IGNORE INTO libro_tags (libro_id, tag_id)
+                SELECT NEW.id, t.id FROM json_each(NEW.tags) j
+                JOIN tags t ON t.usuario_id = NEW.usuario_id AND t.nombre = j.value;
+            '''
+            for nombre, evento, cuerpo in [
+                ('trg_libros_tags_alta', 'AFTER INSERT ON libros WHEN NEW.tags IS NOT NULL', vincular),
+                ('trg_libros_tags_cambio', 'AFTER UPDATE OF tags ON libros WHEN OLD.tags IS NOT NEW.tags',
+                 # Las etiquetas que quedan sin libros desaparecen
+                 f'''DELETE FROM libro_tags WHERE libro_id = NEW.id; {vincular}
+                 DELETE FROM tags WHERE usuario_id = OLD.usuario_id
+                 AND nombre IN (SELECT value FROM json_each(OLD.tags))
+                 AND NOT EXISTS (SELECT 1 FROM libro_tags WHERE tag_id = tags.id);'''),
+                ('trg_libros_tags_baja', 'AFTER DELETE ON libros',
+                 'DELETE FROM libro_tags WHERE libro_id = OLD.id;')
+            ]:
+                cursor.execute(f'CREATE TRIGGER IF NOT EXISTS {nombre} {evento} BEGIN {cuerpo} END')
+            
+            # Índice de texto completo para el buscador, con el contenido en libros
+            self.tiene_fts = self._asegurar_fts(cursor)
+            
+            # Índices compuestos encabezados por el perfil
+            cursor.execute('DROP INDEX IF EXISTS idx_libros_clave_dedup')
+            cursor.execute('DROP INDEX IF EXISTS idx_libros_usuario_fecha')
+            for nombre, columnas in [
+                ('idx_libros_usuario_anio', 'usuario_id, anio_lectura'),
+                ('idx_libros_usuario_genero', 'usuario_id, genero'),
+                ('idx_libros_usuario_clave', 'usuario_id, clave_dedup')
+            ]:
+                cursor.execute(f'CREATE INDEX IF NOT EXISTS {nombre} ON libros ({columnas})')
+            
+            # Resúmenes precalculados de sesiones por perfil (diario, semanal y mensual)
+            reconstruir = False
+            for tabla in SesionModel.TABLAS_RESUMEN.values():
+                columnas = {fila[1] for fila in cursor.execute(f'PRAGMA table_info({tabla})')}
+                if columnas and 'usuario_id' not in columnas:
+                    cursor.execute(f'DROP TABLE {tabla}')
+                    reconstruir = True
+                cursor.execute(f'''
+                    CREATE TABLE IF NOT EXISTS {tabla} (
+                        usuario_id INTEGER NOT NULL,
+                        periodo TEXT NOT NULL,
+                        sesiones INTEGER NOT NULL DEFAULT 0,
+                        paginas INTEGER NOT NULL DEFAULT 0,
+                        minutos REAL NOT NULL DEFAULT 0,
+                        PRIMARY KEY (usuario_id, periodo)
+                    ) WITHOUT ROWID
+                ''')
+            SesionModel.crear_triggers(cursor)
+            
+            # Sesiones de libros borrados antes de que existiera el trigger
+            huerfanas = 'FROM sesiones WHERE libro_id NOT IN (SELECT id FROM libros)'
+            if cursor.execute(f'SELECT 1 {huerfanas} LIMIT 1').fetchone():
+                cursor.execute(f'DELETE {huerfanas}')
+                reconstruir = True
+            if reconstruir:
+                SesionModel.reconstruir_resumenes(cursor)
+            
+            # Resumen mensual de libros por perfil, mantenido por triggers, y metas anuales
+            existe = cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'libros_mensuales'"
+            ).fetchone()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS libros_mensuales (
+                    usuario_id INTEGER NOT NULL,
+                    periodo TEXT NOT NULL,
+                    libros INTEGER NOT NULL DEFAULT 0,
+                    paginas INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (usuario_id, periodo)
+                ) WITHOUT ROWID
+            ''')
+            MetaModel.crear_triggers(cursor)
+            if not existe:
+                MetaModel.reconstruir_resumen(cursor)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS metas (
+                    usuario_id INTEGER NOT NULL,
+                    anio INTEGER NOT NULL,
+                    libros INTEGER,
+                    paginas INTEGER,
+                    PRIMARY KEY (usuario_id, anio)
+                ) WITHOUT ROWID
+            ''')
+            
+            # Diario de cambios de libros, alimentado por triggers
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS cambios (
+                    version INTEGER PRIMARY KEY AUTOINCREMENT,
+                    libro_id INTEGER NOT NULL,
+                    operacion TEXT NOT NULL CHECK (operacion IN ('I', 'U', 'D')),
+                    antes TEXT,
+                    despues TEXT,
+                    fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            CambioModel.crear_triggers(cursor)
+            
             conn.commit()
     
+    def obtener_usuario_por_defecto(self) -> int:
+        """Retorna el ID del primer perfil, usado cuando no se eligió ninguno"""
+        return self.execute_query('SELECT MIN(id) FROM usuario', fetch=True)[0][0]
+    
+    @staticmethod
+    def _asegurar_fts(cursor) -> bool:
+        """Crea el índice FTS5 de libros y sus triggers; False si SQLite no trae FTS5"""
+        existia = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'libros_fts'"
+        ).fetchone()
+        try:
+            cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS libros_fts USING fts5(
+                    titulo, autor, editorial, comentario,
+                    content='libros', content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2'
+                )
+            ''')
+        except sqlite3.OperationalError:
+            return False
+        
+        nuevos = 'NEW.id, NEW.titulo, NEW.autor, NEW.editorial, NEW.comentario'
+        viejos = "'delete', OLD.id, OLD.titulo, OLD.autor, OLD.editorial, OLD.comentario"
+        columnas = 'rowid, titulo, autor, editorial, comentario'
+        for nombre, evento, cuerpo in [
+            ('trg_libros_fts_alta', 'AFTER INSERT ON libros',
+             f'INSERT INTO libros_fts ({columnas}) VALUES ({nuevos});'),
+            ('trg_libros_fts_baja', 'AFTER DELETE ON libros',
+             f'INSERT INTO libros_fts (libros_fts, {columnas}) VALUES ({viejos});'),
+            ('trg_libros_fts_cambio', 'AFTER UPDATE OF titulo, autor, editorial, comentario ON libros',
+             f'INSERT INTO libros_fts (libros_fts, {columnas}) VALUES ({viejos}); '
+             f'INSERT INTO libros_fts ({columnas}) VALUES ({nuevos});')
+        ]:
+            cursor.execute(f'CREATE TRIGGER IF NOT EXISTS {nombre} {evento} BEGIN {cuerpo} END')
+        
+        # En una base existente el índice nace vacío: se arma con los libros que ya hay
+        if not existia:
+            cursor.execute("INSERT INTO libros_fts (libros_fts) VALUES ('rebuild')")
+        return True
+    
+    def _asegurar_columna(self, cursor, tabla: str, columna: str, definicion: str) -> bool:
+        """Agrega una columna a una tabla existente si todavía no existe (True si la agregó)"""
+        columnas = {fila[1] for fila in cursor.execute(f'PRAGMA table_info({tabla})')}
+        if columna not in columnas:
+            cursor.execute(f'ALTER TABLE {tabla} ADD COLUMN {columna} {definicion}')
+            return True
+        return False
+    
+    def _conectar(self, **opciones) -> sqlite3.Connection:
+        """Abre una conexión nueva e independiente a la base"""
+        return self._preparar_conexion(sqlite3.connect(self.db_name, **opciones))
+    
+    def _preparar_conexion(self, conn: sqlite3.Connection) -> sqlite3.Connection:
+        """Aplica los PRAGMAs configurados y adjunta las otras bibliotecas"""
+        for nombre, valor in self.pragmas.items():
+            conn.execute(f'PRAGMA {nombre} = {valor}')
+        for alias, ruta in self.bibliotecas.items():
+            conn.execute(f'ATTACH DATABASE ? AS {alias}', (ruta,))
+        return conn
+    
+    def adjuntar(self, alias: str, ruta: str):
+        """Adjunta otra biblioteca (otro archivo de la aplicación) a las conexiones
+        que se abran desde ahora, para consultarla sin copiar sus datos"""
+        validar_alias(alias)
+        if not os.path.isfile(ruta):
+            raise ValueError(f"No existe la biblioteca '{alias}': {ruta}")
+        self._reiniciar_conexion_trabajo()
+        self.bibliotecas[alias] = os.path.abspath(ruta)
+    
+    def desadjuntar(self, alias: str):
+        """Deja de adjuntar una biblioteca en las conexiones nuevas"""
+        self._reiniciar_conexion_trabajo()
+        self.bibliotecas.pop(alias, None)
+    
+    def _reiniciar_conexion_trabajo(self):
+        """Confirma y cierra la conexión compartida para que se reabra con las
+        bibliotecas actuales (ATTACH no se puede hacer en una transacción)"""
+        with self._lock_trabajo:
+            if self._pila_savepoints:
+                raise RuntimeError("No se pueden cambiar las bibliotecas dentro de una transacción")
+            self.confirmar()
+            if self._conexion_trabajo is not None:
+                self._conexion_trabajo.close()
+                self._conexion_trabajo = None
+    
     def _get_connection(self):
-        """Retorna una conexión a la base de datos"""
-        return sqlite3.connect(self.db_name)
+        """Retorna una conexión a la base de datos.
+        
+        Con una unidad de trabajo en curso retorna la conexión compartida,
+        así las lecturas ven las escrituras todavía no confirmadas.
+        """
+        if self._agrupado or self._pila_savepoints:
+            return self._vista_trabajo
+        return self._conectar()
+    
+    def _abrir_savepoint(self):
+        """Abre un savepoint en la conexión compartida (con el lock tomado)"""
+        if self._conexion_trabajo is None:
+            # Sin transacciones implícitas: BEGIN y COMMIT se manejan acá
+            self._conexion_trabajo = self._conectar(isolation_level=None, check_same_thread=False)
+        if not self._conexion_trabajo.in_transaction:
+            self._conexion_trabajo.execute('BEGIN')
+        self._conexion_trabajo.execute(f'SAVEPOINT sp{len(self._pila_savepoints)}')
+        self._pila_savepoints.append(False)
+    
+    def _cerrar_savepoint(self, exito: bool):
+        """Cierra el savepoint actual y decide si hay que volcar (con el lock tomado)"""
+        conn = self._conexion_trabajo
+        nombre = f'sp{len(self._pila_savepoints) - 1}'
+        escribio = self._pila_savepoints.pop()
+        if not exito:
+            conn.execute(f'ROLLBACK TO {nombre}')
+            escribio = False
+        conn.execute(f'RELEASE {nombre}')
+        
+        if self._pila_savepoints:
+            self._pila_savepoints[-1] = self._pila_savepoints[-1] or escribio
+            return
+        
+        if escribio:
+            self._operaciones_pendientes += 1
+            self._escrituras_locales += 1
+        if not self._operaciones_pendientes:
+            # Solo hubo lecturas: liberar el lock de lectura de inmediato
+            if conn.in_transaction:
+                conn.execute('COMMIT')
+        elif not self._agrupado or self._operaciones_pendientes >= self.max_operaciones:
+            self.confirmar()
+        elif self._temporizador is None:
+            self._temporizador = threading.Timer(self.max_ms / 1000, self.confirmar)
+            self._temporizador.daemon = True
+            self._temporizador.start()
+    
+    def confirmar(self):
+        """Confirma en disco las operaciones pendientes de la unidad de trabajo"""
+        with self._lock_trabajo:
+            if self._temporizador is not None:
+                self._temporizador.cancel()
+                self._temporizador = None
+            # Dentro de una transacción explícita se confirma al salir de ella
+            if self._pila_savepoints or self._conexion_trabajo is None:
+                return
+            if self._conexion_trabajo.in_transaction:
+                self._conexion_trabajo.execute('COMMIT')
+            self._operaciones_pendientes = 0
+    
+    @contextmanager
+    def transaccion(self):
+        """Agrupa las escrituras del bloque en una transacción: se confirman
+        todas al salir o ninguna si el bloque lanza una excepción.
+        
+        Las transacciones pueden anidarse; las internas son savepoints.
+        """
+        with self._vista_trabajo as conn:
+            yield conn
+    
+    def activar_escritura_agrupada(self, max_operaciones: int = 50, max_ms: int = 200):
+        """Confirma las escrituras en grupos de max_operaciones o cada max_ms milisegundos"""
+        with self._lock_trabajo:
+            self.max_operaciones = max_operaciones
+            self.max_ms = max_ms
+            if not self._agrupado:
+                self._agrupado = True
+                atexit.register(self.confirmar)
+    
+    def desactivar_escritura_agrupada(self):
+        """Vuelca lo pendiente y vuelve a confirmar cada escritura por separado"""
+        with self._lock_trabajo:
+            self._agrupado = False
+            self.confirmar()
+            atexit.unregister(self.confirmar)
+    
+    def cerrar(self):
+        """Vuelca lo pendiente y cierra las conexiones que el almacenamiento
+        mantiene abiertas (la de la unidad de trabajo y la de data_version)"""
+        with self._lock_trabajo:
+            if self._agrupado:
+                self.desactivar_escritura_agrupada()
+            self.confirmar()
+            if self._conexion_trabajo is not None:
+                self._conexion_trabajo.close()
+                self._conexion_trabajo = None
+        with self._lock_version:
+            if self._conexion_version is not None:
+                self._conexion_version.close()
+                self._conexion_version = None
+    
+    def obtener_version_datos(self) -> int:
+        """Retorna un número que cambia cada vez que se confirma una escritura en la base.
+        
+        Usa PRAGMA data_version sobre una conexión propia que nunca escribe,
+        por lo que refleja los cambios de cualquier otra conexión o proceso.
+        Las escrituras de la unidad de trabajo todavía sin confirmar también
+        lo cambian, porque las lecturas del proceso ya las ven.
+        """
+        with self._lock_version:
+            if self._conexion_version is None:
+                self._conexion_version = self._conectar(check_same_thread=False)
+            version = self._conexion_version.execute('PRAGMA data_version').fetchone()[0]
+        return (self._escrituras_locales << 32) + version
     
     def execute_query(self, query: str, params: Tuple = (), fetch: bool = False):
         """Ejecuta una consulta SQL y opcionalmente retorna resultados"""
@@ -94,57 +768,595 @@ class DatabaseManager:
             if fetch:
                 return cursor.fetchall()
             conn.commit()
+    
+    def consultar_analitica(self, query: str, params: Tuple = ()) -> List[Tuple]:
+        """Ejecuta una consulta agregada de solo lectura (otros almacenamientos
+        pueden resolverla con un motor analítico)"""
+        return self.execute_query(query, params, fetch=True)
+
+class DatabaseManagerMemoria(DatabaseManager):
+    """Almacenamiento en memoria (para pruebas y mediciones rápidas).
+    
+    Es la misma base SQLite sobre el VFS memdb: todas las conexiones del
+    proceso comparten la base, con los mismos triggers e índices, pero nada
+    toca el disco y los datos se pierden al cerrar.
+    """
+    
+    persistente = False
+    _contador = itertools.count()
+    
+    def __init__(self, nombre: Optional[str] = None, pragmas: Optional[Dict[str, str]] = None,
+                 bibliotecas: Optional[Dict[str, str]] = None):
+        nombre = nombre or f'lecturas-{os.getpid()}-{next(self._contador)}'
+        self._uri = f'file:/{nombre}?vfs=memdb'
+        # La base en memoria vive mientras haya una conexión abierta
+        self._ancla = sqlite3.connect(self._uri, uri=True, check_same_thread=False)
+        super().__init__(':memory:', pragmas, bibliotecas)
+    
+    def _conectar(self, **opciones) -> sqlite3.Connection:
+        """Abre una conexión nueva a la base en memoria"""
+        return self._preparar_conexion(sqlite3.connect(self._uri, uri=True, **opciones))
+    
+    def cerrar(self):
+        """Cierra las conexiones; la base en memoria se pierde con la última"""
+        super().cerrar()
+        self._ancla.close()
+
+class DatabaseManagerDuckDB(DatabaseManager):
+    """SQLite para las escrituras y DuckDB para las consultas analíticas.
+    
+    Las altas, ediciones, triggers y el diario siguen en SQLite; las
+    agregaciones de consultar_analitica las resuelve DuckDB leyendo el mismo
+    archivo con su extensión sqlite, que en bibliotecas enormes recorre la
+    tabla en columnas y en paralelo. Requiere el paquete opcional duckdb.
+    """
+    
+    def __init__(self, db_name: str = RUTA_DB_POR_DEFECTO, pragmas: Optional[Dict[str, str]] = None,
+                 bibliotecas: Optional[Dict[str, str]] = None):
+        if duckdb is None:
+            raise RuntimeError("El almacenamiento 'duckdb' requiere el paquete duckdb (pip install duckdb)")
+        super().__init__(db_name, pragmas, bibliotecas)
+        self._duck = duckdb.connect()
+        ruta = db_name.replace("'", "''")
+        try:
+            self._duck.execute(f"ATTACH '{ruta}' AS lecturas (TYPE SQLITE, READ_ONLY)")
+        except duckdb.Error as e:
+            # La extensión sqlite se descarga la primera vez que se usa
+            raise RuntimeError(f"DuckDB no pudo abrir la base SQLite: {e}") from e
+        self._duck.execute('USE lecturas')
+        self._lock_duck = threading.Lock()
+    
+    def consultar_analitica(self, query: str, params: Tuple = ()) -> List[Tuple]:
+        """Resuelve una consulta de solo lectura con DuckDB"""
+        # DuckDB lee el archivo: lo agrupado y sin confirmar tiene que estar en disco
+        self.confirmar()
+        with self._lock_duck:
+            return self._duck.execute(query, list(params)).fetchall()
+    
+    def cerrar(self):
+        """Cierra también la conexión de DuckDB"""
+        super().cerrar()
+        with self._lock_duck:
+            self._duck.close()
+
+# Almacenamientos disponibles, por el nombre con que se eligen en la configuración
+ALMACENAMIENTOS = {
+    'sqlite': DatabaseManager,
+    'memoria': DatabaseManagerMemoria,
+    'duckdb': DatabaseManagerDuckDB
+}
+
+def crear_almacenamiento(tipo: Optional[str] = None, db_name: Optional[str] = None,
+                         pragmas: Optional[Dict[str, str]] = None,
+                         bibliotecas: Optional[Dict[str, str]] = None) -> Almacenamiento:
+    """Crea el almacenamiento indicado (por defecto el de LECTURAS_ALMACENAMIENTO o sqlite)"""
+    tipo = tipo or os.environ.get('LECTURAS_ALMACENAMIENTO', 'sqlite')
+    if tipo not in ALMACENAMIENTOS:
+        raise ValueError(
+            f"Almacenamiento desconocido: {tipo} (opciones: {', '.join(ALMACENAMIENTOS)})"
+        )
+    if tipo == 'memoria':
+        return DatabaseManagerMemoria(pragmas=pragmas, bibliotecas=bibliotecas)
+    return ALMACENAMIENTOS[tipo](db_name or RUTA_DB_POR_DEFECTO, pragmas, bibliotecas)
+
+class DetectorDuplicados:
+    """Índice MinHash/LSH en memoria para detectar libros casi duplicados.
+    
+    Cada libro se representa por los trigramas de su título y autor
+    normalizados. Los libros solo se comparan con los que comparten alguna
+    banda de la firma MinHash, evitando comparar todos contra todos.
+    """
+    
+    NUM_PERMUTACIONES = 24
+    FILAS_POR_BANDA = 3
+    _PRIMO = (1 << 61) - 1
+    
+    def __init__(self, db_manager: DatabaseManager, usuario_id: int, umbral: float = 0.6):
+        self.db = db_manager
+        self.usuario_id = usuario_id
+        self.umbral = umbral
+        self._coeficientes = [
+            (zlib.crc32(f'a{i}'.encode()) | 1, zlib.crc32(f'b{i}'.encode()))
+            for i in range(self.NUM_PERMUTACIONES)
+        ]
+        self._trigramas: Optional[Dict[int, Set[str]]] = None
+        self._bandas: Dict[Tuple, Set[int]] = {}
+        self._bandas_por_libro: Dict[int, List[Tuple]] = {}
+    
+    @staticmethod
+    def _obtener_trigramas(titulo: str, autor: str) -> Set[str]:
+        """Retorna el conjunto de trigramas del título y autor normalizados"""
+        texto = f"  {normalizar_texto(titulo)} | {normalizar_texto(autor)}  "
+        return {texto[i:i + 3] for i in range(len(texto) - 2)}
+    
+    def _calcular_bandas(self, trigramas: Set[str]) -> List[Tuple]:
+        """Calcula la firma MinHash y la divide en bandas"""
+        hashes = [zlib.crc32(t.encode('utf-8')) for t in trigramas]
+        firma = [
+            min((a * h + b) % self._PRIMO for h in hashes)
+            for a, b in self._coeficientes
+        ]
+        filas = self.FILAS_POR_BANDA
+        return [
+            (i,) + tuple(firma[i:i + filas])
+            for i in range(0, self.NUM_PERMUTACIONES, filas)
+        ]
+    
+    def invalidar(self):
+        """Descarta el índice para reconstruirlo con el próximo uso"""
+        self._trigramas = None
+        self._bandas = {}
+        self._bandas_por_libro = {}
+    
+    def cambiar_usuario(self, usuario_id: int):
+        """Cambia el perfil indexado; el índice se reconstruye al usarse"""
+        if usuario_id != self.usuario_id:
+            self.usuario_id = usuario_id
+            self.invalidar()
+    
+    def _cargar(self):
+        """Construye el índice con los libros del perfil (una sola vez)"""
+        if self._trigramas is not None:
+            return
+        self._trigramas = {}
+        filas = self.db.execute_query(
+            'SELECT id, titulo, autor FROM libros WHERE usuario_id = ?',
+            (self.usuario_id,), fetch=True
+        )
+        for libro_id, titulo, autor in filas:
+            self._indexar(libro_id, titulo, autor)
+    
+    def _indexar(self, libro_id: int, titulo: str, autor: str):
+        """Agrega un libro al índice"""
+        trigramas = self._obtener_trigramas(titulo, autor)
+        bandas = self._calcular_bandas(trigramas)
+        self._trigramas[libro_id] = trigramas
+        self._bandas_por_libro[libro_id] = bandas
+        for banda in bandas:
+            self._bandas.setdefault(banda, set()).add(libro_id)
+    
+    def registrar(self, libro_id: int, titulo: str, autor: str, usuario_id: Optional[int] = None):
+        """Agrega o actualiza un libro en el índice si ya fue construido"""
+        if self._trigramas is None or usuario_id not in (None, self.usuario_id):
+            return
+        self.quitar(libro_id)
+        self._indexar(libro_id, titulo, autor)
+    
+    def quitar(self, libro_id: int):
+        """Quita un libro del índice"""
+        if self._trigramas is None or libro_id not in self._trigramas:
+            return
+        del self._trigramas[libro_id]
+        for banda in self._bandas_por_libro.pop(libro_id, []):
+            ids = self._bandas.get(banda)
+            if ids is not None:
+                ids.discard(libro_id)
+                if not ids:
+                    del self._bandas[banda]
+    
+    @staticmethod
+    def _jaccard(a: Set[str], b: Set[str]) -> float:
+        """Similitud de Jaccard entre dos conjuntos"""
+        if not a or not b:
+            return 0.0
+        return len(a & b) / len(a | b)
+    
+    def similares(self, titulo: str, autor: str) -> List[Tuple[int, float]]:
+        """Retorna (id, similitud) de los libros parecidos, del más al menos similar"""
+        self._cargar()
+        trigramas = self._obtener_trigramas(titulo, autor)
+        candidatos = set()
+        for banda in self._calcular_bandas(trigramas):
+            candidatos |= self._bandas.get(banda, set())
+        
+        resultado = []
+        for libro_id in candidatos:
+            similitud = self._jaccard(trigramas, self._trigramas[libro_id])
+            if similitud >= self.umbral:
+                resultado.append((libro_id, similitud))
+        return sorted(resultado, key=lambda par: par[1], reverse=True)
+    
+    def agrupar(self) -> List[List[int]]:
+        """Agrupa todos los libros duplicados o casi duplicados de la tabla"""
+        self._cargar()
+        padres = {}
+        
+        def raiz(x):
+            while padres.get(x, x) != x:
+                x = padres[x]
+            return x
+        
+        comparados = set()
+        for ids in self._bandas.values():
+            if len(ids) < 2:
+                continue
+            ordenados = sorted(ids)
+            for i, a in enumerate(ordenados):
+                for b in ordenados[i + 1:]:
+                    if (a, b) in comparados:
+                        continue
+                    comparados.add((a, b))
+                    if self._jaccard(self._trigramas[a], self._trigramas[b]) >= self.umbral:
+                        raiz_a, raiz_b = raiz(a), raiz(b)
+                        if raiz_a != raiz_b:
+                            padres[raiz_b] = raiz_a
+        
+        grupos: Dict[int, Set[int]] = {}
+        for libro_id in set(padres) | set(padres.values()):
+            grupos.setdefault(raiz(libro_id), set()).add(libro_id)
+        return [sorted(ids) for ids in grupos.values() if len(ids) > 1]
+
+class IndiceTags:
+    """Bitsets en memoria con los libros de cada etiqueta del perfil.
+    
+    Cada etiqueta es un int de Python donde el bit n indica que el libro de
+    ID n la tiene, así que "todas estas etiquetas" es un AND y "alguna de
+    estas" un OR entre enteros, resueltos en C sin tocar la base. El índice
+    se arma una sola vez desde libro_tags y LibroModel lo mantiene al día
+    con cada escritura.
+    """
+    
+    # Para pasar de '0'/'1' (texto del bitset) a bytes 0/1
+    _BITS = bytes.maketrans(b'01', b'\x00\x01')
+    
+    def __init__(self, db_manager: DatabaseManager, usuario_id: int):
+        self.db = db_manager
+        self.usuario_id = usuario_id
+        self._bits: Optional[Dict[str, int]] = None
+    
+    def invalidar(self):
+        """Descarta el índice para reconstruirlo con el próximo uso"""
+        self._bits = None
+    
+    def cambiar_usuario(self, usuario_id: int):
+        """Cambia el perfil indexado; el índice se reconstruye al usarse"""
+        if usuario_id != self.usuario_id:
+            self.usuario_id = usuario_id
+            self.invalidar()
+    
+    def _cargar(self) -> Dict[str, int]:
+        """Construye los bitsets con las etiquetas del perfil (una sola vez)"""
+        if self._bits is not None:
+            return self._bits
+        # Una fila por etiqueta con sus IDs concatenados: mucho menos que una
+        # tupla por vínculo
+        filas = self.db.execute_query('''
+            SELECT t.nombre, group_concat(lt.libro_id) FROM tags t
+            JOIN libro_tags lt ON lt.tag_id = t.id
+            WHERE t.usuario_id = ? GROUP BY t.id
+        ''', (self.usuario_id,), fetch=True)
+        
+        # El bitset se arma como texto '0'/'1' y se convierte de una vez
+        bits = {}
+        for nombre, concatenados in filas:
+            ids = [int(libro_id) for libro_id in concatenados.split(',')]
+            marcas = bytearray(b'0') * (max(ids) + 1)
+            for libro_id in ids:
+                marcas[libro_id] = 49  # ord('1')
+            bits[nombre] = int(marcas[::-1], 2)
+        self._bits = bits
+        return bits
+    
+    def registrar(self, libro_id: int, tags: List[str], usuario_id: Optional[int] = None):
+        """Reemplaza las etiquetas de un libro en el índice si ya fue construido"""
+        if self._bits is None or usuario_id not in (None, self.usuario_id):
+            return
+        self.quitar(libro_id)
+        bit = 1 << libro_id
+        for nombre in tags:
+            self._bits[nombre] = self._bits.get(nombre, 0) | bit
+    
+    def quitar(self, libro_id: int):
+        """Quita un libro de todas las etiquetas"""
+        if self._bits is None:
+            return
+        for nombre, bits in list(self._bits.items()):
+            if bits >> libro_id & 1:
+                bits &= ~(1 << libro_id)
+                if bits:
+                    self._bits[nombre] = bits
+                else:
+                    del self._bits[nombre]
+    
+    def cantidades(self) -> Dict[str, int]:
+        """Cantidad de libros por etiqueta"""
+        return {nombre: bits.bit_count() for nombre, bits in self._cargar().items()}
+    
+    def filtrar(self, tags: List[str], modo: str = 'y') -> int:
+        """Bitset de los libros con todas las etiquetas (modo 'y') o con alguna ('o')"""
+        bits = self._cargar()
+        if modo == 'o':
+            resultado = 0
+            for nombre in tags:
+                resultado |= bits.get(nombre, 0)
+            return resultado
+        if not tags:
+            return 0
+        # Empezar por la etiqueta más chica acota el resto de los AND
+        conjuntos = sorted((bits.get(nombre, 0) for nombre in tags), key=int.bit_count)
+        resultado = conjuntos[0]
+        for otro in conjuntos[1:]:
+            if not resultado:
+                break
+            resultado &= otro
+        return resultado
+    
+    @classmethod
+    def ids(cls, bits: int) -> List[int]:
+        """IDs de los libros marcados en un bitset, de menor a mayor"""
+        if not bits:
+            return []
+        marcas = bin(bits)[:1:-1].encode('ascii').translate(cls._BITS)
+        return list(itertools.compress(range(len(marcas)), marcas))
+
+class CacheConsultas:
+    """Caché LRU de resultados de consultas, acotada por cantidad total de filas.
+    
+    Todas las entradas se descartan juntas cuando cambia el testigo de
+    versión (versión de los datos de la base más escrituras propias).
+    """
+    
+    def __init__(self, max_filas: int = 50000):
+        self.max_filas = max_filas
+        self._entradas: 'OrderedDict[Tuple, List[Dict]]' = OrderedDict()
+        self._filas = 0
+        self._testigo = None
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.invalidaciones = 0
+        self.desalojos = 0
+    
+    def _validar(self, testigo):
+        """Vacía la caché si el testigo de versión cambió"""
+        if testigo != self._testigo:
+            if self._entradas:
+                self.invalidaciones += 1
+            self._entradas.clear()
+            self._filas = 0
+            self._testigo = testigo
+    
+    def obtener(self, clave: Tuple, testigo) -> Optional[List[Dict]]:
+        """Retorna el resultado guardado para la clave o None"""
+        with self._lock:
+            self._validar(testigo)
+            resultado = self._entradas.get(clave)
+            if resultado is None:
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return resultado
+    
+    def guardar(self, clave: Tuple, testigo, resultado: List[Dict]):
+        """Guarda un resultado desalojando los menos usados si se supera el límite"""
+        if len(resultado) > self.max_filas:
+            return
+        with self._lock:
+            self._validar(testigo)
+            anterior = self._entradas.pop(clave, None)
+            if anterior is not None:
+                self._filas -= len(anterior)
+            self._entradas[clave] = resultado
+            self._filas += len(resultado)
+            while self._filas > self.max_filas:
+                _, desalojado = self._entradas.popitem(last=False)
+                self._filas -= len(desalojado)
+                self.desalojos += 1
+    
+    def limpiar(self):
+        """Descarta todas las entradas"""
+        with self._lock:
+            self._entradas.clear()
+            self._filas = 0
+            self._testigo = None
+    
+    def estadisticas(self) -> Dict:
+        """Retorna contadores de uso para ajustar el tamaño"""
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                'entradas': len(self._entradas),
+                'filas': self._filas,
+                'max_filas': self.max_filas,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'tasa_aciertos': self.aciertos / consultas if consultas else 0.0,
+                'invalidaciones': self.invalidaciones,
+                'desalojos': self.desalojos
+            }
 
 class LibroModel:
     """Modelo para manejar los libros en la base de datos"""
     
-    def __init__(self, db_manager: DatabaseManager):
+    def __init__(self, db_manager: Almacenamiento, usuario_id: Optional[int] = None):
         self.db = db_manager
+        self.usuario_id = usuario_id or db_manager.obtener_usuario_por_defecto()
+        self.duplicados = DetectorDuplicados(db_manager, self.usuario_id)
+        self.indice_tags = IndiceTags(db_manager, self.usuario_id)
+        self._cache_estadisticas: Dict[int, Tuple[int, Dict]] = {}
+        self.cache_consultas = CacheConsultas()
+        self._escrituras = 0
     
-    def crear_libro(self, libro_data: Dict) -> int:
-        """Crea un nuevo libro y retorna su ID"""
-        query = '''
-            INSERT INTO libros (
-                titulo, autor, genero, subgenero, anio_lectura, 
-                fecha_lectura, calificacion, paginas, editorial, comentario
-            )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        '''
-        params = (
-            libro_data['titulo'],
-            libro_data['autor'],
-            libro_data['genero'],
-            libro_data.get('subgenero', ''),
-            libro_data.get('anio_lectura', datetime.now().year),
-            libro_data.get('fecha_lectura', datetime.now().date().isoformat()),
-            libro_data.get('calificacion', 0),
-            libro_data.get('paginas', 0),
-            libro_data.get('editorial', ''),
-            libro_data.get('comentario', '')
+    def seleccionar_usuario(self, usuario_id: int):
+        """Cambia el perfil activo sobre el que operan las consultas"""
+        self.usuario_id = usuario_id
+        self.duplicados.cambiar_usuario(usuario_id)
+        self.indice_tags.cambiar_usuario(usuario_id)
+    
+    def transaccion(self):
+        """Bloque cuyas escrituras se confirman juntas (ver DatabaseManager.transaccion)"""
+        return self.db.transaccion()
+    
+    def limpiar_caches(self):
+        """Descarta consultas, estadísticas e índices en memoria, como al abrir la aplicación"""
+        self.cache_consultas.limpiar()
+        self._cache_estadisticas.clear()
+        self.duplicados.invalidar()
+        self.indice_tags.invalidar()
+    
+    # Columnas que se escriben al crear un libro, en el orden de los parámetros
+    _COLUMNAS_ALTA = (
+        'titulo', 'autor', 'genero', 'subgenero', 'anio_lectura',
+        'fecha_lectura', 'calificacion', 'paginas', 'editorial', 'comentario',
+        'clave_dedup', 'usuario_id', 'uuid', 'estado', 'portada', 'isbn', 'tags'
+    )
+    
+    @staticmethod
+    def _tags_json(tags: Optional[List[str]]) -> Optional[str]:
+        """Valor de la columna tags: arreglo JSON, o NULL si no hay etiquetas"""
+        return json.dumps(tags, ensure_ascii=False) if tags else None
+    
+    def _parametros_alta(self, libro: Dict, original: Dict) -> Tuple:
+        """Parámetros del INSERT para un libro ya validado"""
+        return (
+            libro['titulo'], libro['autor'], libro['genero'], libro['subgenero'],
+            libro['anio_lectura'], libro['fecha_lectura'], libro['calificacion'],
+            libro['paginas'], libro['editorial'], libro['comentario'],
+            clave_duplicado(libro['titulo'], libro['autor']),
+            original.get('usuario_id', self.usuario_id),
+            original.get('uuid') or uuid.uuid4().hex,
+            libro['estado'], libro['portada'], libro['isbn'],
+            self._tags_json(libro['tags'])
         )
+    
+    def _query_alta(self) -> str:
+        """INSERT de un libro con las columnas de _COLUMNAS_ALTA"""
+        return (
+            f"INSERT INTO libros ({', '.join(self._COLUMNAS_ALTA)}) "
+            f"VALUES ({', '.join('?' * len(self._COLUMNAS_ALTA))})"
+        )
+    
+    def crear_libro(self, libro_data: Dict) -> int:
+        """Crea un nuevo libro y retorna su ID.
+        
+        Los datos se validan con ESQUEMA_LIBRO (lanza ErrorValidacion).
+        """
+        libro = ESQUEMA_LIBRO.validar(libro_data)
+        params = self._parametros_alta(libro, libro_data)
+        usuario_id = libro_data.get('usuario_id', self.usuario_id)
         
         with self.db._get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute(query, params)
+            cursor.execute(self._query_alta(), params)
             libro_id = cursor.lastrowid
             conn.commit()
         
+        self._escrituras += 1
+        self.duplicados.registrar(libro_id, libro['titulo'], libro['autor'], usuario_id)
+        if libro['tags']:
+            self.indice_tags.registrar(libro_id, libro['tags'], usuario_id)
         return libro_id
     
-    def obtener_libros(self, filtros: Optional[Dict] = None) -> List[Dict]:
-        """Obtiene todos los libros con filtros opcionales"""
-        base_query = 'SELECT * FROM libros'
-        params = []
+    def crear_libros(self, filas: List[Dict]) -> ResultadoLote:
+        """Valida un lote de libros y crea los válidos en una sola transacción.
+        
+        Las filas con errores no se insertan; el resultado trae las válidas
+        y los errores por fila para informarlos.
+        """
+        resultado = ESQUEMA_LIBRO.validar_lote(filas)
+        if not resultado.validas:
+            return resultado
+        
+        params = [
+            self._parametros_alta(libro, filas[indice])
+            for libro, indice in zip(resultado.validas, resultado.indices)
+        ]
+        with self.db._get_connection() as conn:
+            conn.executemany(self._query_alta(), params)
+            conn.commit()
+        
+        self._escrituras += 1
+        # Los índices en memoria se reconstruyen con el próximo uso
+        self.duplicados.invalidar()
+        if any(libro['tags'] for libro in resultado.validas):
+            self.indice_tags.invalidar()
+        return resultado
+    
+    def obtener_tags(self) -> List[Tuple[str, int]]:
+        """Etiquetas del perfil con su cantidad de libros, por nombre"""
+        return sorted(self.indice_tags.cantidades().items())
+    
+    def obtener_tags_libro(self, libro_id: int) -> List[str]:
+        """Etiquetas de un libro, por nombre"""
+        filas = self.db.execute_query('''
+            SELECT t.nombre FROM libro_tags lt JOIN tags t ON t.id = lt.tag_id
+            WHERE lt.libro_id = ? ORDER BY t.nombre
+        ''', (libro_id,), fetch=True)
+        return [nombre for (nombre,) in filas]
+    
+    def obtener_tags_por_libro(self) -> Dict[int, List[str]]:
+        """Etiquetas de todos los libros del perfil, por ID de libro"""
+        filas = self.db.execute_query('''
+            SELECT lt.libro_id, t.nombre FROM tags t
+            JOIN libro_tags lt ON lt.tag_id = t.id
+            WHERE t.usuario_id = ? ORDER BY t.nombre
+        ''', (self.usuario_id,), fetch=True)
+        tags: Dict[int, List[str]] = {}
+        for libro_id, nombre in filas:
+            tags.setdefault(libro_id, []).append(nombre)
+        return tags
+    
+    def asignar_tags(self, libro_id: int, tags: List[str]):
+        """Reemplaza las etiquetas de un libro"""
+        tags = normalizar_tags(tags)
+        self.db.execute_query(
+            'UPDATE libros SET tags = ?, fecha_actualizacion = CURRENT_TIMESTAMP WHERE id = ?',
+            (self._tags_json(tags), libro_id)
+        )
+        self._escrituras += 1
+        self.indice_tags.registrar(libro_id, tags)
+    
+    def construir_consulta(self, filtros: Optional[Dict] = None, orden: Optional[str] = None,
+                           desc: bool = True) -> Tuple[str, List]:
+        """Construye la consulta SQL y sus parámetros para los filtros y el orden dados"""
+        base_query = f"SELECT {', '.join(LIBRO_COLUMNAS)} FROM libros"
+        filtros = filtros or {}
+        
+        # El perfil va siempre primero para aprovechar los índices compuestos
+        conditions = ['usuario_id = ?']
+        params = [filtros.get('usuario_id', self.usuario_id)]
         
         if filtros:
-            conditions = []
             for key, value in filtros.items():
-                if key == 'anio_lectura':
+                if key == 'id':
+                    conditions.append(f'id = ?')
+                    params.append(value)
+                elif key == 'anio_lectura':
                     conditions.append(f'anio_lectura = ?')
                     params.append(value)
                 elif key == 'genero':
                     conditions.append(f'genero = ?')
                     params.append(value)
+                elif key == 'estado':
+                    # Literal (validado) para que SQLite pueda usar el índice parcial.
+                    # Con un año o un ID su índice acota mucho más, pero sin
+                    # estadísticas SQLite elegiría el parcial (ya ordenado por
+                    # fecha) y recorrería todo el estado: '+' lo deja fuera del plan
+                    if value not in ESTADOS:
+                        raise ValueError(f"Estado desconocido: {value}")
+                    acotado = filtros.get('anio_lectura') is not None or filtros.get('id') is not None
+                    conditions.append(f"{'+' if acotado else ''}estado = '{value}'")
                 elif key == 'calificacion_min':
                     conditions.append(f'calificacion >= ?')
                     params.append(value)
@@ -155,25 +1367,88 @@ class LibroModel:
                     conditions.append(f'(titulo LIKE ? OR autor LIKE ?)')
                     params.append(f'%{value}%')
                     params.append(f'%{value}%')
-            
-            if conditions:
-                base_query += ' WHERE ' + ' AND '.join(conditions)
+                elif key == 'consulta' and value:
+                    # Lenguaje del buscador (ver consultas.py), compilado una vez por texto
+                    plan = CONSULTA_LIBRO.compilar(value, self.db.tiene_fts)
+                    if plan.usa_indice_texto:
+                        # Que la búsqueda de texto conduzca la consulta y no el índice por perfil
+                        conditions[0] = '+usuario_id = ?'
+                    conditions.append(plan.sql)
+                    params.extend(plan.params)
+                elif key == 'tags' and value:
+                    tags = normalizar_tags(list(value))
+                    modo = filtros.get('tags_modo', 'y')
+                    if params[0] == self.indice_tags.usuario_id:
+                        # Se resuelve con los bitsets en memoria; SQLite solo recibe los IDs
+                        bits = self.indice_tags.filtrar(tags, modo)
+                        conditions.append('id IN (SELECT value FROM json_each(?))')
+                        params.append(json.dumps(IndiceTags.ids(bits)))
+                    else:
+                        # El índice en memoria es del perfil activo: otro perfil va por libro_tags
+                        subconsulta = (
+                            'SELECT lt.libro_id FROM libro_tags lt JOIN tags t ON t.id = lt.tag_id '
+                            f"WHERE t.usuario_id = ? AND t.nombre IN ({', '.join('?' * len(tags))})"
+                        )
+                        params.extend([params[0], *tags])
+                        if modo != 'o':
+                            subconsulta += ' GROUP BY lt.libro_id HAVING COUNT(*) = ?'
+                            params.append(len(tags))
+                        conditions.append(f'id IN ({subconsulta})')
+
+        base_query += ' WHERE ' + ' AND '.join(conditions)
         
-        base_query += ' ORDER BY fecha_lectura DESC'
+        # Solo se aceptan columnas conocidas para ordenar
+        if orden not in LIBRO_COLUMNAS:
+            orden = 'fecha_lectura'
+        base_query += f" ORDER BY {orden} {'DESC' if desc else 'ASC'}"
+        return base_query, params
+    
+    def _clave_consulta(self, filtros: Optional[Dict], orden: Optional[str],
+                        desc: bool) -> Optional[Tuple]:
+        """Forma canónica de una consulta: mismo resultado, misma clave"""
+        filtros = dict(filtros or {})
+        filtros.setdefault('usuario_id', self.usuario_id)
+        if 'tags' in filtros:
+            filtros['tags'] = tuple(sorted(normalizar_tags(list(filtros['tags']))))
+        if orden not in LIBRO_COLUMNAS:
+            orden = 'fecha_lectura'
+        clave = (tuple(sorted(filtros.items())), orden, bool(desc))
+        try:
+            hash(clave)
+        except TypeError:
+            return None
+        return clave
+    
+    def obtener_libros(self, filtros: Optional[Dict] = None, orden: Optional[str] = None,
+                       desc: bool = True) -> List[Dict]:
+        """Obtiene todos los libros con filtros y orden opcionales.
         
-        libros = self.db.execute_query(base_query, tuple(params), fetch=True)
+        Los resultados se reutilizan mientras la base no cambie; los
+        diccionarios son compartidos entre llamadas y no deben modificarse.
+        """
+        clave = self._clave_consulta(filtros, orden, desc)
+        testigo = (self.db.obtener_version_datos(), self._escrituras)
+        if clave is not None:
+            libros = self.cache_consultas.obtener(clave, testigo)
+            if libros is not None:
+                return list(libros)
         
-        # Convertir a lista de diccionarios
-        column_names = [
-            'id', 'titulo', 'autor', 'genero', 'subgenero', 'anio_lectura',
-            'fecha_lectura', 'calificacion', 'paginas', 'editorial',
-            'comentario', 'fecha_creacion', 'fecha_actualizacion'
-        ]
+        base_query, params = self.construir_consulta(filtros, orden, desc)
+        filas = self.db.execute_query(base_query, tuple(params), fetch=True)
         
-        return [dict(zip(column_names, libro)) for libro in libros]
+        # Convertir a lista de diccionarios
+        libros = [dict(zip(LIBRO_COLUMNAS, libro)) for libro in filas]
+        if clave is not None:
+            self.cache_consultas.guardar(clave, testigo, libros)
+        return list(libros)
     
     def actualizar_libro(self, libro_id: int, libro_data: Dict) -> bool:
-        """Actualiza un libro existente"""
+        """Actualiza un libro existente (valida con ESQUEMA_LIBRO).
+        
+        La actualización es parcial: los campos que no vienen en libro_data
+        conservan el valor guardado en lugar de tomar el valor por defecto
+        del esquema. Retorna False si el libro no existe.
+        """
         query = '''
             UPDATE libros SET
                 titulo = ?,
@@ -186,63 +1461,190 @@ class LibroModel:
                 paginas = ?,
                 editorial = ?,
                 comentario = ?,
+                clave_dedup = ?,
+                estado = ?,
+                portada = ?,
+                isbn = ?,
+                tags = CASE WHEN ? THEN ? ELSE tags END,
                 fecha_actualizacion = CURRENT_TIMESTAMP
             WHERE id = ?
         '''
-        params = (
-            libro_data['titulo'],
-            libro_data['autor'],
-            libro_data['genero'],
-            libro_data.get('subgenero', ''),
-            libro_data.get('anio_lectura', datetime.now().year),
-            libro_data.get('fecha_lectura', datetime.now().date().isoformat()),
-            libro_data.get('calificacion', 0),
-            libro_data.get('paginas', 0),
-            libro_data.get('editorial', ''),
-            libro_data.get('comentario', ''),
-            libro_id
-        )
+        guardados = [nombre for nombre in ESQUEMA_LIBRO.nombres if nombre != 'tags']
+        with self.db._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT usuario_id, {', '.join(guardados)} FROM libros WHERE id = ?", (libro_id,))
+            fila = cursor.fetchone()
+            if fila is None:
+                return False
+            usuario_id = fila[0]
+            libro = ESQUEMA_LIBRO.validar({**dict(zip(guardados, fila[1:])), **libro_data})
+            params = (
+                libro['titulo'], libro['autor'], libro['genero'], libro['subgenero'],
+                libro['anio_lectura'], libro['fecha_lectura'], libro['calificacion'],
+                libro['paginas'], libro['editorial'], libro['comentario'],
+                clave_duplicado(libro['titulo'], libro['autor']),
+                libro['estado'], libro['portada'], libro['isbn'],
+                # Las etiquetas se tocan solo si vinieron en los datos
+                'tags' in libro_data, self._tags_json(libro['tags']),
+                libro_id
+            )
+            cursor.execute(query, params)
+            conn.commit()
         
-        self.db.execute_query(query, params)
+        self._escrituras += 1
+        # Los índices en memoria son del perfil activo: se pasa el dueño del libro
+        self.duplicados.registrar(libro_id, libro['titulo'], libro['autor'], usuario_id)
+        if 'tags' in libro_data:
+            self.indice_tags.registrar(libro_id, libro['tags'] or [], usuario_id)
         return True
     
+    def obtener_libros_incompletos(self, campos: Tuple[str, ...]) -> List[Dict]:
+        """Retorna los libros del perfil con ISBN a los que les falta alguno de los campos"""
+        vacios = ' OR '.join(f"{campo} IS NULL OR {campo} IN ('', 0)" for campo in campos)
+        query = f'''
+            SELECT id, isbn, {', '.join(campos)} FROM libros
+            WHERE usuario_id = ? AND isbn IS NOT NULL AND ({vacios})
+        '''
+        filas = self.db.execute_query(query, (self.usuario_id,), fetch=True)
+        return [dict(zip(('id', 'isbn') + tuple(campos), fila)) for fila in filas]
+    
+    def completar_libros(self, campos: Tuple[str, ...], datos: List[Tuple[int, Dict]]) -> int:
+        """Completa en una sola transacción los campos vacíos de varios libros.
+        
+        Los campos que ya tienen valor no se pisan.
+        """
+        asignaciones = ', '.join(
+            f"{campo} = CASE WHEN {campo} IS NULL OR {campo} IN ('', 0) "
+            f"THEN COALESCE(?, {campo}) ELSE {campo} END"
+            for campo in campos
+        )
+        query = f'UPDATE libros SET {asignaciones}, fecha_actualizacion = CURRENT_TIMESTAMP WHERE id = ?'
+        with self.db._get_connection() as conn:
+            conn.executemany(
+                query,
+                [tuple(valores.get(campo) for campo in campos) + (libro_id,) for libro_id, valores in datos]
+            )
+            conn.commit()
+        
+        self._escrituras += 1
+        return len(datos)
+    
     def eliminar_libro(self, libro_id: int) -> bool:
         """Elimina un libro por su ID"""
         query = 'DELETE FROM libros WHERE id = ?'
         self.db.execute_query(query, (libro_id,))
+        self._escrituras += 1
+        self.duplicados.quitar(libro_id)
+        self.indice_tags.quitar(libro_id)
         return True
     
-    def obtener_estadisticas(self) -> Dict:
-        """Retorna estadísticas sobre los libros leídos"""
+    def buscar_duplicados(self, libro_data: Dict) -> List[Dict]:
+        """Busca libros existentes iguales o parecidos al dado"""
+        exactos = self.db.execute_query(
+            'SELECT id FROM libros WHERE usuario_id = ? AND clave_dedup = ?',
+            (self.usuario_id, clave_duplicado(libro_data.get('titulo', ''), libro_data.get('autor', ''))),
+            fetch=True
+        )
+        ids = [fila[0] for fila in exactos]
+        parecidos = self.duplicados.similares(libro_data.get('titulo', ''), libro_data.get('autor', ''))
+        ids += [libro_id for libro_id, _ in parecidos if libro_id not in ids]
+        
+        if not ids:
+            return []
+        
+        placeholders = ', '.join('?' * len(ids))
+        filas = self.db.execute_query(
+            f"SELECT {', '.join(LIBRO_COLUMNAS)} FROM libros WHERE id IN ({placeholders})",
+            tuple(ids), fetch=True
+        )
+        por_id = {fila[0]: dict(zip(LIBRO_COLUMNAS, fila)) for fila in filas}
+        return [por_id[libro_id] for libro_id in ids if libro_id in por_id]
+    
+    def agrupar_duplicados(self) -> List[List[Dict]]:
+        """Retorna los grupos de libros duplicados o casi duplicados de toda la tabla"""
+        grupos = self.duplicados.agrupar()
+        if not grupos:
+            return []
+        
+        libros = {libro['id']: libro for libro in self.obtener_libros()}
+        return [[libros[libro_id] for libro_id in grupo if libro_id in libros] for grupo in grupos]
+    
+    def obtener_estadisticas(self, usuario_id: Optional[int] = None, meses: int = 24) -> Dict:
+        """Retorna estadísticas sobre los libros leídos por un perfil (por defecto el activo).
+        
+        Incluye las series listas para graficar: libros por mes (los últimos
+        meses, con ceros donde no hubo lecturas), por año, histograma de
+        calificaciones y reparto de géneros. Los conteos por mes y año salen
+        de libros_mensuales. El resultado queda en caché por perfil hasta que
+        cambien los datos, así que puede calcularse en un hilo aparte.
+        """
+        usuario_id = usuario_id or self.usuario_id
+        version = self.db.obtener_version_datos()
+        cacheado = self._cache_estadisticas.get(usuario_id)
+        if cacheado and cacheado[0] == version:
+            return cacheado[1]
+        
         stats = {}
         
         # Total de libros
-        query = 'SELECT COUNT(*) FROM libros'
-        stats['total_libros'] = self.db.execute_query(query, fetch=True)[0][0]
+        query = "SELECT COUNT(*) FROM libros WHERE usuario_id = ? AND estado = 'leído'"
+        stats['total_libros'] = self.db.consultar_analitica(query, (usuario_id,))[0][0]
         
-        # Libros por año
+        # Libros por mes y por año, desde el resumen mensual
         query = '''
-            SELECT anio_lectura, COUNT(*) as count 
-            FROM libros 
-            GROUP BY anio_lectura 
-            ORDER BY anio_lectura DESC
+            SELECT periodo, libros 
+            FROM libros_mensuales 
+            WHERE usuario_id = ? AND libros > 0
         '''
-        stats['libros_por_anio'] = self.db.execute_query(query, fetch=True)
+        por_periodo = self.db.consultar_analitica(query, (usuario_id,))
+        por_anio: Dict[int, int] = {}
+        por_mes: Dict[str, int] = {}
+        for periodo, cantidad in por_periodo:
+            anio = int(periodo[:4])
+            por_anio[anio] = por_anio.get(anio, 0) + cantidad
+            por_mes[periodo] = cantidad
+        stats['libros_por_anio'] = sorted(por_anio.items(), reverse=True)
+        
+        hoy = date.today()
+        serie_mensual = []
+        for atras in range(meses - 1, -1, -1):
+            anio, mes = divmod(hoy.year * 12 + hoy.month - 1 - atras, 12)
+            periodo = f'{anio:04d}-{mes + 1:02d}'
+            serie_mensual.append((periodo, por_mes.get(periodo, 0)))
+        stats['libros_por_mes'] = serie_mensual
         
         # Promedio de calificación
-        query = 'SELECT AVG(calificacion) FROM libros'
-        stats['promedio_calificacion'] = self.db.execute_query(query, fetch=True)[0][0] or 0
+        query = "SELECT AVG(calificacion) FROM libros WHERE usuario_id = ? AND estado = 'leído'"
+        stats['promedio_calificacion'] = self.db.consultar_analitica(query, (usuario_id,))[0][0] or 0
         
-        # Géneros más leídos
+        # Histograma de calificaciones, de media en media estrella
         query = '''
-            SELECT genero, COUNT(*) as count 
+            SELECT CAST(ROUND(calificacion * 2) AS INTEGER), COUNT(*) 
             FROM libros 
-            GROUP BY genero 
-            ORDER BY count DESC 
-            LIMIT 5
+            WHERE usuario_id = ? AND estado = 'leído' AND calificacion > 0
+            GROUP BY 1
         '''
-        stats['generos_populares'] = self.db.execute_query(query, fetch=True)
+        por_media_estrella = dict(self.db.consultar_analitica(query, (usuario_id,)))
+        stats['histograma_calificacion'] = [
+            (medias / 2, por_media_estrella.get(medias, 0)) for medias in range(2, 11)
+        ]
         
+        # Reparto de géneros (los más leídos primero)
+        query = '''
+            SELECT COALESCE(NULLIF(genero, ''), 'Sin género'), COUNT(*) as count 
+            FROM libros 
+            WHERE usuario_id = ? AND estado = 'leído'
+            GROUP BY 1 
+            ORDER BY count DESC
+        '''
+        stats['reparto_generos'] = self.db.consultar_analitica(query, (usuario_id,))
+        stats['generos_populares'] = stats['reparto_generos'][:5]
+        
+        # Libros por estado, incluidos los pendientes
+        query = 'SELECT estado, COUNT(*) FROM libros WHERE usuario_id = ? GROUP BY estado'
+        stats['libros_por_estado'] = dict(self.db.consultar_analitica(query, (usuario_id,)))
+        
+        self._cache_estadisticas[usuario_id] = (version, stats)
         return stats
     
     def exportar_a_csv(self, file_path: str, filtros: Optional[Dict] = None) -> bool:
@@ -253,25 +1655,119 @@ class LibroModel:
         
         import csv
         
+        tags = self.obtener_tags_por_libro()
         with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
-            fieldnames = libros[0].keys()
+            fieldnames = list(libros[0].keys()) + ['tags']
             writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
             
             writer.writeheader()
-            writer.writerows(libros)
+            writer.writerows(
+                dict(libro, tags=', '.join(tags.get(libro['id'], []))) for libro in libros
+            )
         
         return True
+    
+    def importar_desde_csv(self, file_path: str, tamanio_lote: int = 10000) -> ResultadoLote:
+        """Importa libros de un CSV con encabezado (por ejemplo, uno exportado).
+        
+        Se validan por lotes con ESQUEMA_LIBRO y se crean en el perfil activo;
+        las columnas desconocidas se ignoran. Los errores indican la fila de
+        datos (contando desde 0) en todo el archivo.
+        """
+        import csv
+        
+        total = ResultadoLote()
+        leidas = 0
+        with open(file_path, newline='', encoding='utf-8-sig') as csvfile:
+            lector = csv.DictReader(csvfile)
+            while True:
+                filas = list(itertools.islice(lector, tamanio_lote))
+                if not filas:
+                    break
+                for fila in filas:
+                    # Un CSV exportado trae el perfil de origen
+                    fila.pop('usuario_id', None)
+                
+                resultado = self.crear_libros(filas)
+                total.validas.extend(resultado.validas)
+                total.indices.extend(leidas + indice for indice in resultado.indices)
+                for error in resultado.errores:
+                    error.fila += leidas
+                total.errores.extend(resultado.errores)
+                leidas += len(filas)
+        
+        return total
+
+@dataclass
+class Preferencias:
+    """Preferencias tipadas de un perfil, incluido el estado de la interfaz"""
+    
+    anchos_columnas: Dict[str, int] = field(default_factory=dict)
+    # Sin filtros guardados se arranca en la vista de leídos (índice parcial)
+    ultimos_filtros: Dict = field(default_factory=lambda: {'estado': ESTADO_POR_DEFECTO})
+    orden: Optional[str] = None
+    orden_desc: bool = True
+    tamanio_pagina: int = 200
+    geometria: Optional[str] = None
+    # Claves desconocidas se conservan tal cual para no perderlas al guardar
+    extra: Dict = field(default_factory=dict)
+    
+    def __post_init__(self):
+        self._sucio = False
+    
+    @classmethod
+    def desde_dict(cls, datos: Optional[Dict]) -> 'Preferencias':
+        """Crea las preferencias a partir del JSON guardado"""
+        datos = dict(datos or {})
+        conocidas = {f.name for f in fields(cls)} - {'extra'}
+        valores = {clave: datos.pop(clave) for clave in list(datos) if clave in conocidas}
+        return cls(**valores, extra=datos)
+    
+    def a_dict(self) -> Dict:
+        """Retorna las preferencias como diccionario serializable"""
+        datos = dict(self.extra)
+        datos.update({f.name: getattr(self, f.name) for f in fields(self) if f.name != 'extra'})
+        return datos
+    
+    def actualizar(self, **cambios) -> bool:
+        """Modifica preferencias y las marca para guardar si cambió algo"""
+        for clave, valor in cambios.items():
+            if clave not in self.__dataclass_fields__:
+                raise AttributeError(f"Preferencia desconocida: {clave}")
+            if getattr(self, clave) != valor:
+                setattr(self, clave, valor)
+                self._sucio = True
+        return self._sucio
+    
+    @property
+    def sucio(self) -> bool:
+        """Indica si hay cambios sin guardar"""
+        return self._sucio
 
 class UsuarioModel:
-    """Modelo para manejar los datos del usuario"""
+    """Modelo para manejar los datos del usuario.
     
-    def __init__(self, db_manager: DatabaseManager):
+    Cada perfil se lee una sola vez y queda en memoria; las preferencias se
+    modifican en memoria y se escriben juntas con guardar_preferencias.
+    """
+    
+    def __init__(self, db_manager: Almacenamiento):
         self.db = db_manager
+        self.usuario_id = db_manager.obtener_usuario_por_defecto()
+        self._cache: Dict[int, Dict] = {}
+        self._preferencias: Dict[int, Preferencias] = {}
+    
+    def seleccionar_usuario(self, usuario_id: int):
+        """Cambia el perfil activo"""
+        self.usuario_id = usuario_id
     
-    def obtener_usuario(self) -> Dict:
-        """Obtiene los datos del usuario"""
-        query = 'SELECT * FROM usuario LIMIT 1'
-        usuario = self.db.execute_query(query, fetch=True)[0]
+    def _cargar_usuario(self, usuario_id: int) -> Dict:
+        """Lee un perfil de la base y lo guarda en memoria"""
+        query = '''
+            SELECT id, nombre, email, avatar, preferencias, fecha_creacion, fecha_actualizacion
+            FROM usuario WHERE id = ?
+        '''
+        usuario = self.db.execute_query(query, (usuario_id,), fetch=True)[0]
         
         column_names = [
             'id', 'nombre', 'email', 'avatar', 'preferencias',
@@ -279,12 +1775,76 @@ class UsuarioModel:
         ]
         
         usuario_dict = dict(zip(column_names, usuario))
-        usuario_dict['preferencias'] = json.loads(usuario_dict['preferencias'])
-        
+        self._preferencias[usuario_id] = Preferencias.desde_dict(
+            json.loads(usuario_dict.pop('preferencias') or '{}')
+        )
+        self._cache[usuario_id] = usuario_dict
         return usuario_dict
     
+    def obtener_usuario(self, usuario_id: Optional[int] = None) -> Dict:
+        """Obtiene los datos de un perfil (por defecto el activo)"""
+        usuario_id = usuario_id or self.usuario_id
+        usuario = self._cache.get(usuario_id) or self._cargar_usuario(usuario_id)
+        return {**usuario, 'preferencias': self._preferencias[usuario_id].a_dict()}
+    
+    def obtener_preferencias(self, usuario_id: Optional[int] = None) -> Preferencias:
+        """Retorna el objeto de preferencias en memoria de un perfil"""
+        usuario_id = usuario_id or self.usuario_id
+        if usuario_id not in self._preferencias:
+            self._cargar_usuario(usuario_id)
+        return self._preferencias[usuario_id]
+    
+    def guardar_preferencias(self) -> int:
+        """Escribe en una sola transacción las preferencias modificadas y retorna cuántas"""
+        pendientes = [(usuario_id, prefs) for usuario_id, prefs in self._preferencias.items() if prefs.sucio]
+        if not pendientes:
+            return 0
+        
+        with self.db._get_connection() as conn:
+            conn.executemany(
+                'UPDATE usuario SET preferencias = ? WHERE id = ?',
+                [(json.dumps(prefs.a_dict()), usuario_id) for usuario_id, prefs in pendientes]
+            )
+            conn.commit()
+        
+        for _, prefs in pendientes:
+            prefs._sucio = False
+        return len(pendientes)
+    
+    def obtener_usuarios(self) -> List[Dict]:
+        """Obtiene todos los perfiles (solo id, nombre y email)"""
+        filas = self.db.execute_query('SELECT id, nombre, email FROM usuario ORDER BY id', fetch=True)
+        return [dict(zip(['id', 'nombre', 'email'], fila)) for fila in filas]
+    
+    def crear_usuario(self, usuario_data: Dict) -> int:
+        """Crea un nuevo perfil y retorna su ID"""
+        query = '''
+            INSERT INTO usuario (nombre, email, avatar, preferencias)
+            VALUES (?, ?, ?, ?)
+        '''
+        params = (
+            usuario_data['nombre'],
+            usuario_data.get('email', ''),
+            usuario_data.get('avatar', 'default_avatar.png'),
+            json.dumps(usuario_data.get('preferencias', {}))
+        )
+        
+        with self.db._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            usuario_id = cursor.lastrowid
+            conn.commit()
+        
+        return usuario_id
+    
     def actualizar_usuario(self, usuario_data: Dict) -> bool:
         """Actualiza los datos del usuario"""
+        usuario_id = usuario_data['id']
+        prefs = self.obtener_preferencias(usuario_id)
+        if 'preferencias' in usuario_data:
+            nuevas = Preferencias.desde_dict(usuario_data['preferencias'])
+            prefs.actualizar(**{f.name: getattr(nuevas, f.name) for f in fields(nuevas)})
+        
         query = '''
             UPDATE usuario SET
                 nombre = ?,
@@ -298,45 +1858,668 @@ class UsuarioModel:
             usuario_data['nombre'],
             usuario_data['email'],
             usuario_data.get('avatar', 'default_avatar.png'),
-            json.dumps(usuario_data.get('preferencias', {})),
-            usuario_data['id']
+            json.dumps(prefs.a_dict()),
+            usuario_id
         )
         
         self.db.execute_query(query, params)
+        
+        # Mantener la copia en memoria sincronizada
+        self._cache[usuario_id].update({
+            'nombre': usuario_data['nombre'],
+            'email': usuario_data['email'],
+            'avatar': usuario_data.get('avatar', 'default_avatar.png')
+        })
+        prefs._sucio = False
         return True
 
 class InformeModel:
     """Modelo para generar informes de lectura"""
     
-    def __init__(self, db_manager: DatabaseManager):
+    def __init__(self, db_manager: Almacenamiento):
         self.db = db_manager
         self.libro_model = LibroModel(db_manager)
     
     def generar_informe_lectura(self, libro_id: int) -> Dict:
         """Genera un informe detallado para un libro específico"""
-        query = 'SELECT * FROM libros WHERE id = ?'
+        query = f"SELECT {', '.join(LIBRO_COLUMNAS)} FROM libros WHERE id = ?"
         libro = self.db.execute_query(query, (libro_id,), fetch=True)
         
         if not libro:
             return {}
         
-        column_names = [
-            'id', 'titulo', 'autor', 'genero', 'subgenero', 'anio_lectura',
-            'fecha_lectura', 'calificacion', 'paginas', 'editorial',
-            'comentario', 'fecha_creacion', 'fecha_actualizacion'
-        ]
-        
-        libro_dict = dict(zip(column_names, libro[0]))
+        libro_dict = dict(zip(LIBRO_COLUMNAS, libro[0]))
         
-        # Agregar estadísticas adicionales
-        stats = self.libro_model.obtener_estadisticas()
+        # Agregar estadísticas adicionales del perfil dueño del libro
+        stats = self.libro_model.obtener_estadisticas(libro_dict['usuario_id'])
         libro_dict['total_libros_leidos'] = stats['total_libros']
         libro_dict['promedio_calificacion_global'] = stats['promedio_calificacion']
+        libro_dict['tags'] = self.libro_model.obtener_tags_libro(libro_id)
         
         return libro_dict
 
-# Inicialización del modelo
-db_manager = DatabaseManager()
-libro_model = LibroModel(db_manager)
-usuario_model = UsuarioModel(db_manager)
-informe_model = InformeModel(db_manager)
\ No newline at end of file
+class SesionModel:
+    """Modelo para manejar las sesiones de lectura y sus resúmenes por período.
+    
+    Al borrar un libro, un trigger borra sus sesiones y las descuenta de los
+    resúmenes (deshacer la baja no las recupera).
+    """
+    
+    TABLAS_RESUMEN = {
+        'dia': 'sesiones_diarias',
+        'semana': 'sesiones_semanales',
+        'mes': 'sesiones_mensuales'
+    }
+    
+    # Las mismas claves que _periodos, en SQL; la semana ISO es la del jueves
+    # de esa semana (sin depender de %V, que SQLite agregó hace poco)
+    PERIODOS_SQL = {
+        'dia': 'date(inicio)',
+        'semana': "strftime('%Y', inicio, '-3 days', 'weekday 4') || '-W' || "
+                  "printf('%02d', (strftime('%j', inicio, '-3 days', 'weekday 4') - 1) / 7 + 1)",
+        'mes': "strftime('%Y-%m', inicio)"
+    }
+    
+    def __init__(self, db_manager: DatabaseManager):
+        self.db = db_manager
+        self.usuario_id = db_manager.obtener_usuario_por_defecto()
+    
+    def seleccionar_usuario(self, usuario_id: int):
+        """Cambia el perfil cuyos resúmenes se consultan"""
+        self.usuario_id = usuario_id
+    
+    @staticmethod
+    def _normalizar_fecha(valor) -> datetime:
+        """Convierte un datetime o texto ISO en datetime"""
+        if isinstance(valor, datetime):
+            return valor.replace(microsecond=0)
+        return datetime.fromisoformat(str(valor))
+    
+    @staticmethod
+    def _periodos(inicio: datetime) -> Dict[str, str]:
+        """Retorna la clave de día, semana ISO y mes de una fecha"""
+        anio, semana, _ = inicio.isocalendar()
+        return {
+            'dia': inicio.date().isoformat(),
+            'semana': f"{anio}-W{semana:02d}",
+            'mes': inicio.strftime('%Y-%m')
+        }
+    
+    @classmethod
+    def _acumular(cls, resumenes: Dict, usuario_id: int, inicio: datetime,
+                  fin: datetime, paginas: int):
+        """Suma una sesión a los resúmenes pendientes de escribir"""
+        minutos = (fin - inicio).total_seconds() / 60
+        for tipo, periodo in cls._periodos(inicio).items():
+            acumulado = resumenes.setdefault((tipo, usuario_id, periodo), [0, 0, 0.0])
+            acumulado[0] += 1
+            acumulado[1] += paginas
+            acumulado[2] += minutos
+    
+    @classmethod
+    def _escribir_resumenes(cls, cursor, resumenes: Dict):
+        """Suma los resúmenes acumulados a las tablas de resumen"""
+        for (tipo, usuario_id, periodo), (cantidad, paginas, minutos) in resumenes.items():
+            cursor.execute(f'''
+                INSERT INTO {cls.TABLAS_RESUMEN[tipo]} (usuario_id, periodo, sesiones, paginas, minutos)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (usuario_id, periodo) DO UPDATE SET
+                    sesiones = sesiones + excluded.sesiones,
+                    paginas = paginas + excluded.paginas,
+                    minutos = minutos + excluded.minutos
+            ''', (usuario_id, periodo, cantidad, paginas, minutos))
+    
+    @classmethod
+    def crear_triggers(cls, cursor):
+        """(Re)crea el trigger que borra las sesiones de un libro eliminado
+        y las descuenta de los resúmenes de su perfil"""
+        descontar = ''.join(f'''
+            UPDATE {tabla} SET
+                sesiones = {tabla}.sesiones - s.sesiones,
+                paginas = {tabla}.paginas - s.paginas,
+                minutos = {tabla}.minutos - s.minutos
+            FROM (
+                SELECT {cls.PERIODOS_SQL[tipo]} AS periodo, COUNT(*) AS sesiones, SUM(paginas) AS paginas,
+                       SUM(strftime('%s', fin) - strftime('%s', inicio)) / 60.0 AS minutos
+                FROM sesiones WHERE libro_id = OLD.id GROUP BY 1
+            ) AS s
+            WHERE {tabla}.usuario_id = OLD.usuario_id AND {tabla}.periodo = s.periodo;
+            DELETE FROM {tabla} WHERE usuario_id = OLD.usuario_id AND sesiones <= 0;
+        ''' for tipo, tabla in cls.TABLAS_RESUMEN.items())
+        cursor.execute('DROP TRIGGER IF EXISTS trg_libros_sesiones_baja')
+        cursor.execute(f'''
+            CREATE TRIGGER trg_libros_sesiones_baja AFTER DELETE ON libros
+            BEGIN {descontar} DELETE FROM sesiones WHERE libro_id = OLD.id; END
+        ''')
+    
+    @classmethod
+    def reconstruir_resumenes(cls, cursor):
+        """Recalcula todos los resúmenes a partir de la tabla de sesiones"""
+        for tabla in cls.TABLAS_RESUMEN.values():
+            cursor.execute(f'DELETE FROM {tabla}')
+        
+        resumenes = {}
+        filas = cursor.execute('''
+            SELECT s.inicio, s.fin, s.paginas, l.usuario_id
+            FROM sesiones s JOIN libros l ON l.id = s.libro_id
+        ''').fetchall()
+        for inicio, fin, paginas, usuario_id in filas:
+            cls._acumular(resumenes, usuario_id, cls._normalizar_fecha(inicio),
+                          cls._normalizar_fecha(fin), paginas)
+        cls._escribir_resumenes(cursor, resumenes)
+    
+    def registrar_sesion(self, libro_id: int, inicio, fin, paginas: int = 0) -> bool:
+        """Registra una sesión de lectura"""
+        self.registrar_sesiones([{
+            'libro_id': libro_id, 'inicio': inicio, 'fin': fin, 'paginas': paginas
+        }])
+        return True
+    
+    def registrar_sesiones(self, sesiones: List[Dict]) -> int:
+        """Registra varias sesiones en una sola transacción y retorna cuántas se agregaron.
+        
+        Las filas solo se agregan (nunca se reescriben) y los resúmenes por
+        período se actualizan en la misma transacción.
+        """
+        filas = []
+        for sesion in sesiones:
+            inicio = self._normalizar_fecha(sesion['inicio'])
+            fin = self._normalizar_fecha(sesion['fin'])
+            if fin < inicio:
+                raise ValueError("La sesión termina antes de empezar")
+            filas.append((inicio, sesion['libro_id'], fin, int(sesion.get('paginas', 0) or 0)))
+        
+        if not filas:
+            return 0
+        
+        with self.db._get_connection() as conn:
+            cursor = conn.cursor()
+            
+            # Los resúmenes se guardan por el perfil dueño de cada libro
+            ids = sorted({libro_id for _, libro_id, _, _ in filas})
+            duenios = dict(cursor.execute(
+                f"SELECT id, usuario_id FROM libros WHERE id IN ({', '.join('?' * len(ids))})",
+                ids
+            ).fetchall())
+            
+            resumenes = {}
+            for inicio, libro_id, fin, paginas in filas:
+                self._acumular(resumenes, duenios.get(libro_id, self.usuario_id), inicio, fin, paginas)
+            
+            cursor.executemany('''
+                INSERT INTO sesiones (inicio, libro_id, fin, paginas)
+                VALUES (?, ?, ?, ?)
+            ''', [(inicio.isoformat(sep=' '), libro_id, fin.isoformat(sep=' '), paginas)
+                  for inicio, libro_id, fin, paginas in filas])
+            self._escribir_resumenes(cursor, resumenes)
+            conn.commit()
+        
+        return len(filas)
+    
+    def obtener_sesiones(self, libro_id: Optional[int] = None) -> List[Dict]:
+        """Obtiene las sesiones de lectura, opcionalmente de un solo libro"""
+        if libro_id is None:
+            query = 'SELECT inicio, libro_id, fin, paginas FROM sesiones ORDER BY inicio'
+            params = ()
+        else:
+            query = '''
+                SELECT inicio, libro_id, fin, paginas FROM sesiones
+                WHERE libro_id = ? ORDER BY inicio
+            '''
+            params = (libro_id,)
+        
+        filas = self.db.execute_query(query, params, fetch=True)
+        return [dict(zip(['inicio', 'libro_id', 'fin', 'paginas'], fila)) for fila in filas]
+    
+    def obtener_resumen(self, tipo: str = 'dia', desde: Optional[str] = None,
+                        hasta: Optional[str] = None) -> List[Dict]:
+        """Obtiene el resumen precalculado del perfil activo por día, semana o mes"""
+        if tipo not in self.TABLAS_RESUMEN:
+            raise ValueError(f"Tipo de resumen desconocido: {tipo}")
+        
+        query = f'SELECT periodo, sesiones, paginas, minutos FROM {self.TABLAS_RESUMEN[tipo]}'
+        conditions = ['usuario_id = ?']
+        params = [self.usuario_id]
+        if desde:
+            conditions.append('periodo >= ?')
+            params.append(desde)
+        if hasta:
+            conditions.append('periodo <= ?')
+            params.append(hasta)
+        query += ' WHERE ' + ' AND '.join(conditions)
+        query += ' ORDER BY periodo'
+        
+        filas = self.db.execute_query(query, tuple(params), fetch=True)
+        return [dict(zip(['periodo', 'sesiones', 'paginas', 'minutos'], fila)) for fila in filas]
+    
+    def obtener_mapa_calor(self, anios: int = 3) -> Dict[str, int]:
+        """Retorna las páginas leídas por día de los últimos años, para el mapa de calor"""
+        desde = f"{datetime.now().year - anios + 1}-01-01"
+        return {fila['periodo']: fila['paginas'] for fila in self.obtener_resumen('dia', desde)}
+
+class MetaModel:
+    """Metas anuales de lectura por perfil y su proyección.
+    
+    El avance sale de libros_mensuales, que los triggers actualizan en cada
+    alta, edición o baja de un libro, así que calcularlo solo lee unas
+    pocas filas por año en lugar de recorrer la tabla libros.
+    """
+    
+    # Período "AAAA-MM" de un libro; "AAAA-00" si la fecha no es del año de lectura
+    PERIODO_SQL = (
+        "printf('%04d-%s', {fila}.anio_lectura, CASE "
+        "WHEN substr({fila}.fecha_lectura, 1, 4) = printf('%04d', {fila}.anio_lectura) "
+        "THEN substr({fila}.fecha_lectura, 6, 2) ELSE '00' END)"
+    )
+    
+    # Meses que se consideran para el ritmo reciente (incluido el actual)
+    MESES_RITMO = 3
+    
+    def __init__(self, db_manager: DatabaseManager):
+        self.db = db_manager
+        self.usuario_id = db_manager.obtener_usuario_por_defecto()
+        self._cache_progreso: Dict[Tuple, Tuple] = {}
+    
+    def seleccionar_usuario(self, usuario_id: int):
+        """Cambia el perfil cuyas metas se consultan"""
+        self.usuario_id = usuario_id
+    
+    @classmethod
+    def crear_triggers(cls, cursor):
+        """(Re)crea los triggers que mantienen libros_mensuales al día"""
+        nuevo = cls.PERIODO_SQL.format(fila='NEW')
+        viejo = cls.PERIODO_SQL.format(fila='OLD')
+        sumar = f'''
+            INSERT INTO libros_mensuales (usuario_id, periodo, libros, paginas)
+            SELECT NEW.usuario_id, {nuevo}, 1, COALESCE(NEW.paginas, 0)
+            WHERE NEW.anio_lectura IS NOT NULL AND NEW.estado = 'leído'
+            ON CONFLICT (usuario_id, periodo) DO UPDATE SET
+                libros = libros + 1,
+                paginas = paginas + excluded.paginas;
+        '''
+        restar = f'''
+            UPDATE libros_mensuales SET
+                libros = libros - 1,
+                paginas = paginas - COALESCE(OLD.paginas, 0)
+            WHERE usuario_id = OLD.usuario_id AND periodo = {viejo} AND OLD.estado = 'leído';
+        '''
+        for evento in ('insert', 'update', 'delete'):
+            cursor.execute(f'DROP TRIGGER IF EXISTS trg_resumen_libros_{evento}')
+        cursor.execute(f'''
+            CREATE TRIGGER trg_resumen_libros_insert AFTER INSERT ON libros
+            BEGIN {sumar} END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER trg_resumen_libros_update
+            AFTER UPDATE OF anio_lectura, fecha_lectura, paginas, usuario_id, estado ON libros
+            BEGIN {restar} {sumar} END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER trg_resumen_libros_delete AFTER DELETE ON libros
+            BEGIN {restar} END
+        ''')
+    
+    @classmethod
+    def reconstruir_resumen(cls, cursor):
+        """Recalcula libros_mensuales a partir de la tabla libros"""
+        cursor.execute('DELETE FROM libros_mensuales')
+        cursor.execute(f'''
+            INSERT INTO libros_mensuales (usuario_id, periodo, libros, paginas)
+            SELECT l.usuario_id, {cls.PERIODO_SQL.format(fila='l')}, COUNT(*), SUM(COALESCE(l.paginas, 0))
+            FROM libros l
+            WHERE l.anio_lectura IS NOT NULL AND l.estado = 'leído'
+            GROUP BY 1, 2
+        ''')
+    
+    def fijar_meta(self, anio: int, libros: Optional[int] = None, paginas: Optional[int] = None) -> bool:
+        """Guarda la meta de libros y páginas de un año para el perfil activo"""
+        self.db.execute_query('''
+            INSERT INTO metas (usuario_id, anio, libros, paginas) VALUES (?, ?, ?, ?)
+            ON CONFLICT (usuario_id, anio) DO UPDATE SET
+                libros = excluded.libros,
+                paginas = excluded.paginas
+        ''', (self.usuario_id, anio, libros or None, paginas or None))
+        return True
+    
+    def obtener_meta(self, anio: Optional[int] = None) -> Optional[Dict]:
+        """Retorna la meta de un año (por defecto el actual) o None si no hay"""
+        anio = anio or date.today().year
+        filas = self.db.execute_query(
+            'SELECT libros, paginas FROM metas WHERE usuario_id = ? AND anio = ?',
+            (self.usuario_id, anio), fetch=True
+        )
+        if not filas:
+            return None
+        return {'anio': anio, 'libros': filas[0][0], 'paginas': filas[0][1]}
+    
+    @staticmethod
+    def _proyectar(meta: Optional[int], actual: int, ritmo: float, fraccion: float,
+                   dias_restantes: int, hoy: date) -> Optional[Dict]:
+        """Proyecta una métrica al fin de año con el ritmo diario dado"""
+        if not meta:
+            return None
+        
+        if actual >= meta:
+            fecha_estimada = 'cumplida'
+        elif ritmo > 0:
+            fecha_estimada = (hoy + timedelta(days=-(-(meta - actual) // ritmo))).isoformat()
+        else:
+            fecha_estimada = None
+        
+        proyeccion = actual + ritmo * dias_restantes
+        return {
+            'meta': meta,
+            'actual': actual,
+            'esperado': round(meta * fraccion, 1),
+            'proyeccion': round(proyeccion, 1),
+            'fecha_estimada': fecha_estimada,
+            'atrasado': actual < meta and proyeccion < meta
+        }
+    
+    def obtener_progreso(self, anio: Optional[int] = None, hoy: Optional[date] = None) -> Optional[Dict]:
+        """Retorna el avance y la proyección de la meta de un año, o None si no hay meta.
+        
+        La proyección usa el ritmo de los últimos MESES_RITMO meses. El
+        resultado queda en caché hasta que cambien los datos o el día.
+        """
+        hoy = hoy or date.today()
+        anio = anio or hoy.year
+        clave = (self.usuario_id, anio, hoy)
+        version = self.db.obtener_version_datos()
+        cacheado = self._cache_progreso.get(clave)
+        if cacheado and cacheado[0] == version:
+            return cacheado[1]
+        
+        meta = self.obtener_meta(anio)
+        if meta is None:
+            return None
+        
+        # Ventana del ritmo reciente: desde el primer día de hace MESES_RITMO - 1 meses
+        mes = hoy.year * 12 + hoy.month - 1 - (self.MESES_RITMO - 1)
+        inicio_ventana = date(mes // 12, mes % 12 + 1, 1)
+        
+        filas = self.db.execute_query('''
+            SELECT periodo, libros, paginas FROM libros_mensuales
+            WHERE usuario_id = ? AND periodo >= ? AND periodo < ?
+        ''', (self.usuario_id, f"{min(anio, inicio_ventana.year):04d}", f"{max(anio, hoy.year) + 1:04d}"), fetch=True)
+        
+        libros = sum(l for periodo, l, _ in filas if periodo.startswith(f"{anio:04d}-"))
+        paginas = sum(p for periodo, _, p in filas if periodo.startswith(f"{anio:04d}-"))
+        
+        inicio_anio = date(anio, 1, 1)
+        dias_anio = (date(anio + 1, 1, 1) - inicio_anio).days
+        if anio == hoy.year:
+            recientes = [(l, p) for periodo, l, p in filas
+                         if periodo[5:] != '00' and periodo >= inicio_ventana.strftime('%Y-%m')]
+            dias_ventana = (hoy - inicio_ventana).days + 1
+            ritmo_libros = sum(l for l, _ in recientes) / dias_ventana
+            ritmo_paginas = sum(p for _, p in recientes) / dias_ventana
+            dias_transcurridos = (hoy - inicio_anio).days + 1
+        else:
+            # Un año cerrado no se proyecta; uno futuro todavía no empezó
+            ritmo_libros = ritmo_paginas = 0.0
+            dias_transcurridos = dias_anio if anio < hoy.year else 0
+        
+        fraccion = dias_transcurridos / dias_anio
+        dias_restantes = dias_anio - dias_transcurridos
+        progreso = {
+            'anio': anio,
+            'libros': self._proyectar(meta['libros'], libros, ritmo_libros, fraccion, dias_restantes, hoy),
+            'paginas': self._proyectar(meta['paginas'], paginas, ritmo_paginas, fraccion, dias_restantes, hoy)
+        }
+        
+        self._cache_progreso = {clave: (version, progreso)}
+        return progreso
+
+class CambioModel:
+    """Diario de cambios de la tabla libros.
+    
+    Los triggers guardan una fila por cada alta, modificación o baja con la
+    imagen anterior y posterior del libro como arreglo JSON (en el orden de
+    las columnas de la tabla). El número de versión crece siempre, así que
+    cualquier consumidor puede pedir solo lo ocurrido desde su última versión.
+    """
+    
+    def __init__(self, db_manager: DatabaseManager):
+        self.db = db_manager
+    
+    @staticmethod
+    def _columnas(cursor) -> List[str]:
+        """Retorna las columnas actuales de la tabla libros"""
+        return [fila[1] for fila in cursor.execute('PRAGMA table_info(libros)')]
+    
+    @classmethod
+    def crear_triggers(cls, cursor):
+        """(Re)crea los triggers del diario con las columnas actuales de libros"""
+        columnas = cls._columnas(cursor)
+        imagen = lambda fila: f"json_array({', '.join(f'{fila}.{c}' for c in columnas)})"
+        
+        triggers = {
+            'trg_libros_insert': f"AFTER INSERT ON libros BEGIN "
+                                 f"INSERT INTO cambios (libro_id, operacion, despues) "
+                                 f"VALUES (NEW.id, 'I', {imagen('NEW')}); END",
+            'trg_libros_update': f"AFTER UPDATE ON libros BEGIN "
+                                 f"INSERT INTO cambios (libro_id, operacion, antes, despues) "
+                                 f"VALUES (NEW.id, 'U', {imagen('OLD')}, {imagen('NEW')}); END",
+            'trg_libros_delete': f"AFTER DELETE ON libros BEGIN "
+                                 f"INSERT INTO cambios (libro_id, operacion, antes) "
+                                 f"VALUES (OLD.id, 'D', {imagen('OLD')}); END"
+        }
+        for nombre, cuerpo in triggers.items():
+            cursor.execute(f'DROP TRIGGER IF EXISTS {nombre}')
+            cursor.execute(f'CREATE TRIGGER {nombre} {cuerpo}')
+    
+    def obtener_version_actual(self) -> int:
+        """Retorna la última versión registrada en el diario (0 si está vacío)"""
+        return self.db.execute_query('SELECT COALESCE(MAX(version), 0) FROM cambios', fetch=True)[0][0]
+    
+    def obtener_cambios_desde(self, version: int, limite: Optional[int] = None) -> List[Dict]:
+        """Retorna los cambios posteriores a una versión, del más viejo al más nuevo"""
+        query = '''
+            SELECT version, libro_id, operacion, antes, despues, fecha
+            FROM cambios WHERE version > ? ORDER BY version
+        '''
+        params: Tuple = (version,)
+        if limite:
+            query += ' LIMIT ?'
+            params = (version, limite)
+        
+        with self.db._get_connection() as conn:
+            columnas = self._columnas(conn.cursor())
+            filas = conn.execute(query, params).fetchall()
+        
+        return [self._decodificar(fila, columnas) for fila in filas]
+    
+    @staticmethod
+    def _decodificar(fila: Tuple, columnas: List[str]) -> Dict:
+        """Convierte una fila del diario en diccionario con las imágenes como dict"""
+        version, libro_id, operacion, antes, despues, fecha = fila
+        return {
+            'version': version,
+            'libro_id': libro_id,
+            'operacion': operacion,
+            'antes': dict(zip(columnas, json.loads(antes))) if antes else None,
+            'despues': dict(zip(columnas, json.loads(despues))) if despues else None,
+            'fecha': fecha
+        }
+    
+    def deshacer(self, version: int) -> Optional[int]:
+        """Revierte el cambio de una versión y retorna la versión del cambio inverso.
+        
+        Deshacer el cambio inverso vuelve a aplicar el original, por lo que el
+        mismo método sirve para rehacer. Las etiquetas vienen en la columna
+        tags de la imagen y los triggers rearman libro_tags (quien use un
+        IndiceTags debe invalidarlo). Retorna None si ya no se puede revertir
+        (el libro ya no existe, volvió a existir o cambió desde entonces).
+        """
+        with self.db._get_connection() as conn:
+            cursor = conn.cursor()
+            columnas = self._columnas(cursor)
+            fila = cursor.execute('''
+                SELECT version, libro_id, operacion, antes, despues, fecha
+                FROM cambios WHERE version = ?
+            ''', (version,)).fetchone()
+            if not fila:
+                return None
+            cambio = self._decodificar(fila, columnas)
+            
+            # Un alta o una modificación solo se revierte si el libro sigue como
+            # lo dejó ese cambio (misma imagen que la del trigger): si se editó
+            # después, revertir pisaría esa edición y se informa como conflicto
+            vigente = f"json_array({', '.join(columnas)}) = ?"
+            if cambio['operacion'] == 'I':
+                cursor.execute(f'DELETE FROM libros WHERE id = ? AND {vigente}',
+                               (cambio['libro_id'], fila[4]))
+            elif cambio['operacion'] == 'U':
+                # Restaurar es una escritura nueva: la fecha de actualización avanza
+                antes = {k: v for k, v in cambio['antes'].items()
+                         if k not in ('id', 'fecha_actualizacion')}
+                asignaciones = ', '.join(f'{columna} = ?' for columna in antes)
+                cursor.execute(
+                    f'UPDATE libros SET {asignaciones}, fecha_actualizacion = CURRENT_TIMESTAMP '
+                    f'WHERE id = ? AND {vigente}',
+                    (*antes.values(), cambio['libro_id'], fila[4])
+                )
+            else:
+                antes = dict(cambio['antes'])
+                antes['fecha_actualizacion'] = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+                cursor.execute(
+                    f"INSERT OR IGNORE INTO libros ({', '.join(antes)}) "
+                    f"VALUES ({', '.join('?' * len(antes))})",
+                    tuple(antes.values())
+                )
+            
+            if cursor.rowcount == 0:
+                conn.rollback()
+                return None
+            
+            nueva_version = cursor.execute('SELECT MAX(version) FROM cambios').fetchone()[0]
+            conn.commit()
+        
+        return nueva_version
+
+class BibliotecasModel:
+    """Consultas combinadas sobre la biblioteca principal y las adjuntas.
+    
+    Cada biblioteca adjunta es otro archivo de la aplicación abierto con
+    ATTACH DATABASE en la misma conexión, así que las consultas las recorren
+    con UNION ALL sin copiar datos. En la principal se consideran los libros
+    del perfil activo; en las adjuntas, los de todos sus perfiles.
+    """
+    
+    def __init__(self, db_manager: Almacenamiento, usuario_id: Optional[int] = None):
+        self.db = db_manager
+        self.usuario_id = usuario_id or db_manager.obtener_usuario_por_defecto()
+    
+    def seleccionar_usuario(self, usuario_id: int):
+        """Cambia el perfil de la biblioteca principal"""
+        self.usuario_id = usuario_id
+    
+    def esquemas(self) -> List[str]:
+        """Nombres de las bibliotecas: 'main' y los alias de las adjuntas"""
+        return ['main'] + list(getattr(self.db, 'bibliotecas', {}))
+    
+    def _union(self, columnas: str, condicion: str = '1',
+               params_condicion: Tuple = ()) -> Tuple[str, List]:
+        """SELECT de las columnas en cada biblioteca, unidos con UNION ALL"""
+        partes, params = [], []
+        for esquema in self.esquemas():
+            params.extend(params_condicion)
+            filtro = condicion
+            if esquema == 'main':
+                filtro += ' AND usuario_id = ?'
+                params.append(self.usuario_id)
+            partes.append(f"SELECT '{esquema}' AS biblioteca, {columnas} FROM {esquema}.libros WHERE {filtro}")
+        return ' UNION ALL '.join(partes), params
+    
+    def obtener_libros(self, search: Optional[str] = None) -> List[Dict]:
+        """Libros de todas las bibliotecas, con la clave 'biblioteca' de cada uno"""
+        columnas = ['titulo', 'autor', 'genero', 'anio_lectura', 'calificacion', 'paginas', 'estado']
+        if search:
+            union, params = self._union(
+                ', '.join(columnas), '(titulo LIKE ? OR autor LIKE ?)', (f'%{search}%', f'%{search}%')
+            )
+        else:
+            union, params = self._union(', '.join(columnas))
+        filas = self.db.execute_query(
+            f'{union} ORDER BY anio_lectura DESC, titulo', tuple(params), fetch=True
+        )
+        return [dict(zip(['biblioteca'] + columnas, fila)) for fila in filas]
+    
+    def obtener_estadisticas(self) -> Dict:
+        """Estadísticas por biblioteca y combinadas de los libros leídos"""
+        union, params = self._union('autor, anio_lectura, calificacion, paginas', "estado = 'leído'")
+        
+        stats = {'por_biblioteca': {}}
+        filas = self.db.execute_query(f'''
+            SELECT biblioteca, COUNT(*), COALESCE(SUM(paginas), 0), AVG(calificacion)
+            FROM ({union}) GROUP BY biblioteca
+        ''', tuple(params), fetch=True)
+        for biblioteca, total, paginas, promedio in filas:
+            stats['por_biblioteca'][biblioteca] = {
+                'total_libros': total, 'total_paginas': paginas,
+                'promedio_calificacion': round(promedio or 0, 2)
+            }
+        
+        total, paginas, promedio = self.db.execute_query(f'''
+            SELECT COUNT(*), COALESCE(SUM(paginas), 0), AVG(calificacion) FROM ({union})
+        ''', tuple(params), fetch=True)[0]
+        stats['total_libros'] = total
+        stats['total_paginas'] = paginas
+        stats['promedio_calificacion'] = round(promedio or 0, 2)
+        
+        stats['libros_por_anio'] = self.db.execute_query(f'''
+            SELECT anio_lectura, COUNT(*) FROM ({union})
+            WHERE anio_lectura IS NOT NULL GROUP BY anio_lectura ORDER BY anio_lectura
+        ''', tuple(params), fetch=True)
+        
+        # Autores leídos en más de una biblioteca
+        stats['autores_compartidos'] = self.db.execute_query(f'''
+            SELECT autor, COUNT(DISTINCT biblioteca), COUNT(*) FROM ({union})
+            GROUP BY autor HAVING COUNT(DISTINCT biblioteca) > 1
+            ORDER BY COUNT(*) DESC, autor LIMIT 20
+        ''', tuple(params), fetch=True)
+        return stats
+
+# Inicialización del modelo.
+# La base de la aplicación y los modelos globales (db_manager, libro_model,
+# ...) se crean recién cuando se usan por primera vez, así main.py puede
+# leer la configuración (archivo, entorno y línea de comandos) antes.
+_NOMBRES_GLOBALES = (
+    'db_manager', 'libro_model', 'usuario_model', 'informe_model',
+    'sesion_model', 'cambio_model', 'meta_model', 'bibliotecas_model'
+)
+_configuracion: Optional[Configuracion] = None
+_globales: Dict[str, object] = {}
+_lock_globales = threading.Lock()
+
+def configurar(config: Configuracion):
+    """Fija la configuración de la base de la aplicación (antes de usarla)"""
+    global _configuracion
+    with _lock_globales:
+        if _globales:
+            raise RuntimeError("La base de la aplicación ya está abierta")
+        _configuracion = config
+
+def obtener_configuracion() -> Configuracion:
+    """Retorna la configuración con que se abre (o se abrió) la base de la aplicación"""
+    return _configuracion or cargar_configuracion()
+
+def __getattr__(nombre: str):
+    if nombre not in _NOMBRES_GLOBALES:
+        raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+    with _lock_globales:
+        if not _globales:
+            config = obtener_configuracion()
+            db = crear_almacenamiento(config.almacenamiento, config.db, config.pragmas, config.bibliotecas)
+            _globales.update(
+                db_manager=db,
+                libro_model=LibroModel(db),
+                usuario_model=UsuarioModel(db),
+                informe_model=InformeModel(db),
+                sesion_model=SesionModel(db),
+                cambio_model=CambioModel(db),
+                meta_model=MetaModel(db),
+                bibliotecas_model=BibliotecasModel(db)
+            )
+    return _globales[nombre]
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Registro de Lecturas - modelo_async.py
+
+Autor: Sebastian Sanchez Bentolila
+Email: sebastiansb3004@gmail.com
+Versión: 1.0.0
+Última modificación: 29/07/2025
+Licencia: MIT
+Copyright: © 2025 - Todos los derechos reservados
+
+Descripción:
+- Fachada asyncio sobre el modelo de libros
+- Ejecuta el trabajo de SQLite en ejecutores dedicados sin bloquear el event loop
+- Permite exportar en streaming con iteradores asíncronos
+
+
+Dependencias:
+- Python 3.13.3
+- Módulos estándar: asyncio, concurrent.futures, csv, io, typing
+"""
+
+import asyncio
+import csv
+import io
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import AsyncIterator, Dict, List, Optional
+
+from modelo import DatabaseManager, LibroModel, LIBRO_COLUMNAS
+
+class AsyncLibroModel:
+    """Versión asíncrona de LibroModel para usar dentro de servicios asyncio.
+
+    Las lecturas corren en un pool de hilos y las escrituras en un único
+    hilo, así nunca compiten entre sí. Un semáforo limita la cantidad de
+    operaciones pendientes para no acumular trabajo.
+
+    Para que las lecturas no esperen a las escrituras la base tiene que
+    estar en modo WAL (PRAGMA journal_mode=WAL en la configuración); el
+    modelo respeta el journal_mode configurado y no lo cambia. Con el diario
+    clásico todo funciona igual, pero una lectura puede esperar (hasta el
+    busy_timeout) a que termine la escritura en curso.
+    """
+
+    def __init__(self, db_manager: DatabaseManager, lectores: int = 4,
+                 max_pendientes: int = 64):
+        self.db = db_manager
+        self.libro_model = LibroModel(db_manager)
+        self._lectores = ThreadPoolExecutor(max_workers=lectores, thread_name_prefix='sqlite-lector')
+        self._escritor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sqlite-escritor')
+        self._max_pendientes = max_pendientes
+        self._pendientes: Optional[asyncio.Semaphore] = None
+
+    async def _ejecutar(self, ejecutor: ThreadPoolExecutor, funcion, *args):
+        """Ejecuta una función en el ejecutor dado respetando el límite de pendientes"""
+        if self._pendientes is None:
+            self._pendientes = asyncio.Semaphore(self._max_pendientes)
+        async with self._pendientes:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(ejecutor, partial(funcion, *args))
+
+    async def obtener_libros(self, filtros: Optional[Dict] = None) -> List[Dict]:
+        """Obtiene todos los libros con filtros opcionales"""
+        return await self._ejecutar(self._lectores, self.libro_model.obtener_libros, filtros)
+
+    async def obtener_estadisticas(self, usuario_id: Optional[int] = None) -> Dict:
+        """Retorna estadísticas sobre los libros leídos"""
+        return await self._ejecutar(self._lectores, self.libro_model.obtener_estadisticas, usuario_id)
+
+    async def crear_libro(self, libro_data: Dict) -> int:
+        """Crea un nuevo libro y retorna su ID"""
+        return await self._ejecutar(self._escritor, self.libro_model.crear_libro, libro_data)
+
+    async def actualizar_libro(self, libro_id: int, libro_data: Dict) -> bool:
+        """Actualiza un libro existente"""
+        return await self._ejecutar(self._escritor, self.libro_model.actualizar_libro, libro_id, libro_data)
+
+    async def eliminar_libro(self, libro_id: int) -> bool:
+        """Elimina un libro por su ID"""
+        return await self._ejecutar(self._escritor, self.libro_model.eliminar_libro, libro_id)
+
+    async def iterar_libros(self, filtros: Optional[Dict] = None,
+                            tamanio_lote: int = 500) -> AsyncIterator[Dict]:
+        """Recorre los libros en lotes sin cargar toda la tabla en memoria.
+
+        Un hilo lector va leyendo del cursor y deja los lotes en una cola
+        acotada; si el consumidor es lento, el hilo espera.
+        """
+        loop = asyncio.get_running_loop()
+        cola: asyncio.Queue = asyncio.Queue(maxsize=4)
+        fin = object()
+        cancelado = False
+
+        def producir():
+            conn = self.db._conectar()
+            try:
+                query, params = self.libro_model.construir_consulta(filtros)
+                cursor = conn.execute(query, params)
+                while not cancelado:
+                    lote = cursor.fetchmany(tamanio_lote)
+                    if not lote:
+                        break
+                    asyncio.run_coroutine_threadsafe(cola.put(lote), loop).result()
+            finally:
+                conn.close()
+                asyncio.run_coroutine_threadsafe(cola.put(fin), loop).result()
+
+        productor = loop.run_in_executor(self._lectores, producir)
+        try:
+            while True:
+                lote = await cola.get()
+                if lote is fin:
+                    break
+                for fila in lote:
+                    yield dict(zip(LIBRO_COLUMNAS, fila))
+        finally:
+            cancelado = True
+            # Vaciar la cola para que el productor no quede bloqueado
+            while not productor.done():
+                try:
+                    cola.get_nowait()
+                except asyncio.QueueEmpty:
+                    await asyncio.sleep(0.001)
+            await productor
+
+    async def exportar_csv(self, filtros: Optional[Dict] = None,
+                           tamanio_lote: int = 500) -> AsyncIterator[str]:
+        """Genera el CSV de los libros en fragmentos de texto"""
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=LIBRO_COLUMNAS)
+        writer.writeheader()
+
+        filas = 0
+        async for libro in self.iterar_libros(filtros, tamanio_lote):
+            writer.writerow(libro)
+            filas += 1
+            if filas % tamanio_lote == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+
+        if buffer.getvalue():
+            yield buffer.getvalue()
+
+    async def cerrar(self):
+        """Libera los hilos de los ejecutores"""
+        self._lectores.shutdown(wait=True)
+        self._escritor.shutdown(wait=True)
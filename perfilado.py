@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Registro de Lecturas - perfilado.py
+
+Autor: Sebastian Sanchez Bentolila
+Email: sebastiansb3004@gmail.com
+Versión: 1.0.0
+Última modificación: 29/07/2025
+Licencia: MIT
+Copyright: © 2025 - Todos los derechos reservados
+
+Descripción:
+- Modo de perfilado de la interfaz (python main.py --profile)
+- Mide cada acción del controlador con tramos anidados hasta el modelo y la vista
+- Mide la latencia del bucle de eventos de Tk con latidos periódicos
+- Escribe pilas en formato "folded" (flamegraph.pl, speedscope) y un resumen
+
+
+Dependencias:
+- Python 3.13.3
+- Módulos estándar: cProfile, os, threading, time, functools, typing
+"""
+
+import cProfile
+import os
+import threading
+import time
+from functools import wraps
+from typing import Dict, Iterable, List, Optional
+
+class Perfilador:
+    """Mide el tiempo de las acciones de la interfaz y la latencia del bucle de Tk.
+
+    Cada método instrumentado abre un tramo; los tramos se anidan según la
+    pila de llamadas del hilo principal, así una acción queda desglosada en
+    consulta, armado de datos y carga de la tabla.
+    """
+
+    def __init__(self, directorio: str = 'perfil', usar_cprofile: bool = False,
+                 intervalo_latido: int = 50):
+        self.directorio = directorio
+        self.usar_cprofile = usar_cprofile
+        self.intervalo_latido = intervalo_latido
+        self._hilo = threading.get_ident()
+        self._pila: List[List] = []
+        # Tiempo propio acumulado por pila, en microsegundos
+        self._pilas: Dict[str, int] = {}
+        # Duraciones de cada acción de primer nivel, en milisegundos
+        self._acciones: Dict[str, List[float]] = {}
+        self._perfiles: Dict[str, cProfile.Profile] = {}
+        self._latencias: List[float] = []
+        self._bloqueos: Dict[str, List[float]] = {}
+        self._ultima_accion = 'inicio'
+        self._esperado = None
+        self._vista = None
+
+    def instrumentar(self, objeto, prefijo: str, nombres: Optional[Iterable[str]] = None,
+                     excluir: Iterable[str] = ()):
+        """Reemplaza los métodos del objeto por versiones que abren un tramo.
+
+        Sin nombres se instrumentan todos los métodos propios de la clase
+        (incluidos los privados, que suelen ser los que hacen el trabajo),
+        salvo los excluidos.
+        """
+        if nombres is None:
+            nombres = [
+                nombre for nombre, valor in vars(type(objeto)).items()
+                if callable(valor) and not nombre.startswith('__') and nombre not in excluir
+            ]
+        for nombre in nombres:
+            metodo = getattr(objeto, nombre)
+            setattr(objeto, nombre, self._envolver(metodo, f'{prefijo}.{nombre}'))
+
+    def _envolver(self, funcion, nombre: str):
+        """Retorna la función envuelta en un tramo con el nombre dado"""
+        @wraps(funcion)
+        def envuelta(*args, **kwargs):
+            # Los hilos de fondo no participan de la pila de la interfaz
+            if threading.get_ident() != self._hilo:
+                return funcion(*args, **kwargs)
+
+            primer_nivel = not self._pila
+            perfil = None
+            if primer_nivel and self.usar_cprofile:
+                perfil = self._perfiles.setdefault(nombre, cProfile.Profile())
+                perfil.enable()
+
+            tramo = [nombre, 0.0]
+            self._pila.append(tramo)
+            inicio = time.perf_counter()
+            try:
+                return funcion(*args, **kwargs)
+            finally:
+                duracion = time.perf_counter() - inicio
+                if perfil:
+                    perfil.disable()
+                self._cerrar_tramo(duracion)
+        return envuelta
+
+    def _cerrar_tramo(self, duracion: float):
+        """Registra el tiempo propio del tramo actual y lo descuenta del padre"""
+        pila = ';'.join(tramo[0] for tramo in self._pila)
+        nombre, hijos = self._pila.pop()
+        propio = max(0.0, duracion - hijos)
+        self._pilas[pila] = self._pilas.get(pila, 0) + int(propio * 1_000_000)
+
+        if self._pila:
+            self._pila[-1][1] += duracion
+        else:
+            self._acciones.setdefault(nombre, []).append(duracion * 1000)
+            self._ultima_accion = nombre
+
+    def iniciar(self, vista):
+        """Empieza a medir la latencia del bucle de eventos con latidos"""
+        self._vista = vista
+        self._esperado = time.perf_counter() + self.intervalo_latido / 1000
+        vista.after(self.intervalo_latido, self._latido)
+
+    def _latido(self):
+        """Anota cuánto se demoró el latido respecto de lo programado"""
+        ahora = time.perf_counter()
+        demora = max(0.0, (ahora - self._esperado) * 1000)
+        self._latencias.append(demora)
+        # Un latido muy demorado se atribuye a la última acción terminada
+        if demora > 100:
+            self._bloqueos.setdefault(self._ultima_accion, []).append(demora)
+
+        self._esperado = ahora + self.intervalo_latido / 1000
+        self._vista.after(self.intervalo_latido, self._latido)
+
+    @staticmethod
+    def _percentil(valores: List[float], p: float) -> float:
+        """Percentil p (0-100) por el método del rango más cercano"""
+        if not valores:
+            return 0.0
+        ordenados = sorted(valores)
+        return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))]
+
+    def resumen(self, limite: int = 15) -> str:
+        """Retorna una tabla con las acciones más lentas y la latencia del bucle"""
+        filas = sorted(
+            self._acciones.items(), key=lambda item: max(item[1]), reverse=True
+        )[:limite]
+        lineas = [
+            f"{'Acción':<45} {'Veces':>6} {'Total ms':>10} {'Media ms':>9} {'p95 ms':>9} {'Máx ms':>9}"
+        ]
+        for nombre, duraciones in filas:
+            lineas.append(
+                f"{nombre:<45} {len(duraciones):>6} {sum(duraciones):>10.1f} "
+                f"{sum(duraciones) / len(duraciones):>9.1f} "
+                f"{self._percentil(duraciones, 95):>9.1f} {max(duraciones):>9.1f}"
+            )
+
+        lineas.append('')
+        lineas.append(
+            f"Latencia del bucle de Tk ({len(self._latencias)} latidos cada "
+            f"{self.intervalo_latido} ms): p50 {self._percentil(self._latencias, 50):.1f} ms, "
+            f"p95 {self._percentil(self._latencias, 95):.1f} ms, "
+            f"máx {max(self._latencias, default=0.0):.1f} ms"
+        )
+        for nombre, demoras in sorted(self._bloqueos.items(), key=lambda item: -max(item[1])):
+            lineas.append(f"  bloqueos > 100 ms tras {nombre}: {len(demoras)} (máx {max(demoras):.0f} ms)")
+        return '\n'.join(lineas)
+
+    def escribir(self) -> str:
+        """Guarda las pilas, el resumen y los perfiles; retorna el directorio"""
+        os.makedirs(self.directorio, exist_ok=True)
+
+        with open(os.path.join(self.directorio, 'acciones.folded'), 'w', encoding='utf-8') as archivo:
+            for pila, microsegundos in sorted(self._pilas.items()):
+                if microsegundos:
+                    archivo.write(f"{pila} {microsegundos}\n")
+
+        with open(os.path.join(self.directorio, 'resumen.txt'), 'w', encoding='utf-8') as archivo:
+            archivo.write(self.resumen() + '\n')
+
+        for nombre, perfil in self._perfiles.items():
+            perfil.dump_stats(os.path.join(self.directorio, f'{nombre}.prof'))
+
+        return self.directorio
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Registro de Lecturas - portadas.py
+
+Autor: Sebastian Sanchez Bentolila
+Email: sebastiansb3004@gmail.com
+Versión: 1.0.0
+Última modificación: 29/07/2025
+Licencia: MIT
+Copyright: © 2025 - Todos los derechos reservados
+
+Descripción:
+- Miniaturas de portadas generadas fuera del hilo de la interfaz
+- Caché en disco direccionada por contenido (hash SHA-256 de la imagen)
+- Caché en memoria de PhotoImage con desalojo LRU acotado por bytes
+
+
+Dependencias:
+- Python 3.13.3
+- Módulos estándar: hashlib, io, os, queue, tkinter, collections, concurrent.futures, typing
+- Opcional: Pillow (para JPEG y miniaturas de mejor calidad; sin él se usan PNG/GIF)
+"""
+
+import hashlib
+import io
+import os
+import queue
+import tkinter as tk
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+class CachePortadas:
+    """Entrega portadas listas para mostrar sin bloquear la interfaz.
+
+    Los hilos de trabajo leen la imagen, calculan su hash y, si Pillow está
+    instalado, generan la miniatura. Tk no es seguro entre hilos, así que
+    los resultados vuelven por una cola que la interfaz consulta con after().
+    """
+
+    TAMANIOS = {
+        'mini': (20, 28),
+        'avatar': (64, 64),
+        'detalle': (160, 240)
+    }
+
+    def __init__(self, directorio: str, max_bytes: int = 32 * 1024 * 1024, hilos: int = 2):
+        self.directorio = directorio
+        self.max_bytes = max_bytes
+        self._fotos: 'OrderedDict[Tuple[str, str], tk.PhotoImage]' = OrderedDict()
+        self._bytes = 0
+        # (ruta, tamaño) -> clave de la miniatura en memoria, para no releer el archivo
+        self._claves: Dict[Tuple[str, str], Tuple[str, str]] = {}
+        self._pendientes: Dict[Tuple[str, str], List[Callable]] = {}
+        self._fallidas = set()
+        self._listos: queue.Queue = queue.Queue()
+        self._ejecutor = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix='portadas')
+        self._widget = None
+        self._sondeo = None
+
+    def iniciar(self, widget):
+        """Asocia la caché a la interfaz (necesario para crear imágenes de Tk)"""
+        self._widget = widget
+
+    def obtener(self, ruta: str, tamanio: str,
+                callback: Optional[Callable[[tk.PhotoImage], None]] = None) -> Optional[tk.PhotoImage]:
+        """Retorna la imagen si ya está en memoria; si no, la prepara en segundo plano
+        y llama a callback con ella (en el hilo de la interfaz) cuando esté lista."""
+        pedido = (ruta, tamanio)
+        clave = self._claves.get(pedido)
+        if clave in self._fotos:
+            self._fotos.move_to_end(clave)
+            return self._fotos[clave]
+        if pedido in self._fallidas or not ruta:
+            return None
+
+        esperando = self._pendientes.get(pedido)
+        if esperando is not None:
+            if callback:
+                esperando.append(callback)
+            return None
+
+        self._pendientes[pedido] = [callback] if callback else []
+        self._ejecutor.submit(self._preparar, ruta, tamanio)
+        if self._sondeo is None and self._widget is not None:
+            self._sondeo = self._widget.after(30, self._procesar_listos)
+        return None
+
+    def _ruta_miniatura(self, hash_imagen: str, tamanio: str) -> str:
+        """Ruta en disco de la miniatura de una imagen (direccionada por contenido)"""
+        ancho, alto = self.TAMANIOS[tamanio]
+        return os.path.join(self.directorio, hash_imagen[:2], f'{hash_imagen}_{ancho}x{alto}.png')
+
+    def _preparar(self, ruta: str, tamanio: str):
+        """Trabajo en segundo plano: hashea la imagen y genera la miniatura si se puede"""
+        try:
+            with open(ruta, 'rb') as archivo:
+                datos = archivo.read()
+            hash_imagen = hashlib.sha256(datos).hexdigest()
+            miniatura = self._ruta_miniatura(hash_imagen, tamanio)
+
+            if not os.path.exists(miniatura) and Image is not None:
+                os.makedirs(os.path.dirname(miniatura), exist_ok=True)
+                with Image.open(io.BytesIO(datos)) as imagen:
+                    imagen.thumbnail(self.TAMANIOS[tamanio])
+                    temporal = miniatura + '.tmp'
+                    imagen.save(temporal, format='PNG')
+                os.replace(temporal, miniatura)
+
+            self._listos.put((ruta, tamanio, hash_imagen, miniatura, None))
+        except Exception as e:
+            self._listos.put((ruta, tamanio, None, None, e))
+
+    def _procesar_listos(self):
+        """En el hilo de la interfaz: crea las PhotoImage listas y avisa a quienes esperan"""
+        self._sondeo = None
+        while True:
+            try:
+                ruta, tamanio, hash_imagen, miniatura, error = self._listos.get_nowait()
+            except queue.Empty:
+                break
+
+            pedido = (ruta, tamanio)
+            callbacks = self._pendientes.pop(pedido, [])
+            foto = None
+            if error is None:
+                try:
+                    foto = self._cargar(ruta, tamanio, hash_imagen, miniatura)
+                except tk.TclError:
+                    foto = None
+            if foto is None:
+                self._fallidas.add(pedido)
+                continue
+
+            for callback in callbacks:
+                callback(foto)
+
+        if self._pendientes and self._widget is not None:
+            self._sondeo = self._widget.after(30, self._procesar_listos)
+
+    def _cargar(self, ruta: str, tamanio: str, hash_imagen: str, miniatura: str) -> tk.PhotoImage:
+        """Crea la PhotoImage de la miniatura y la guarda en la caché en memoria"""
+        clave = (hash_imagen, tamanio)
+        foto = self._fotos.get(clave)
+        if foto is None:
+            if os.path.exists(miniatura):
+                foto = tk.PhotoImage(master=self._widget, file=miniatura)
+            else:
+                # Sin Pillow: Tk decodifica el original (PNG/GIF) una sola vez,
+                # lo reduce y deja la miniatura en disco para las próximas veces
+                original = tk.PhotoImage(master=self._widget, file=ruta)
+                ancho, alto = self.TAMANIOS[tamanio]
+                factor = max(1, -(-original.width() // ancho), -(-original.height() // alto))
+                foto = original.subsample(factor)
+                os.makedirs(os.path.dirname(miniatura), exist_ok=True)
+                foto.write(miniatura, format='png')
+            self._guardar(clave, foto)
+
+        self._claves[(ruta, tamanio)] = clave
+        return foto
+
+    def _guardar(self, clave: Tuple[str, str], foto: tk.PhotoImage):
+        """Agrega una imagen a la caché desalojando las menos usadas si se pasa de bytes"""
+        self._fotos[clave] = foto
+        self._bytes += foto.width() * foto.height() * 4
+        while self._bytes > self.max_bytes and len(self._fotos) > 1:
+            _, desalojada = self._fotos.popitem(last=False)
+            self._bytes -= desalojada.width() * desalojada.height() * 4
+
+    def invalidar(self, ruta: str):
+        """Olvida lo que se sabe de una ruta (por ejemplo si el archivo cambió)"""
+        for tamanio in self.TAMANIOS:
+            self._claves.pop((ruta, tamanio), None)
+            self._fallidas.discard((ruta, tamanio))
+
+    def estadisticas(self) -> Dict:
+        """Retorna el uso de la caché en memoria"""
+        return {'imagenes': len(self._fotos), 'bytes': self._bytes, 'max_bytes': self.max_bytes}
+
+    def cerrar(self):
+        """Detiene los hilos de trabajo"""
+        self._ejecutor.shutdown(wait=False, cancel_futures=True)
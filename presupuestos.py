@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Registro de Lecturas - presupuestos.py
+
+Autor: Sebastian Sanchez Bentolila
+Email: sebastiansb3004@gmail.com
+Versión: 1.0.0
+Última modificación: 29/07/2025
+Licencia: MIT
+Copyright: © 2025 - Todos los derechos reservados
+
+Descripción:
+- Presupuestos de latencia por acción de la interfaz, sin Tk
+- Maneja el controlador con una vista falsa sobre bibliotecas generadas de
+  tamaño creciente (cada una el doble de la anterior) y mide arranque,
+  filtro, búsqueda, alta, edición, baja, estadísticas y exportación
+- El filtro y la búsqueda también se miden solo en el modelo, sin recargar
+  la tabla, donde se espera que crezcan como O(log n)
+- Falla si una acción supera su presupuesto o si crece peor de lo esperado
+  al duplicar la biblioteca (por ejemplo, O(n) donde se espera O(log n))
+
+
+Dependencias:
+- Python 3.13.3
+- Módulos estándar: argparse, math, os, random, statistics, sys, tempfile,
+  time, dataclasses, typing
+
+Uso:
+    python presupuestos.py [--tamanios 1000 2000 4000 8000] [--repeticiones 5]
+                           [--almacenamiento sqlite|memoria] [--holgura 1.0]
+"""
+
+import argparse
+import math
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+import modelo
+from configuracion import Configuracion
+from controlador import MainController
+
+# Crecimiento esperado del tiempo según el tamaño, normalizado en n = 1
+ORDENES: Dict[str, Callable[[int], float]] = {
+    'constante': lambda n: 1.0,
+    'log': lambda n: max(1.0, math.log2(n)),
+    'lineal': lambda n: float(n),
+    'nlogn': lambda n: n * max(1.0, math.log2(n))
+}
+
+# Cociente máximo aceptado entre dos tamaños consecutivos (uno el doble del
+# otro): deja margen para el ruido, pero un orden más ya no entra
+COCIENTE_MAXIMO = {'constante': 1.5, 'log': 1.6, 'lineal': 2.7, 'nlogn': 2.9}
+
+# Por debajo de este tiempo manda el ruido y no se comparan cocientes
+PISO_MS = 2.0
+
+# Tamaño de referencia de los presupuestos en milisegundos
+TAMANIO_REFERENCIA = 10000
+
+@dataclass
+class Presupuesto:
+    """Latencia aceptada para una acción"""
+    limite_ms: float  # en una biblioteca de TAMANIO_REFERENCIA libros
+    orden: str  # clave de ORDENES
+
+    def limite_para(self, tamanio: int) -> float:
+        """Límite en milisegundos para una biblioteca del tamaño dado"""
+        crecer = ORDENES[self.orden]
+        return self.limite_ms * crecer(tamanio) / crecer(TAMANIO_REFERENCIA)
+
+# Las acciones de la interfaz recargan la tabla (y las opciones de los
+# filtros) y las estadísticas recorren los libros leídos, así que hoy son
+# lineales en la cantidad de libros del perfil. El filtro y la búsqueda se
+# miden además solo en el modelo, con un resultado de tamaño fijo: ahí un
+# índice tiene que hacerlas logarítmicas, y un recorrido completo se nota
+PRESUPUESTOS: Dict[str, Presupuesto] = {
+    'inicio': Presupuesto(400, 'lineal'),
+    'filtrar': Presupuesto(400, 'lineal'),
+    'buscar': Presupuesto(400, 'lineal'),
+    'filtrar_modelo': Presupuesto(40, 'log'),
+    'buscar_modelo': Presupuesto(40, 'log'),
+    'alta': Presupuesto(400, 'lineal'),
+    'edicion': Presupuesto(400, 'lineal'),
+    'baja': Presupuesto(400, 'lineal'),
+    'estadisticas': Presupuesto(200, 'lineal'),
+    'exportar': Presupuesto(600, 'lineal')
+}
+
+# Consultas seguidas por medición de filtrar_modelo y buscar_modelo: una sola
+# queda bajo PISO_MS y no permitiría comparar cocientes (los presupuestos
+# de esas dos acciones son por las CONSULTAS_POR_MEDICION juntas)
+CONSULTAS_POR_MEDICION = 100
+
+# Libros fijos (los mismos en todos los tamaños) que encuentran las
+# acciones del modelo: año y autora que los libros generados no usan
+AGUJAS = 5
+ANIO_AGUJA = 1999
+AUTORA_AGUJA = 'Autora Aguja'
+
+GENEROS = ['Novela', 'Cuento', 'Ensayo', 'Poesía', 'Ciencia Ficción', 'Fantasía', 'Policial', 'Historia']
+ETIQUETAS = ['clásico', 'favorito', 'regalo', 'club', 'releer', 'prestado', 'digital', 'autografiado']
+
+class VistaFalsa:
+    """Reemplazo de MainView sin Tk: guarda lo que el controlador le muestra
+    y devuelve lo que el arnés le indique (formulario, filtros, selección)"""
+
+    def __init__(self, controller):
+        self.controller = controller
+        self.formulario: Dict = {}
+        self.filtros: Dict = {}
+        self.seleccionado: Optional[int] = None
+        self.ruta_guardado: Optional[str] = None
+        self.libros: List[Dict] = []
+        self.estadisticas: Optional[Dict] = None
+        self.dialogo: Optional[Dict] = None
+        self.mensajes: List[Tuple[str, str, str]] = []
+        self.pendientes: List[Tuple[Callable, Tuple]] = []
+
+    # Bucle y ventana
+    def after(self, ms: int, funcion: Callable, *args):
+        self.pendientes.append((funcion, args))
+        return len(self.pendientes)
+
+    def after_cancel(self, job):
+        pass
+
+    def ejecutar_pendientes(self, nombre: str):
+        """Ejecuta (una vez) las llamadas diferidas al método del controlador dado"""
+        llamadas = [(f, a) for f, a in self.pendientes if getattr(f, '__name__', '') == nombre]
+        self.pendientes = [(f, a) for f, a in self.pendientes if getattr(f, '__name__', '') != nombre]
+        for funcion, args in llamadas:
+            funcion(*args)
+
+    def protocol(self, *args):
+        pass
+
+    def mainloop(self):
+        pass
+
+    def destroy(self):
+        pass
+
+    def geometry(self, *args):
+        return '1200x800'
+
+    # Datos que el controlador lee de la vista
+    def get_form_data(self) -> Dict:
+        return dict(self.formulario)
+
+    def get_filters(self) -> Dict:
+        return dict(self.filtros)
+
+    def set_filters(self, filters: Dict):
+        self.filtros = dict(filters)
+
+    def get_selected_book_id(self) -> Optional[int]:
+        return self.seleccionado
+
+    def get_save_path(self, *args, **kwargs) -> Optional[str]:
+        return self.ruta_guardado
+
+    def get_open_path(self, *args, **kwargs) -> Optional[str]:
+        return None
+
+    def get_column_widths(self) -> Dict[str, int]:
+        return {}
+
+    def ask_confirmation(self, title: str, message: str) -> bool:
+        return True
+
+    def ask_text(self, *args, **kwargs) -> Optional[str]:
+        return None
+
+    # Lo que el controlador muestra
+    def populate_books_table(self, books: List[Dict]):
+        self.libros = books
+
+    def show_stats(self, stats: Dict, heatmap=None):
+        self.estadisticas = stats
+
+    def show_book_edit_dialog(self, book_data: Dict):
+        self.dialogo = book_data
+
+    def show_message(self, title: str, message: str, kind: str = 'info'):
+        self.mensajes.append((title, message, kind))
+
+    def __getattr__(self, nombre: str):
+        # El resto (populate_filters, update_user_info, show_*, ...) no
+        # devuelve nada: basta con aceptar la llamada
+        if nombre.startswith(('populate_', 'update_', 'show_', 'set_', 'apply_', 'clear_', 'fill_')):
+            return lambda *args, **kwargs: None
+        raise AttributeError(nombre)
+
+def _libro_generado(azar: random.Random, numero: int) -> Dict:
+    """Datos de un libro de prueba"""
+    anio = azar.randint(2000, 2025)
+    return {
+        'titulo': f'Libro {numero} {azar.getrandbits(32):08x}',
+        'autor': f'Autor {azar.randint(1, max(10, numero // 20))}',
+        'genero': azar.choice(GENEROS),
+        'estado': azar.choice(['leído', 'leído', 'leído', 'leyendo', 'por leer']),
+        'anio_lectura': anio,
+        'fecha_lectura': f'{anio}-{azar.randint(1, 12):02d}-{azar.randint(1, 28):02d}',
+        'calificacion': azar.randint(1, 10) / 2,
+        'paginas': azar.randint(80, 900),
+        'editorial': f'Editorial {azar.randint(1, 40)}',
+        'tags': azar.sample(ETIQUETAS, azar.randint(0, 3))
+    }
+
+def _hacer_crecer(libro_model, tamanio: int, azar: random.Random):
+    """Agrega libros generados hasta llegar al tamaño pedido (las agujas primero)"""
+    if not libro_model.obtener_libros({'anio_lectura': ANIO_AGUJA}):
+        libro_model.crear_libros([
+            dict(_libro_generado(azar, numero), autor=AUTORA_AGUJA, estado='leído',
+                 anio_lectura=ANIO_AGUJA, fecha_lectura=f'{ANIO_AGUJA}-0{numero + 1}-01')
+            for numero in range(AGUJAS)
+        ])
+    faltan = tamanio - len(libro_model.obtener_libros())
+    if faltan > 0:
+        libro_model.crear_libros([_libro_generado(azar, tamanio + i) for i in range(faltan)])
+
+def _medir(accion: Callable[[], None], preparar: Optional[Callable[[], None]],
+           repeticiones: int) -> float:
+    """Mediana en milisegundos de varias ejecuciones de la acción"""
+    tiempos = []
+    for _ in range(repeticiones):
+        if preparar:
+            preparar()
+        inicio = time.perf_counter()
+        accion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+def _acciones(controlador: MainController, vista: VistaFalsa, directorio: str,
+              azar: random.Random) -> Dict[str, Tuple[Callable, Optional[Callable]]]:
+    """Cada acción con su preparación (que no se mide)"""
+    libros = controlador.libro_model
+
+    def inicio():
+        MainController(view_class=VistaFalsa)
+
+    def filtrar():
+        vista.filtros = {'genero': azar.choice(GENEROS), 'calificacion_min': azar.randint(1, 4)}
+        controlador.filter_books()
+
+    def buscar():
+        vista.filtros = {'consulta': f'autor:"autor {azar.randint(1, 50)}" calif>=2 año:2005..2020 -estado:leyendo'}
+        controlador.filter_books()
+
+    def consultar(filtros: Dict):
+        # Sin la caché de consultas, que si no respondería todas menos la
+        # primera, y en una transacción para no medir la apertura de conexiones
+        with libros.transaccion():
+            for _ in range(CONSULTAS_POR_MEDICION):
+                libros.cache_consultas.limpiar()
+                encontrados = libros.obtener_libros(filtros)
+        assert len(encontrados) == AGUJAS, f'{filtros}: {len(encontrados)} libros en vez de {AGUJAS}'
+
+    def filtrar_modelo():
+        consultar({'anio_lectura': ANIO_AGUJA, 'estado': 'leído'})
+
+    def buscar_modelo():
+        consultar({'consulta': f'autor:"{AUTORA_AGUJA}"'})
+
+    def alta():
+        vista.formulario = {
+            clave: (', '.join(valor) if clave == 'tags' else str(valor))
+            for clave, valor in _libro_generado(azar, azar.getrandbits(30)).items()
+        }
+        controlador.add_book()
+
+    def elegir_libro():
+        vista.filtros = {}
+        controlador._refresh_books_table({})
+        vista.seleccionado = azar.choice(vista.libros)['id']
+
+    def edicion():
+        controlador.edit_book()
+        libro = dict(vista.dialogo, comentario=f'Releído {azar.random()}')
+        controlador.update_book(vista.seleccionado, libro)
+
+    def baja():
+        controlador.delete_book()
+
+    def estadisticas():
+        vista.estadisticas = None
+        controlador.show_stats()
+        controlador._stats_thread.join()
+        vista.ejecutar_pendientes('_check_stats')
+        assert vista.estadisticas is not None, 'no se mostraron las estadísticas'
+
+    def exportar():
+        vista.filtros = {}
+        vista.ruta_guardado = os.path.join(directorio, 'exportado.csv')
+        controlador.export_to_csv()
+
+    # Arranque, filtros y estadísticas se miden como en una sesión nueva
+    return {
+        'inicio': (inicio, libros.limpiar_caches),
+        'filtrar': (filtrar, libros.limpiar_caches),
+        'buscar': (buscar, libros.limpiar_caches),
+        'filtrar_modelo': (filtrar_modelo, libros.limpiar_caches),
+        'buscar_modelo': (buscar_modelo, libros.limpiar_caches),
+        'alta': (alta, None),
+        'edicion': (edicion, elegir_libro),
+        'baja': (baja, elegir_libro),
+        'estadisticas': (estadisticas, libros.limpiar_caches),
+        'exportar': (exportar, libros.limpiar_caches)
+    }
+
+def medir_presupuestos(tamanios: List[int], repeticiones: int = 5,
+                       acciones: Optional[List[str]] = None) -> Dict[str, List[float]]:
+    """Mide cada acción en cada tamaño (en milisegundos, por acción y tamaño).
+
+    La base de la aplicación ya tiene que estar configurada (modelo.configurar)
+    sobre un archivo descartable: se le agregan libros generados.
+    """
+    acciones = acciones or list(PRESUPUESTOS)
+    azar = random.Random(2025)
+    directorio = os.path.dirname(modelo.obtener_configuracion().db) or '.'
+    tiempos: Dict[str, List[float]] = {accion: [] for accion in acciones}
+    for tamanio in sorted(tamanios):
+        _hacer_crecer(modelo.libro_model, tamanio, azar)
+        controlador = MainController(view_class=VistaFalsa)
+        vista = controlador.view
+        medibles = _acciones(controlador, vista, directorio, azar)
+        for accion in acciones:
+            ejecutar, preparar = medibles[accion]
+            vista.mensajes.clear()
+            tiempos[accion].append(_medir(ejecutar, preparar, repeticiones))
+            errores = [mensaje for _, mensaje, tipo in vista.mensajes if tipo == 'error']
+            if errores:
+                raise RuntimeError(f'{accion} con {tamanio} libros: {errores[0]}')
+    return tiempos
+
+def evaluar(tamanios: List[int], tiempos: Dict[str, List[float]],
+            holgura: float = 1.0) -> List[Tuple[str, str]]:
+    """Retorna los incumplimientos como (acción, motivo)"""
+    tamanios = sorted(tamanios)
+    fallas = []
+    for accion, medidos in tiempos.items():
+        presupuesto = PRESUPUESTOS[accion]
+        for tamanio, ms in zip(tamanios, medidos):
+            limite = presupuesto.limite_para(tamanio) * holgura
+            if ms > limite:
+                fallas.append((accion, f'{ms:.1f} ms con {tamanio} libros (límite {limite:.1f} ms)'))
+
+        # Cociente promedio por duplicación, sin contar lo que está bajo el piso
+        cociente = _cociente_por_duplicacion(tamanios, medidos)
+        if cociente is not None and cociente > COCIENTE_MAXIMO[presupuesto.orden]:
+            fallas.append((accion, f'crece ×{cociente:.2f} al duplicar la biblioteca '
+                                   f'(se espera {presupuesto.orden}, hasta ×{COCIENTE_MAXIMO[presupuesto.orden]})'))
+    return fallas
+
+def _cociente_por_duplicacion(tamanios: List[int], medidos: List[float]) -> Optional[float]:
+    """Media geométrica del crecimiento del tiempo cada vez que el tamaño se duplica"""
+    if len(tamanios) < 2 or max(medidos) < PISO_MS:
+        return None
+    duplicaciones = math.log2(tamanios[-1] / tamanios[0])
+    if duplicaciones <= 0:
+        return None
+    return (max(medidos[-1], PISO_MS) / max(medidos[0], PISO_MS)) ** (1 / duplicaciones)
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='Presupuestos de latencia de las acciones de la interfaz')
+    parser.add_argument('--tamanios', type=int, nargs='+', default=[1000, 2000, 4000, 8000],
+                        help='Cantidades de libros a medir (conviene que cada una duplique la anterior)')
+    parser.add_argument('--repeticiones', type=int, default=5, help='Ejecuciones por acción y tamaño')
+    parser.add_argument('--almacenamiento', choices=['sqlite', 'memoria'], default='sqlite')
+    parser.add_argument('--holgura', type=float, default=1.0,
+                        help='Multiplica los límites en milisegundos (para equipos más lentos)')
+    parser.add_argument('--accion', action='append', choices=list(PRESUPUESTOS),
+                        help='Mide solo esta acción (se puede repetir)')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directorio:
+        modelo.configurar(Configuracion(
+            db=os.path.join(directorio, 'lecturas.db'), almacenamiento=args.almacenamiento
+        ))
+        tiempos = medir_presupuestos(args.tamanios, args.repeticiones, args.accion)
+
+    tamanios = sorted(args.tamanios)
+    print(f"{'acción':<14}" + ''.join(f'{t:>10}' for t in tamanios) + '  ×/duplicación')
+    for accion, medidos in tiempos.items():
+        cociente = _cociente_por_duplicacion(tamanios, medidos)
+        print(f'{accion:<14}' + ''.join(f'{ms:>8.1f}ms' for ms in medidos)
+              + (f'  ×{cociente:.2f}' if cociente is not None else '  -'))
+
+    fallas = evaluar(tamanios, tiempos, args.holgura)
+    for accion, motivo in fallas:
+        print(f'  ✗ {accion}: {motivo}')
+    print(f'{len(tiempos) - len({accion for accion, _ in fallas})}/{len(tiempos)} acciones dentro del presupuesto')
+    return 1 if fallas else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Registro de Lecturas - recomendador.py
+
+Autor: Sebastian Sanchez Bentolila
+Email: sebastiansb3004@gmail.com
+Versión: 1.0.0
+Última modificación: 29/07/2025
+Licencia: MIT
+Copyright: © 2025 - Todos los derechos reservados
+
+Descripción:
+- Recomendador de libros similares por autor, género, subgénero, editorial y calificación
+- Vectores dispersos TF-IDF con similitud coseno sobre un índice invertido
+- Modelo guardado en disco y actualizado con el diario de cambios
+
+
+Dependencias:
+- Python 3.13.3
+- Módulos estándar: heapq, math, os, pickle, threading, typing
+"""
+
+import heapq
+import math
+import os
+import pickle
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+from modelo import DatabaseManager, CambioModel, normalizar_texto
+
+FORMATO_MODELO = 1
+
+class Recomendador:
+    """Encuentra libros parecidos a uno dado dentro del mismo perfil.
+
+    Cada libro es un vector disperso con un componente por rasgo (autor,
+    género, subgénero, editorial y calificación), pesado por tipo de rasgo
+    e IDF. El índice invertido rasgo -> libros permite calcular el producto
+    con todos los libros visitando solo los que comparten algún rasgo.
+    """
+
+    PESOS = {'a': 3.0, 'g': 2.0, 's': 1.5, 'e': 1.0, 'r': 0.5}
+
+    # Más cambios que esta fracción de la biblioteca conviene reconstruir de cero
+    FRACCION_RECONSTRUCCION = 0.2
+
+    def __init__(self, db_manager: DatabaseManager, ruta_cache: Optional[str] = None):
+        self.db = db_manager
+        self.cambios = CambioModel(db_manager)
+        # Un almacenamiento en memoria no guarda el modelo en disco
+        self.ruta_cache = ruta_cache or (
+            db_manager.db_name + '.recomendador' if db_manager.persistente else None
+        )
+        self.version: Optional[int] = None
+        self._libros: Dict[int, Tuple] = {}
+        self._indice: Dict[str, Set[int]] = {}
+        self._idf: Dict[str, float] = {}
+        self._total_idf = 0
+        self._inversa_norma: Dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _rasgos(libro: Dict) -> Tuple[str, ...]:
+        """Retorna los rasgos de un libro como claves 'tipo:valor'"""
+        rasgos = []
+        for tipo, campo in (('a', 'autor'), ('g', 'genero'), ('s', 'subgenero'), ('e', 'editorial')):
+            valor = normalizar_texto(libro.get(campo) or '')
+            if valor:
+                rasgos.append(f'{tipo}:{valor}')
+        if libro.get('calificacion') is not None:
+            rasgos.append(f"r:{round(float(libro['calificacion']))}")
+        return tuple(rasgos)
+
+    def _peso(self, rasgo: str) -> float:
+        """Peso de un rasgo: importancia de su tipo por su IDF"""
+        idf = self._idf.get(rasgo)
+        if idf is None:
+            # Rasgo nuevo desde el último cálculo del IDF: se lo trata como único
+            idf = math.log(1 + self._total_idf)
+        return self.PESOS[rasgo[0]] * idf
+
+    def _agregar(self, libro_id: int, libro: Dict):
+        """Agrega un libro al índice"""
+        rasgos = self._rasgos(libro)
+        self._libros[libro_id] = (libro.get('usuario_id'), libro.get('titulo'), libro.get('autor'), rasgos)
+        for rasgo in rasgos:
+            self._indice.setdefault(rasgo, set()).add(libro_id)
+        norma = math.sqrt(sum(self._peso(rasgo) ** 2 for rasgo in rasgos))
+        self._inversa_norma[libro_id] = 1 / norma if norma else 0.0
+
+    def _quitar(self, libro_id: int):
+        """Quita un libro del índice"""
+        datos = self._libros.pop(libro_id, None)
+        if datos is None:
+            return
+        for rasgo in datos[3]:
+            libros = self._indice.get(rasgo)
+            if libros is not None:
+                libros.discard(libro_id)
+                if not libros:
+                    del self._indice[rasgo]
+        self._inversa_norma.pop(libro_id, None)
+
+    def reconstruir(self):
+        """Arma el modelo completo a partir de la tabla libros"""
+        with self._lock:
+            self._reconstruir()
+
+    def _reconstruir(self):
+        """Arma el modelo completo (con el lock tomado)"""
+        version = self.cambios.obtener_version_actual()
+        filas = self.db.execute_query(
+            'SELECT id, usuario_id, titulo, autor, genero, subgenero, editorial, calificacion FROM libros',
+            fetch=True
+        )
+        campos = ['usuario_id', 'titulo', 'autor', 'genero', 'subgenero', 'editorial', 'calificacion']
+        libros = {fila[0]: dict(zip(campos, fila[1:])) for fila in filas}
+
+        # El IDF se fija al reconstruir; los cambios incrementales no lo recalculan
+        frecuencia: Dict[str, int] = {}
+        for libro in libros.values():
+            for rasgo in self._rasgos(libro):
+                frecuencia[rasgo] = frecuencia.get(rasgo, 0) + 1
+        self._total_idf = len(libros)
+        self._idf = {rasgo: math.log(1 + len(libros) / df) for rasgo, df in frecuencia.items()}
+
+        self._libros, self._indice, self._inversa_norma = {}, {}, {}
+        for libro_id, libro in libros.items():
+            self._agregar(libro_id, libro)
+        self.version = version
+        self.guardar()
+
+    def actualizar(self):
+        """Pone el modelo al día: lo carga de disco y aplica solo los cambios nuevos.
+
+        Puede llamarse desde un hilo de fondo para precalentar el modelo.
+        """
+        with self._lock:
+            self._actualizar()
+
+    def _actualizar(self):
+        """Pone el modelo al día (con el lock tomado)"""
+        recien_cargado = self.version is None
+        if recien_cargado and not self.cargar():
+            self._reconstruir()
+            return
+
+        version = self.cambios.obtener_version_actual()
+        if version < self.version:
+            # El diario es de otra base (restaurada o reemplazada)
+            self._reconstruir()
+            return
+
+        cambios = self.cambios.obtener_cambios_desde(self.version) if version > self.version else []
+        if len(cambios) > max(100, len(self._libros) * self.FRACCION_RECONSTRUCCION):
+            self._reconstruir()
+            return
+
+        for cambio in cambios:
+            self._quitar(cambio['libro_id'])
+            if cambio['operacion'] != 'D':
+                self._agregar(cambio['libro_id'], cambio['despues'])
+        self.version = version
+
+        if recien_cargado:
+            # Un modelo en disco que no coincide con la base se descarta
+            total = self.db.execute_query('SELECT COUNT(*) FROM libros', fetch=True)[0][0]
+            if total != len(self._libros):
+                self._reconstruir()
+            elif cambios:
+                self.guardar()
+
+    def similares(self, libro_id: int, cantidad: int = 10) -> List[Dict]:
+        """Retorna los libros del mismo perfil más parecidos al dado, con su similitud"""
+        with self._lock:
+            self._actualizar()
+            return self._similares(libro_id, cantidad)
+
+    def _similares(self, libro_id: int, cantidad: int) -> List[Dict]:
+        """Busca los libros más parecidos (con el lock tomado)"""
+        datos = self._libros.get(libro_id)
+        if datos is None:
+            return []
+        usuario_id, _, _, rasgos = datos
+
+        # Producto del vector consulta (normalizado) con cada libro que comparte rasgos
+        inversa_norma = self._inversa_norma
+        puntajes: Dict[int, float] = {}
+        for rasgo in rasgos:
+            peso = self._peso(rasgo)
+            aporte = peso * peso * inversa_norma[libro_id]
+            for otro in self._indice.get(rasgo, ()):
+                puntajes[otro] = puntajes.get(otro, 0.0) + aporte * inversa_norma[otro]
+        puntajes.pop(libro_id, None)
+
+        libros = self._libros
+        mejores = heapq.nlargest(
+            cantidad,
+            ((puntaje, otro) for otro, puntaje in puntajes.items() if libros[otro][0] == usuario_id)
+        )
+        return [
+            {'id': otro, 'titulo': libros[otro][1], 'autor': libros[otro][2], 'similitud': round(puntaje, 3)}
+            for puntaje, otro in mejores
+        ]
+
+    def guardar(self):
+        """Guarda el modelo en disco"""
+        if not self.ruta_cache:
+            return
+        estado = {
+            'formato': FORMATO_MODELO,
+            'version': self.version,
+            'libros': self._libros,
+            'idf': self._idf,
+            'total_idf': self._total_idf
+        }
+        temporal = self.ruta_cache + '.tmp'
+        with open(temporal, 'wb') as archivo:
+            pickle.dump(estado, archivo, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporal, self.ruta_cache)
+
+    def cargar(self) -> bool:
+        """Carga el modelo de disco; retorna False si no hay uno válido"""
+        if not self.ruta_cache:
+            return False
+        try:
+            with open(self.ruta_cache, 'rb') as archivo:
+                estado = pickle.load(archivo)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return False
+        if estado.get('formato') != FORMATO_MODELO:
+            return False
+
+        # El índice y las normas se derivan de los rasgos guardados
+        self._idf = estado['idf']
+        self._total_idf = estado['total_idf']
+        self._libros, self._indice, self._inversa_norma = {}, {}, {}
+        for libro_id, (usuario_id, titulo, autor, rasgos) in estado['libros'].items():
+            self._libros[libro_id] = (usuario_id, titulo, autor, rasgos)
+            for rasgo in rasgos:
+                self._indice.setdefault(rasgo, set()).add(libro_id)
+            norma = math.sqrt(sum(self._peso(rasgo) ** 2 for rasgo in rasgos))
+            self._inversa_norma[libro_id] = 1 / norma if norma else 0.0
+        self.version = estado['version']
+        return True
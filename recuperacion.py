@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Registro de Lecturas - recuperacion.py
+
+Autor: Sebastian Sanchez Bentolila
+Email: sebastiansb3004@gmail.com
+Versión: 1.0.0
+Última modificación: 29/07/2025
+Licencia: MIT
+Copyright: © 2025 - Todos los derechos reservados
+
+Descripción:
+- Verificación de recuperación ante caídas
+- Lanza un proceso escritor y lo mata (SIGKILL) en medio de una transacción,
+  con escrituras agrupadas sin volcar o entre escrituras confirmadas
+- Reabre la base y comprueba que pasa integrity_check, que conserva
+  exactamente lo confirmado, y que el diario de cambios, las etiquetas, el
+  índice de texto y el resumen mensual coinciden con los libros
+
+
+Dependencias:
+- Python 3.13.3
+- Módulos estándar: argparse, os, sqlite3, subprocess, sys, tempfile,
+  time, typing
+
+Uso:
+    python recuperacion.py [--escenario transaccion|agrupada|confirmadas]
+                           [--modo-diario WAL DELETE]
+"""
+
+import argparse
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Tuple
+
+from modelo import DatabaseManager, LibroModel, MetaModel
+
+# Los títulos de lo que nunca llegó a confirmarse empiezan así
+PENDIENTE = 'Pendiente'
+
+def _libro(titulo: str, numero: int) -> Dict:
+    """Datos de un libro de prueba, con etiquetas y fecha de lectura"""
+    return {
+        'titulo': titulo, 'autor': f'Autor {numero % 7}', 'genero': 'Novela',
+        'anio_lectura': 2020 + numero % 5, 'fecha_lectura': f'{2020 + numero % 5}-0{1 + numero % 9}-15',
+        'calificacion': numero % 5 + 0.5, 'paginas': 100 + numero,
+        'tags': ['club', f'serie {numero % 3}']
+    }
+
+# Escritores: corren en el proceso hijo, avisan por stdout cuántos libros
+# hay confirmados y escriben 'matar' cuando quedan a la espera del SIGKILL
+def _escribir_transaccion(libros: LibroModel, avisar: Callable[[str], None]):
+    """20 libros confirmados y, en una transacción sin terminar, 3000 altas
+    en lotes, ediciones y bajas de los confirmados"""
+    ids = [libros.crear_libro(_libro(f'Confirmado {n}', n)) for n in range(20)]
+    avisar('confirmados 20')
+    with libros.transaccion():
+        for inicio in range(0, 3000, 500):
+            libros.crear_libros([_libro(f'{PENDIENTE} {n}', n) for n in range(inicio, inicio + 500)])
+        for n, libro_id in enumerate(ids[:10]):
+            libros.actualizar_libro(libro_id, dict(_libro(f'{PENDIENTE} (editado)', n), tags=['editado']))
+        for libro_id in ids[10:15]:
+            libros.eliminar_libro(libro_id)
+        avisar('matar')
+        time.sleep(3600)
+
+def _escribir_agrupada(libros: LibroModel, avisar: Callable[[str], None]):
+    """120 altas con escritura agrupada de a 50: las últimas 20 quedan sin volcar"""
+    libros.db.activar_escritura_agrupada(max_operaciones=50, max_ms=3600 * 1000)
+    for n in range(120):
+        libros.crear_libro(_libro(f'{PENDIENTE} {n}' if n >= 100 else f'Confirmado {n}', n))
+    avisar('confirmados 100')
+    avisar('matar')
+    time.sleep(3600)
+
+def _escribir_confirmadas(libros: LibroModel, avisar: Callable[[str], None]):
+    """Altas, ediciones y bajas confirmadas una por una, sin parar: se mata en
+    cualquier punto y cada escritura avisada tiene que sobrevivir"""
+    ids, n = [], 0
+    while True:
+        ids.append(libros.crear_libro(_libro(f'Confirmado {n}', n)))
+        if n % 3 == 2:
+            libros.actualizar_libro(ids[-2], dict(_libro(f'Confirmado {n} (editado)', n), tags=['editado']))
+        if n % 5 == 4:
+            libros.eliminar_libro(ids.pop(0))
+        n += 1
+        avisar(f'confirmados {len(ids)}')
+        if n == 200:
+            avisar('matar')
+
+# Escenario -> (escritor, margen): el proceso puede morir con una escritura
+# en vuelo después del último aviso, y margen es cuánto puede mover el total
+ESCENARIOS: Dict[str, Tuple[Callable, int]] = {
+    'transaccion': (_escribir_transaccion, 0),
+    'agrupada': (_escribir_agrupada, 0),
+    'confirmadas': (_escribir_confirmadas, 1)
+}
+
+def _escritor(escenario: str, ruta: str, modo_diario: str):
+    """Punto de entrada del proceso hijo"""
+    def avisar(mensaje: str):
+        print(mensaje, flush=True)
+    libros = LibroModel(DatabaseManager(ruta, {'journal_mode': modo_diario}))
+    ESCENARIOS[escenario][0](libros, avisar)
+
+def _matar_escritor(escenario: str, ruta: str, modo_diario: str) -> int:
+    """Corre el escritor hasta que pide que lo maten, lo mata con SIGKILL y
+    retorna la cantidad de libros confirmados que avisó"""
+    proceso = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), '--escritor', escenario, ruta, modo_diario],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+    )
+    confirmados = None
+    try:
+        for linea in proceso.stdout:
+            if linea.startswith('confirmados '):
+                confirmados = int(linea.split()[1])
+            elif linea.strip() == 'matar':
+                break
+        else:
+            raise RuntimeError(f'el escritor terminó antes de tiempo: {proceso.stderr.read().strip()}')
+        proceso.kill()
+        proceso.wait()
+        # Lo que avisó entre el pedido y la muerte también quedó confirmado
+        for linea in proceso.stdout:
+            if linea.startswith('confirmados '):
+                confirmados = int(linea.split()[1])
+    finally:
+        proceso.kill()
+        proceso.wait()
+        proceso.stdout.close()
+        proceso.stderr.close()
+    return confirmados
+
+def _comprobar_base(ruta: str) -> Tuple[int, List[str]]:
+    """Retorna la cantidad de libros y los problemas encontrados en la base,
+    leyéndola con una conexión directa (sin el modelo, que la modificaría)"""
+    problemas = []
+    conn = sqlite3.connect(ruta)
+    try:
+        resultado = conn.execute('PRAGMA integrity_check').fetchall()
+        if resultado != [('ok',)]:
+            problemas.append(f"integrity_check: {'; '.join(fila[0] for fila in resultado[:5])}")
+        total = conn.execute('SELECT COUNT(*) FROM libros').fetchone()[0]
+
+        # El último cambio del diario de cada libro es la imagen de la fila actual
+        columnas = [fila[1] for fila in conn.execute('PRAGMA table_info(libros)')]
+        ultimos = conn.execute('''
+            SELECT libro_id, operacion, despues FROM cambios
+            WHERE version IN (SELECT MAX(version) FROM cambios GROUP BY libro_id)
+        ''').fetchall()
+        imagenes = dict(conn.execute(f"SELECT id, json_array({', '.join(columnas)}) FROM libros").fetchall())
+        for libro_id, operacion, despues in ultimos:
+            if operacion == 'D' and libro_id in imagenes:
+                problemas.append(f'diario: el libro {libro_id} figura borrado pero existe')
+            elif operacion != 'D' and imagenes.get(libro_id) != despues:
+                problemas.append(f'diario: el libro {libro_id} no coincide con su último cambio')
+        sin_diario = set(imagenes) - {libro_id for libro_id, _, _ in ultimos}
+        if sin_diario:
+            problemas.append(f'diario: {len(sin_diario)} libros sin cambios registrados')
+
+        # libro_tags es exactamente lo que dice libros.tags
+        esperadas = '''
+            SELECT l.id, t.id FROM libros l, json_each(l.tags) j
+            JOIN tags t ON t.usuario_id = l.usuario_id AND t.nombre = j.value
+        '''
+        for consulta, problema in [
+            (f'{esperadas} EXCEPT SELECT libro_id, tag_id FROM libro_tags', 'faltan vínculos'),
+            (f'SELECT libro_id, tag_id FROM libro_tags EXCEPT {esperadas}', 'sobran vínculos')
+        ]:
+            cantidad = conn.execute(f'SELECT COUNT(*) FROM ({consulta})').fetchone()[0]
+            if cantidad:
+                problemas.append(f'etiquetas: {problema} ({cantidad})')
+
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'libros_fts'").fetchone():
+            try:
+                conn.execute("INSERT INTO libros_fts (libros_fts) VALUES ('integrity-check')")
+            except sqlite3.DatabaseError as e:
+                problemas.append(f'índice de texto: {e}')
+
+        # El resumen mantenido por triggers es igual al recalculado (y se descarta)
+        consulta = 'SELECT * FROM libros_mensuales WHERE libros != 0 OR paginas != 0 ORDER BY 1, 2'
+        actual = conn.execute(consulta).fetchall()
+        MetaModel.reconstruir_resumen(conn.cursor())
+        if conn.execute(consulta).fetchall() != actual:
+            problemas.append('resumen mensual: no coincide con los libros')
+        conn.rollback()
+    finally:
+        conn.close()
+    return total, problemas
+
+def verificar_escenario(escenario: str, modo_diario: str, directorio: str) -> List[str]:
+    """Mata un escritor del escenario y retorna los problemas de la base que deja"""
+    ruta = os.path.join(directorio, f'{escenario}-{modo_diario.lower()}.db')
+    confirmados = _matar_escritor(escenario, ruta, modo_diario)
+
+    total, problemas = _comprobar_base(ruta)
+    margen = ESCENARIOS[escenario][1]
+    if abs(total - confirmados) > margen:
+        problemas.append(f'hay {total} libros y se confirmaron {confirmados}')
+    conn = sqlite3.connect(ruta)
+    try:
+        pendientes = conn.execute('SELECT COUNT(*) FROM libros WHERE titulo LIKE ?', (f'{PENDIENTE}%',)).fetchone()[0]
+    finally:
+        conn.close()
+    if pendientes:
+        problemas.append(f'quedaron {pendientes} escrituras sin confirmar')
+
+    # La base recuperada se puede volver a usar con el modelo
+    if not problemas:
+        libros = LibroModel(DatabaseManager(ruta, {'journal_mode': modo_diario}))
+        libros.crear_libro(_libro('Después de la caída', 0))
+        total_nuevo, problemas = _comprobar_base(ruta)
+        if total_nuevo != total + 1:
+            problemas.append('el alta posterior a la caída no se ve')
+    return problemas
+
+def main(argv: List[str] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ['--escritor']:
+        _escritor(*argv[1:4])
+        return 0
+
+    parser = argparse.ArgumentParser(description='Recuperación de la base ante caídas del proceso')
+    parser.add_argument('--escenario', choices=list(ESCENARIOS),
+                        help='Verifica solo este escenario (por defecto, todos)')
+    parser.add_argument('--modo-diario', nargs='+', default=['WAL', 'DELETE'],
+                        help='Modos de journal_mode a probar')
+    args = parser.parse_args(argv)
+
+    errores = 0
+    with tempfile.TemporaryDirectory() as directorio:
+        for modo_diario in args.modo_diario:
+            for escenario in [args.escenario] if args.escenario else list(ESCENARIOS):
+                try:
+                    problemas = verificar_escenario(escenario, modo_diario, directorio)
+                except Exception as e:
+                    problemas = [f'{type(e).__name__}: {e}']
+                print(f"{escenario} ({modo_diario}): {'ok' if not problemas else 'falla'}")
+                for problema in problemas:
+                    print(f'  ✗ {problema}')
+                errores += len(problemas)
+    return 1 if errores else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Registro de Lecturas - servidor.py
+
+Autor: Sebastian Sanchez Bentolila
+Email: sebastiansb3004@gmail.com
+Versión: 1.0.0
+Última modificación: 29/07/2025
+Licencia: MIT
+Copyright: © 2025 - Todos los derechos reservados
+
+Descripción:
+- Servidor HTTP/JSON local y de solo lectura sobre el registro de lecturas
+- Expone /libros, /libros/{id}, /stats y /export
+- Soporta ETag/If-None-Match, compresión gzip y JSON paginado en streaming
+
+Uso:
+    python servidor.py [--host 127.0.0.1] [--puerto 8765] [--db ruta.db] [--config config.json]
+
+
+Dependencias:
+- Python 3.13.3
+- Módulos estándar: argparse, csv, io, json, secrets, zlib, http.server, urllib
+"""
+
+import argparse
+import csv
+import io
+import json
+import secrets
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, Optional, Tuple
+from urllib.parse import urlparse, parse_qs
+
+from configuracion import agregar_argumentos, cargar_configuracion
+from modelo import DatabaseManager, LibroModel, LIBRO_COLUMNAS, ESTADOS, CONSULTA_LIBRO, configurar
+
+def _estado(valor: str) -> str:
+    """Valida un estado de lectura recibido por query string"""
+    if valor not in ESTADOS:
+        raise ValueError(valor)
+    return valor
+
+def _consulta(valor: str) -> str:
+    """Valida una búsqueda con el lenguaje de consultas"""
+    CONSULTA_LIBRO.analizar(valor)
+    return valor
+
+# Filtros de obtener_libros aceptados por query string y su conversión
+FILTROS_PERMITIDOS = {
+    'usuario_id': int,
+    'anio_lectura': int,
+    'genero': str,
+    'estado': _estado,
+    'calificacion_min': float,
+    'calificacion_max': float,
+    'search': str,
+    'consulta': _consulta
+}
+
+POR_PAGINA_DEFECTO = 100
+POR_PAGINA_MAXIMO = 1000
+
+class LecturasHandler(BaseHTTPRequestHandler):
+    """Atiende las peticiones GET de la API"""
+
+    protocol_version = 'HTTP/1.1'
+    server_version = 'RegistroLecturas/1.0'
+
+    def do_HEAD(self):
+        self.do_GET(solo_encabezados=True)
+
+    def do_GET(self, solo_encabezados: bool = False):
+        url = urlparse(self.path)
+        partes = [p for p in url.path.split('/') if p]
+
+        try:
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            filtros = self._leer_filtros(query)
+
+            if partes == ['libros']:
+                ruta = self._libros
+            elif len(partes) == 2 and partes[0] == 'libros' and partes[1].isdigit():
+                # Los filtros de la petición (usuario_id incluido) se mantienen
+                filtros = {**filtros, 'id': int(partes[1])}
+                ruta = self._libro
+            elif partes == ['stats']:
+                ruta = self._stats
+            elif partes == ['export']:
+                ruta = self._export
+            else:
+                self._error(404, 'Ruta no encontrada')
+                return
+        except ValueError as e:
+            self._error(400, str(e))
+            return
+
+        # El ETag depende de la versión de los datos y de la petición completa
+        etag = f'W/"{self.server.token}-{self.server.db.obtener_version_datos()}-{zlib.crc32(self.path.encode()):08x}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        ruta(filtros, query, etag, solo_encabezados)
+
+    def _leer_filtros(self, query: Dict[str, str]) -> Dict:
+        """Convierte los parámetros de la URL en filtros de obtener_libros"""
+        filtros = {}
+        for clave, conversion in FILTROS_PERMITIDOS.items():
+            if clave in query and query[clave] != '':
+                try:
+                    filtros[clave] = conversion(query[clave])
+                except ValueError:
+                    raise ValueError(f"Valor inválido para {clave}: {query[clave]}")
+        return filtros
+
+    def _paginacion(self, query: Dict[str, str]) -> Tuple[int, int]:
+        """Retorna (pagina, por_pagina) validados"""
+        try:
+            pagina = max(1, int(query.get('pagina', 1)))
+            por_pagina = int(query.get('por_pagina', POR_PAGINA_DEFECTO))
+        except ValueError:
+            raise ValueError("pagina y por_pagina deben ser enteros")
+        return pagina, min(max(1, por_pagina), POR_PAGINA_MAXIMO)
+
+    def _libros(self, filtros, query, etag, solo_encabezados):
+        """GET /libros: lista paginada en streaming"""
+        try:
+            pagina, por_pagina = self._paginacion(query)
+        except ValueError as e:
+            self._error(400, str(e))
+            return
+
+        consulta, params = self.server.libro_model.construir_consulta(filtros)
+        conn = self.server.db._conectar()
+        try:
+            total = conn.execute(f'SELECT COUNT(*) FROM ({consulta})', params).fetchone()[0]
+            cursor = conn.execute(f'{consulta} LIMIT ? OFFSET ?',
+                                  (*params, por_pagina, (pagina - 1) * por_pagina))
+
+            def generar() -> Iterator[bytes]:
+                yield json.dumps({'pagina': pagina, 'por_pagina': por_pagina, 'total': total})[:-1].encode()
+                yield b', "libros": ['
+                primero = True
+                while True:
+                    lote = cursor.fetchmany(100)
+                    if not lote:
+                        break
+                    texto = ', '.join(json.dumps(dict(zip(LIBRO_COLUMNAS, fila)), ensure_ascii=False)
+                                      for fila in lote)
+                    yield (texto if primero else ', ' + texto).encode('utf-8')
+                    primero = False
+                yield b']}'
+
+            self._responder(generar(), 'application/json; charset=utf-8', etag, solo_encabezados)
+        finally:
+            conn.close()
+
+    def _libro(self, filtros, query, etag, solo_encabezados):
+        """GET /libros/{id}: un libro"""
+        libros = self.server.libro_model.obtener_libros(filtros)
+        if not libros:
+            self._error(404, 'Libro no encontrado')
+            return
+        cuerpo = json.dumps(libros[0], ensure_ascii=False).encode('utf-8')
+        self._responder(iter([cuerpo]), 'application/json; charset=utf-8', etag, solo_encabezados)
+
+    def _stats(self, filtros, query, etag, solo_encabezados):
+        """GET /stats: estadísticas de lectura"""
+        stats = self.server.libro_model.obtener_estadisticas(filtros.get('usuario_id'))
+        cuerpo = json.dumps(stats, ensure_ascii=False).encode('utf-8')
+        self._responder(iter([cuerpo]), 'application/json; charset=utf-8', etag, solo_encabezados)
+
+    def _export(self, filtros, query, etag, solo_encabezados):
+        """GET /export: CSV completo en streaming con los mismos filtros que /libros"""
+        consulta, params = self.server.libro_model.construir_consulta(filtros)
+        conn = self.server.db._conectar()
+        try:
+            cursor = conn.execute(consulta, params)
+
+            def generar() -> Iterator[bytes]:
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                writer.writerow(LIBRO_COLUMNAS)
+                while True:
+                    lote = cursor.fetchmany(500)
+                    if not lote:
+                        break
+                    writer.writerows(lote)
+                    yield buffer.getvalue().encode('utf-8')
+                    buffer.seek(0)
+                    buffer.truncate()
+                if buffer.getvalue():
+                    yield buffer.getvalue().encode('utf-8')
+
+            self._responder(generar(), 'text/csv; charset=utf-8', etag, solo_encabezados,
+                            {'Content-Disposition': 'attachment; filename="lecturas.csv"'})
+        finally:
+            conn.close()
+
+    def _responder(self, partes: Iterator[bytes], tipo: str, etag: Optional[str],
+                   solo_encabezados: bool, extra: Optional[Dict[str, str]] = None):
+        """Envía la respuesta en chunks, comprimida con gzip si el cliente lo acepta"""
+        usar_gzip = 'gzip' in self.headers.get('Accept-Encoding', '')
+
+        self.send_response(200)
+        self.send_header('Content-Type', tipo)
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Vary', 'Accept-Encoding')
+        if etag:
+            self.send_header('ETag', etag)
+        for clave, valor in (extra or {}).items():
+            self.send_header(clave, valor)
+        if usar_gzip:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        if solo_encabezados:
+            return
+
+        compresor = zlib.compressobj(6, zlib.DEFLATED, 31) if usar_gzip else None
+        for parte in partes:
+            if compresor:
+                parte = compresor.compress(parte)
+            if parte:
+                self._enviar_chunk(parte)
+        if compresor:
+            self._enviar_chunk(compresor.flush())
+        self._enviar_chunk(b'')
+
+    def _enviar_chunk(self, datos: bytes):
+        """Escribe un chunk de Transfer-Encoding: chunked (vacío = fin)"""
+        self.wfile.write(f'{len(datos):X}\r\n'.encode() + datos + b'\r\n')
+
+    def _error(self, codigo: int, mensaje: str):
+        """Envía un error en JSON"""
+        cuerpo = json.dumps({'error': mensaje}, ensure_ascii=False).encode('utf-8')
+        self.send_response(codigo)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, format, *args):
+        """Silencia el log por defecto salvo que se pida lo contrario"""
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+class LecturasServer(ThreadingHTTPServer):
+    """Servidor HTTP con acceso compartido al modelo"""
+
+    daemon_threads = True
+
+    def __init__(self, direccion: Tuple[str, int], db: DatabaseManager, verbose: bool = False):
+        super().__init__(direccion, LecturasHandler)
+        self.db = db
+        self.libro_model = LibroModel(db)
+        self.verbose = verbose
+        # Distingue los ETags de distintas ejecuciones del servidor
+        self.token = secrets.token_hex(4)
+
+def crear_servidor(host: str = '127.0.0.1', puerto: int = 8765,
+                   db: Optional[DatabaseManager] = None, verbose: bool = False) -> LecturasServer:
+    """Crea el servidor sin iniciarlo"""
+    if db is None:
+        from modelo import db_manager
+        db = db_manager
+    return LecturasServer((host, puerto), db, verbose)
+
+def main():
+    parser = argparse.ArgumentParser(description='API HTTP de solo lectura del Registro de Lecturas')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--puerto', type=int, default=8765)
+    agregar_argumentos(parser)
+    parser.add_argument('--verbose', action='store_true', help='Muestra cada petición en consola')
+    args = parser.parse_args()
+
+    try:
+        configurar(cargar_configuracion(args))
+    except (OSError, ValueError) as e:
+        parser.error(f"Configuración inválida: {e}")
+    servidor = crear_servidor(args.host, args.puerto, verbose=args.verbose)
+    print(f"Sirviendo en http://{args.host}:{args.puerto} (Ctrl+C para salir)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+if __name__ == "__main__":
+    main()
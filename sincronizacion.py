@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Registro de Lecturas - sincronizacion.py
+
+Autor: Sebastian Sanchez Bentolila
+Email: sebastiansb3004@gmail.com
+Versión: 1.0.0
+Última modificación: 29/07/2025
+Licencia: MIT
+Copyright: © 2025 - Todos los derechos reservados
+
+Descripción:
+- Exporta paquetes delta con los libros cambiados desde una marca de agua
+- Aplica paquetes de forma idempotente, en lotes, resolviendo conflictos
+  por última escritura (fecha_actualizacion)
+- Sincroniza en ambos sentidos con una réplica en otro archivo
+
+
+Dependencias:
+- Python 3.13.3
+- Módulos estándar: gzip, json, os, typing
+"""
+
+import gzip
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+from modelo import DatabaseManager, clave_duplicado, crear_almacenamiento
+
+FORMATO_PAQUETE = 1
+
+# Columnas que viajan en un paquete (el id local no: se identifica por uuid).
+# Las etiquetas van en tags y los triggers de la base destino arman libro_tags
+COLUMNAS_SYNC = [
+    'uuid', 'titulo', 'autor', 'genero', 'subgenero', 'anio_lectura',
+    'fecha_lectura', 'calificacion', 'paginas', 'editorial', 'comentario',
+    'fecha_creacion', 'fecha_actualizacion', 'usuario_id', 'estado', 'isbn', 'tags'
+]
+
+class SincronizacionModel:
+    """Sincronización incremental de la tabla libros entre bases"""
+
+    def __init__(self, db_manager: DatabaseManager, tamanio_lote: int = 500):
+        self.db = db_manager
+        self.tamanio_lote = tamanio_lote
+        self.db.execute_query('''
+            CREATE TABLE IF NOT EXISTS sincronizacion (
+                replica TEXT PRIMARY KEY,
+                local_hasta TEXT,
+                remota_hasta TEXT
+            )
+        ''')
+
+    def exportar_delta(self, desde: Optional[str] = None) -> Dict:
+        """Arma un paquete con los libros modificados y borrados desde la marca dada.
+
+        La comparación es inclusiva (>=) porque las fechas tienen resolución de
+        segundos; repetir una fila es inofensivo porque aplicar es idempotente.
+        """
+        desde = desde or ''
+        with self.db._get_connection() as conn:
+            libros = conn.execute(
+                f"SELECT {', '.join(COLUMNAS_SYNC)} FROM libros "
+                f"WHERE fecha_actualizacion >= ? ORDER BY fecha_actualizacion",
+                (desde,)
+            ).fetchall()
+            borrados = conn.execute(
+                'SELECT uuid, usuario_id, fecha_borrado FROM libros_borrados '
+                'WHERE fecha_borrado >= ? ORDER BY fecha_borrado',
+                (desde,)
+            ).fetchall()
+
+        fechas = [fila[COLUMNAS_SYNC.index('fecha_actualizacion')] for fila in libros]
+        fechas += [fila[2] for fila in borrados]
+        return {
+            'formato': FORMATO_PAQUETE,
+            'desde': desde,
+            'hasta': max(fechas) if fechas else desde,
+            'columnas': COLUMNAS_SYNC,
+            'libros': [list(fila) for fila in libros],
+            'borrados': [list(fila) for fila in borrados]
+        }
+
+    @staticmethod
+    def guardar_paquete(paquete: Dict, file_path: str):
+        """Escribe un paquete comprimido en disco"""
+        with gzip.open(file_path, 'wt', encoding='utf-8') as archivo:
+            json.dump(paquete, archivo, ensure_ascii=False, separators=(',', ':'))
+
+    @staticmethod
+    def leer_paquete(file_path: str) -> Dict:
+        """Lee un paquete comprimido de disco"""
+        with gzip.open(file_path, 'rt', encoding='utf-8') as archivo:
+            paquete = json.load(archivo)
+        if paquete.get('formato') != FORMATO_PAQUETE:
+            raise ValueError(f"Formato de paquete no soportado: {paquete.get('formato')}")
+        return paquete
+
+    def aplicar_delta(self, paquete: Dict) -> Dict[str, int]:
+        """Aplica un paquete y retorna cuántas filas se insertaron, actualizaron y borraron.
+
+        Cada fila gana solo si es más reciente que la versión local (o que la
+        lápida local), así aplicar el mismo paquete dos veces no cambia nada.
+        """
+        columnas = paquete['columnas']
+        filas = [dict(zip(columnas, fila)) for fila in paquete['libros']]
+        resultado = {'insertados': 0, 'actualizados': 0, 'borrados': 0, 'ignorados': 0}
+
+        with self.db._get_connection() as conn:
+            usuarios = {fila[0] for fila in conn.execute('SELECT id FROM usuario')}
+            usuario_defecto = min(usuarios)
+
+            for inicio in range(0, len(filas), self.tamanio_lote):
+                lote = filas[inicio:inicio + self.tamanio_lote]
+                locales, lapidas = self._estado_local(conn, [fila['uuid'] for fila in lote])
+
+                inserciones, actualizaciones = [], []
+                for fila in lote:
+                    fecha = fila['fecha_actualizacion']
+                    if fila['uuid'] in lapidas and lapidas[fila['uuid']] >= fecha:
+                        resultado['ignorados'] += 1
+                        continue
+                    if fila['usuario_id'] not in usuarios:
+                        fila['usuario_id'] = usuario_defecto
+                    fila['clave_dedup'] = clave_duplicado(fila['titulo'], fila['autor'])
+
+                    if fila['uuid'] not in locales:
+                        inserciones.append(fila)
+                    elif locales[fila['uuid']] < fecha:
+                        actualizaciones.append(fila)
+                    else:
+                        resultado['ignorados'] += 1
+
+                if inserciones:
+                    nombres = list(inserciones[0])
+                    conn.executemany(
+                        f"INSERT INTO libros ({', '.join(nombres)}) "
+                        f"VALUES ({', '.join('?' * len(nombres))})",
+                        [tuple(fila[n] for n in nombres) for fila in inserciones]
+                    )
+                if actualizaciones:
+                    nombres = [n for n in actualizaciones[0] if n != 'uuid']
+                    conn.executemany(
+                        f"UPDATE libros SET {', '.join(f'{n} = ?' for n in nombres)} WHERE uuid = ?",
+                        [tuple(fila[n] for n in nombres) + (fila['uuid'],) for fila in actualizaciones]
+                    )
+                resultado['insertados'] += len(inserciones)
+                resultado['actualizados'] += len(actualizaciones)
+                conn.commit()
+
+            borrados = paquete['borrados']
+            for inicio in range(0, len(borrados), self.tamanio_lote):
+                lote = borrados[inicio:inicio + self.tamanio_lote]
+                locales, _ = self._estado_local(conn, [fila[0] for fila in lote])
+
+                # Solo se borra si la baja es posterior a la última modificación local
+                a_borrar = [(uuid_libro, fecha) for uuid_libro, _, fecha in lote
+                            if uuid_libro in locales and locales[uuid_libro] <= fecha]
+                conn.executemany('DELETE FROM libros WHERE uuid = ?', [(u,) for u, _ in a_borrar])
+
+                # Conservar la fecha original de la baja en la lápida
+                conn.executemany('''
+                    INSERT INTO libros_borrados (uuid, usuario_id, fecha_borrado) VALUES (?, ?, ?)
+                    ON CONFLICT (uuid) DO UPDATE SET fecha_borrado = MAX(fecha_borrado, excluded.fecha_borrado)
+                ''', [tuple(fila) for fila in lote if fila[0] not in locales or locales[fila[0]] <= fila[2]])
+                conn.executemany(
+                    'UPDATE libros_borrados SET fecha_borrado = ? WHERE uuid = ?',
+                    [(fecha, u) for u, fecha in a_borrar]
+                )
+                resultado['borrados'] += len(a_borrar)
+                conn.commit()
+
+        return resultado
+
+    @staticmethod
+    def _estado_local(conn, uuids: List[str]) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """Retorna las fechas locales de actualización y de baja de los uuids dados"""
+        if not uuids:
+            return {}, {}
+        marcas = ', '.join('?' * len(uuids))
+        locales = dict(conn.execute(
+            f'SELECT uuid, fecha_actualizacion FROM libros WHERE uuid IN ({marcas})', uuids
+        ).fetchall())
+        lapidas = dict(conn.execute(
+            f'SELECT uuid, fecha_borrado FROM libros_borrados WHERE uuid IN ({marcas})', uuids
+        ).fetchall())
+        return locales, lapidas
+
+    def _leer_marcas(self, replica: str) -> Tuple[Optional[str], Optional[str]]:
+        """Retorna las marcas de agua (local, remota) de la última sincronización"""
+        filas = self.db.execute_query(
+            'SELECT local_hasta, remota_hasta FROM sincronizacion WHERE replica = ?',
+            (replica,), fetch=True
+        )
+        return filas[0] if filas else (None, None)
+
+    def _guardar_marcas(self, replica: str, local_hasta: str, remota_hasta: str):
+        """Guarda las marcas de agua de una réplica"""
+        self.db.execute_query('''
+            INSERT INTO sincronizacion (replica, local_hasta, remota_hasta) VALUES (?, ?, ?)
+            ON CONFLICT (replica) DO UPDATE SET
+                local_hasta = excluded.local_hasta,
+                remota_hasta = excluded.remota_hasta
+        ''', (replica, local_hasta, remota_hasta))
+
+    def sincronizar_con(self, ruta_replica: str) -> Dict[str, Dict[str, int]]:
+        """Sincroniza en ambos sentidos con otra base (se crea si no existe)"""
+        replica = os.path.abspath(ruta_replica)
+        # La réplica se abre con los mismos PRAGMAs (busy_timeout, journal_mode...)
+        # que la base local y se cierra al terminar
+        almacenamiento = crear_almacenamiento('sqlite', replica, self.db.pragmas)
+        try:
+            remota = SincronizacionModel(almacenamiento, self.tamanio_lote)
+            local_hasta, remota_hasta = self._leer_marcas(replica)
+
+            paquete_local = self.exportar_delta(local_hasta)
+            paquete_remoto = remota.exportar_delta(remota_hasta)
+
+            resultado = {
+                'enviados': remota.aplicar_delta(paquete_local),
+                'recibidos': self.aplicar_delta(paquete_remoto)
+            }
+        finally:
+            almacenamiento.cerrar()
+        self._guardar_marcas(replica, paquete_local['hasta'], paquete_remoto['hasta'])
+        return resultado
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Registro de Lecturas - validacion.py
+
+Autor: Sebastian Sanchez Bentolila
+Email: sebastiansb3004@gmail.com
+Versión: 1.0.0
+Última modificación: 29/07/2025
+Licencia: MIT
+Copyright: © 2025 - Todos los derechos reservados
+
+Descripción:
+- Esquemas de validación declarativos (un Campo por columna)
+- Conversión de tipos por columnas para lotes completos, con valores por
+  defecto calculados una sola vez por lote
+- Errores estructurados por fila y campo, en lugar de valores silenciosos
+
+
+Dependencias:
+- Python 3.13.3
+- Módulos estándar: dataclasses, datetime, typing
+"""
+
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+# Formatos de fecha aceptados además de AAAA-MM-DD
+FORMATOS_FECHA = ('%d/%m/%Y', '%d-%m-%Y', '%Y/%m/%d')
+
+@dataclass
+class Campo:
+    """Definición de un campo: tipo, obligatoriedad, rango y valor por defecto.
+
+    tipo es 'texto', 'entero', 'real', 'fecha' o 'lista' (de textos, separados
+    por coma si llega como texto). El defecto puede ser un
+    valor o una función sin argumentos (se evalúa una vez por lote).
+    transformar recibe el valor ya convertido y retorna None si es inválido.
+    """
+    nombre: str
+    tipo: str = 'texto'
+    requerido: bool = False
+    defecto: Any = None
+    minimo: Optional[float] = None
+    maximo: Optional[float] = None
+    largo_maximo: Optional[int] = None
+    opciones: Optional[Sequence[str]] = None
+    transformar: Optional[Callable[[Any], Any]] = None
+    etiqueta: Optional[str] = None
+
+@dataclass
+class ErrorCampo:
+    """Un error de validación: fila del lote, campo, motivo y valor recibido"""
+    fila: int
+    campo: str
+    mensaje: str
+    valor: Any = None
+
+    def __str__(self) -> str:
+        return f"{self.campo}: {self.mensaje}"
+
+class ErrorValidacion(ValueError):
+    """Datos que no cumplen el esquema; errores tiene el detalle por campo"""
+
+    def __init__(self, errores: List[ErrorCampo]):
+        self.errores = errores
+        super().__init__('\n'.join(str(error) for error in errores))
+
+@dataclass
+class ResultadoLote:
+    """Resultado de validar un lote: filas válidas, su posición original y errores"""
+    validas: List[Dict] = field(default_factory=list)
+    indices: List[int] = field(default_factory=list)
+    errores: List[ErrorCampo] = field(default_factory=list)
+
+    def resumen(self, limite: int = 10) -> str:
+        """Texto con la cantidad de filas válidas y los primeros errores"""
+        lineas = [f"{len(self.validas)} filas válidas, {len(self.errores)} errores"]
+        for error in self.errores[:limite]:
+            lineas.append(f"  fila {error.fila + 1}: {error}")
+        if len(self.errores) > limite:
+            lineas.append(f"  ... y {len(self.errores) - limite} más")
+        return '\n'.join(lineas)
+
+def _vacio(valor) -> bool:
+    return valor is None or (isinstance(valor, str) and not valor.strip())
+
+class Esquema:
+    """Valida y convierte datos según una lista de campos.
+
+    Al crearlo se arma una función de conversión por campo; validar un lote
+    recorre los datos por columnas aplicando cada función a la columna
+    entera, y solo si alguna falla repasa esa columna valor por valor para
+    reportar qué filas tienen errores.
+    """
+
+    def __init__(self, campos: List[Campo],
+                 ajustes: Sequence[Callable[[Dict[str, List]], None]] = ()):
+        self.campos = campos
+        self.ajustes = list(ajustes)
+        self.nombres = [campo.nombre for campo in campos]
+
+    def _defectos(self) -> Dict[str, Any]:
+        """Valores por defecto del lote (las funciones se evalúan una sola vez)"""
+        return {
+            campo.nombre: campo.defecto() if callable(campo.defecto) else campo.defecto
+            for campo in self.campos
+        }
+
+    @staticmethod
+    def _conversor(campo: Campo, defecto) -> Callable[[Any], Any]:
+        """Arma la función que convierte un valor del campo o lanza ValueError"""
+        nombre = campo.etiqueta or campo.nombre
+        minimo, maximo = campo.minimo, campo.maximo
+
+        if campo.tipo == 'entero':
+            def base(valor):
+                if isinstance(valor, bool):
+                    raise ValueError('debe ser un número entero')
+                if isinstance(valor, float):
+                    if not valor.is_integer():
+                        raise ValueError('debe ser un número entero')
+                    return int(valor)
+                try:
+                    return int(valor) if isinstance(valor, int) else int(str(valor).strip())
+                except ValueError:
+                    raise ValueError('debe ser un número entero') from None
+        elif campo.tipo == 'real':
+            def base(valor):
+                if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+                    return float(valor)
+                try:
+                    # Se acepta la coma decimal ("4,5")
+                    return float(str(valor).strip().replace(',', '.'))
+                except ValueError:
+                    raise ValueError('debe ser un número') from None
+        elif campo.tipo == 'fecha':
+            def base(valor):
+                if isinstance(valor, datetime):
+                    return valor.date().isoformat()
+                if isinstance(valor, date):
+                    return valor.isoformat()
+                texto = str(valor).strip()
+                try:
+                    return date.fromisoformat(texto[:10]).isoformat()
+                except ValueError:
+                    pass
+                for formato in FORMATOS_FECHA:
+                    try:
+                        return datetime.strptime(texto, formato).date().isoformat()
+                    except ValueError:
+                        pass
+                raise ValueError('debe ser una fecha (AAAA-MM-DD)')
+        elif campo.tipo == 'lista':
+            def base(valor):
+                partes = valor.split(',') if isinstance(valor, str) else valor
+                if not isinstance(partes, (list, tuple, set)):
+                    raise ValueError('debe ser una lista')
+                return [parte for parte in (str(p).strip() for p in partes) if parte]
+        else:
+            def base(valor):
+                return valor.strip() if isinstance(valor, str) else str(valor)
+
+        opciones = {opcion.casefold(): opcion for opcion in campo.opciones} if campo.opciones else None
+        requerido, largo_maximo, transformar = campo.requerido, campo.largo_maximo, campo.transformar
+
+        def convertir(valor):
+            if _vacio(valor):
+                if requerido:
+                    raise ValueError('es obligatorio')
+                return defecto
+            valor = base(valor)
+            if minimo is not None and valor < minimo:
+                raise ValueError(f'debe ser al menos {minimo:g}')
+            if maximo is not None and valor > maximo:
+                raise ValueError(f'debe ser como máximo {maximo:g}')
+            if largo_maximo is not None and len(valor) > largo_maximo:
+                raise ValueError(f'no puede superar {largo_maximo} caracteres')
+            if opciones is not None:
+                if valor.casefold() not in opciones:
+                    raise ValueError(f"debe ser uno de: {', '.join(campo.opciones)}")
+                valor = opciones[valor.casefold()]
+            if transformar is not None:
+                valor = transformar(valor)
+                if valor is None:
+                    raise ValueError('no es válido')
+            return valor
+
+        convertir.nombre = nombre
+        return convertir
+
+    def validar_lote(self, filas: List[Dict]) -> ResultadoLote:
+        """Valida y convierte un lote de filas por columnas"""
+        defectos = self._defectos()
+        columnas: Dict[str, List] = {}
+        errores: List[ErrorCampo] = []
+
+        for campo in self.campos:
+            convertir = self._conversor(campo, defectos[campo.nombre])
+            crudos = [fila.get(campo.nombre) for fila in filas]
+            try:
+                columnas[campo.nombre] = list(map(convertir, crudos))
+            except ValueError:
+                # Camino lento solo para las columnas con errores
+                convertidos = []
+                for indice, valor in enumerate(crudos):
+                    try:
+                        convertidos.append(convertir(valor))
+                    except ValueError as e:
+                        convertidos.append(None)
+                        errores.append(ErrorCampo(indice, convertir.nombre, str(e), valor))
+                columnas[campo.nombre] = convertidos
+
+        for ajuste in self.ajustes:
+            ajuste(columnas)
+
+        resultado = ResultadoLote(errores=sorted(errores, key=lambda error: error.fila))
+        con_error = {error.fila for error in errores}
+        nombres = self.nombres
+        for indice, valores in enumerate(zip(*(columnas[nombre] for nombre in nombres))):
+            if indice not in con_error:
+                resultado.validas.append(dict(zip(nombres, valores)))
+                resultado.indices.append(indice)
+        return resultado
+
+    def validar(self, datos: Dict) -> Dict:
+        """Valida y convierte un solo registro; lanza ErrorValidacion si no es válido"""
+        resultado = self.validar_lote([datos])
+        if resultado.errores:
+            raise ErrorValidacion(resultado.errores)
+        return resultado.validas[0]
+
+    def errores(self, datos: Dict) -> List[ErrorCampo]:
+        """Retorna los errores de un registro (lista vacía si es válido)"""
+        return self.validar_lote([datos]).errores
@@ -23,9 +23,9 @@ Dependencias:
 """
 
 import tkinter as tk
-from tkinter import ttk, messagebox, filedialog, PhotoImage
+from tkinter import ttk, messagebox, filedialog, simpledialog, PhotoImage
 from datetime import datetime
-from typing import Optional, Dict, List, Callable
+from typing import Optional, Dict, List, Tuple, Callable
 import os
 
 class StyleConfig:
@@ -131,6 +131,13 @@ class MainView(tk.Tk):
     def __init__(self, controller):
         super().__init__()
         self.controller = controller
+        self.reading_states = ['leído', 'leyendo', 'por leer']
+        self.tag_modes = {'y': 'Todas', 'o': 'Alguna'}
+        self._load_job = None
+        self.load_batch_size = 200
+        self.covers = None
+        self._row_covers = {}
+        self._load_summary = ""
         self.style = StyleConfig()
         self.style.configure_styles()
         
@@ -147,6 +154,10 @@ class MainView(tk.Tk):
         self._create_widgets()
         self._layout()
         
+        # Atajos de teclado
+        self.bind_all('<Control-z>', lambda event: self._on_shortcut(event, self.controller.undo))
+        self.bind_all('<Control-y>', lambda event: self._on_shortcut(event, self.controller.redo))
+        
     def _create_widgets(self):
         """Crea todos los widgets de la interfaz"""
         # Frame principal
@@ -160,6 +171,7 @@ class MainView(tk.Tk):
             text="Mi Registro de Lecturas", 
             font=self.style.fonts['title']
         )
+        self.goal_label = ttk.Label(self.logo_frame, text="")
         
         # Sección 2: Nuevos libros (formulario)
         self.new_book_frame = ttk.LabelFrame(
@@ -187,14 +199,18 @@ class MainView(tk.Tk):
         """Crea el formulario para agregar nuevos libros"""
         # Campos del formulario
         fields = [
+            ('isbn', 'ISBN:', 'isbn'),
             ('titulo', 'Título:', 'entry'),
             ('autor', 'Autor:', 'entry'),
+            ('estado', 'Estado:', 'state'),
             ('genero', 'Género:', 'combobox'),
             ('subgenero', 'Subgénero:', 'entry'),
             ('anio_lectura', 'Año de lectura:', 'entry'),
             ('calificacion', 'Calificación (1-5):', 'spinbox'),
             ('paginas', 'Páginas:', 'entry'),
             ('editorial', 'Editorial:', 'entry'),
+            ('tags', 'Etiquetas:', 'entry'),
+            ('portada', 'Portada:', 'file'),
             ('comentario', 'Comentario:', 'text')
         ]
         
@@ -264,6 +280,45 @@ class MainView(tk.Tk):
                 self.form_widgets[field] = combo
                 self.form_vars[field] = var
                 
+            elif widget_type == 'isbn':
+                var = tk.StringVar()
+                entry = ttk.Entry(self.new_book_frame, textvariable=var)
+                entry.grid(row=i, column=1, padx=5, pady=2, sticky='we')
+                entry.bind('<Return>', lambda e: self.controller.lookup_isbn())
+                ttk.Button(
+                    self.new_book_frame, 
+                    text="🔎", 
+                    width=3,
+                    command=self.controller.lookup_isbn
+                ).grid(row=i, column=2, sticky='w')
+                self.form_widgets[field] = entry
+                self.form_vars[field] = var
+                
+            elif widget_type == 'file':
+                var = tk.StringVar()
+                entry = ttk.Entry(self.new_book_frame, textvariable=var)
+                entry.grid(row=i, column=1, padx=5, pady=2, sticky='we')
+                ttk.Button(
+                    self.new_book_frame, 
+                    text="...", 
+                    width=3,
+                    command=lambda v=var: self._choose_cover(v)
+                ).grid(row=i, column=2, sticky='w')
+                self.form_widgets[field] = entry
+                self.form_vars[field] = var
+                
+            elif widget_type == 'state':
+                var = tk.StringVar(value=self.reading_states[0])
+                combo = ttk.Combobox(
+                    self.new_book_frame, 
+                    textvariable=var, 
+                    values=self.reading_states,
+                    state='readonly'
+                )
+                combo.grid(row=i, column=1, padx=5, pady=2, sticky='we')
+                self.form_widgets[field] = combo
+                self.form_vars[field] = var
+                
             elif widget_type == 'spinbox':
                 var = tk.DoubleVar()
                 spin = tk.Spinbox(
@@ -342,6 +397,19 @@ class MainView(tk.Tk):
         )
         self.rating_combo.grid(row=0, column=6, padx=5)
         
+        # Vista por estado de lectura (leídos, en curso o pendientes)
+        self.state_var = tk.StringVar(value=self.reading_states[0])
+        ttk.Label(self.filters_frame, text="Estado:").grid(row=0, column=7, padx=5)
+        self.state_combo = ttk.Combobox(
+            self.filters_frame, 
+            textvariable=self.state_var,
+            values=self.reading_states + ['Todos'],
+            width=9,
+            state='readonly'
+        )
+        self.state_combo.grid(row=0, column=8, padx=5)
+        self.state_combo.bind('<<ComboboxSelected>>', lambda event: self.controller.filter_books())
+        
         # Botón de filtrar
         self.filter_btn = ttk.Button(
             self.filters_frame, 
@@ -349,7 +417,7 @@ class MainView(tk.Tk):
             command=self.controller.filter_books,
             width=15
         )
-        self.filter_btn.grid(row=0, column=7, padx=5)
+        self.filter_btn.grid(row=0, column=9, padx=5)
         
         # Botón de limpiar filtros
         self.clear_filter_btn = ttk.Button(
@@ -358,7 +426,46 @@ class MainView(tk.Tk):
             command=self.controller.clear_filters,
             width=15
         )
-        self.clear_filter_btn.grid(row=0, column=8, padx=5)
+        self.clear_filter_btn.grid(row=0, column=10, padx=5)
+        
+        # Progreso de la carga de la tabla
+        self.load_status = ttk.Label(self.filters_frame, text="")
+        self.load_status.grid(row=0, column=11, padx=5)
+        
+        # Filtro por etiquetas, separadas por comas (todas o alguna)
+        self.tags_var = tk.StringVar()
+        ttk.Label(self.filters_frame, text="Etiquetas:").grid(row=1, column=1, padx=5, pady=(5, 0))
+        self.tags_combo = ttk.Combobox(
+            self.filters_frame, 
+            textvariable=self.tags_var,
+            postcommand=self._remember_tags,
+            width=40
+        )
+        self.tags_combo.grid(row=1, column=2, columnspan=5, padx=5, pady=(5, 0), sticky='we')
+        self.tags_combo.bind('<<ComboboxSelected>>', self._add_selected_tag)
+        self.tags_combo.bind('<Return>', lambda event: self.controller.filter_books())
+        
+        self.tags_mode_var = tk.StringVar(value=self.tag_modes['y'])
+        ttk.Combobox(
+            self.filters_frame, 
+            textvariable=self.tags_mode_var,
+            values=list(self.tag_modes.values()),
+            width=9,
+            state='readonly'
+        ).grid(row=1, column=7, columnspan=2, padx=5, pady=(5, 0), sticky='w')
+        self._typed_tags = ''
+        
+        # Buscador con el lenguaje de consultas (autor:borges año:2020..2023 ...)
+        self.query_var = tk.StringVar()
+        ttk.Label(self.filters_frame, text="Buscar:").grid(row=2, column=1, padx=5, pady=(5, 0))
+        query_entry = ttk.Entry(self.filters_frame, textvariable=self.query_var)
+        query_entry.grid(row=2, column=2, columnspan=7, padx=5, pady=(5, 0), sticky='we')
+        query_entry.bind('<Return>', lambda event: self.controller.filter_books())
+        ttk.Label(
+            self.filters_frame, 
+            text='autor:borges año:2020..2023 calif>=4 "texto"',
+            foreground='gray'
+        ).grid(row=2, column=9, columnspan=3, padx=5, pady=(5, 0), sticky='w')
         
         # Configurar peso de columnas
         self.filters_frame.columnconfigure(0, weight=1)
@@ -369,13 +476,18 @@ class MainView(tk.Tk):
             'anio_lectura', 'calificacion', 'paginas', 'editorial'
         ]
         
+        # La columna del árbol (#0) muestra la miniatura de la portada
+        ttk.Style().configure('Books.Treeview', rowheight=30)
         self.books_table = ttk.Treeview(
             self.books_frame,
             columns=columns,
-            show='headings',
+            show='tree headings',
             selectmode='browse',
-            height=15
+            height=15,
+            style='Books.Treeview'
         )
+        self.books_table.heading('#0', text='')
+        self.books_table.column('#0', width=34, stretch=False, anchor='center')
         
         # Configurar columnas
         column_config = {
@@ -390,8 +502,13 @@ class MainView(tk.Tk):
             'editorial': {'text': 'Editorial', 'width': 100}
         }
         
+        self.column_titles = {col: column_config[col]['text'] for col in columns}
         for col in columns:
-            self.books_table.heading(col, text=column_config[col]['text'])
+            self.books_table.heading(
+                col, 
+                text=column_config[col]['text'],
+                command=lambda c=col: self.controller.sort_books(c)
+            )
             self.books_table.column(col, width=column_config[col]['width'], 
                                  anchor=column_config[col].get('anchor', 'w'))
         
@@ -422,10 +539,18 @@ class MainView(tk.Tk):
             command=self.controller.delete_book
         )
         self.table_menu.add_separator()
+        self.table_menu.add_command(
+            label="Registrar Sesión", 
+            command=self.controller.log_session
+        )
         self.table_menu.add_command(
             label="Generar Informe", 
             command=self.controller.generate_report
         )
+        self.table_menu.add_command(
+            label="Libros Similares", 
+            command=self.controller.show_similar_books
+        )
         
         # Bindear evento de clic derecho
         self.books_table.bind('<Button-3>', self._show_table_menu)
@@ -472,6 +597,27 @@ class MainView(tk.Tk):
         )
         self.edit_user_btn.pack(side='right', padx=10)
         
+        # Selector de perfil
+        self.new_profile_btn = ttk.Button(
+            self.user_info_frame, 
+            text="➕", 
+            width=2,
+            command=self.controller.create_profile
+        )
+        self.new_profile_btn.pack(side='right')
+        
+        self.profile_var = tk.StringVar()
+        self.profile_combo = ttk.Combobox(
+            self.user_info_frame, 
+            textvariable=self.profile_var,
+            width=20,
+            state='readonly'
+        )
+        self.profile_combo.pack(side='right', padx=5)
+        self.profile_combo.bind('<<ComboboxSelected>>', self._on_profile_selected)
+        self.profile_ids = []
+        ttk.Label(self.user_info_frame, text="Perfil:").pack(side='right')
+        
         # Separador
         ttk.Separator(self.user_frame).pack(fill='x', pady=5)
         
@@ -483,6 +629,11 @@ class MainView(tk.Tk):
             ("📊 Estadísticas", self.controller.show_stats),
             ("📝 Generar Informe", self.controller.generate_report),
             ("📤 Exportar CSV", self.controller.export_to_csv),
+            ("📥 Importar CSV", self.controller.import_from_csv),
+            ("🔍 Duplicados", self.controller.show_duplicates),
+            ("🎯 Metas", self.controller.show_goals),
+            ("🧰 Mantenimiento", self.controller.show_maintenance),
+            ("🔄 Sincronizar", self.controller.sync_library),
             ("❓ Ayuda", self.controller.show_help)
         ]
         
@@ -494,6 +645,17 @@ class MainView(tk.Tk):
             )
             btn.pack(side='left', padx=5, fill='x', expand=True)
         
+    def _on_shortcut(self, event, command: Callable):
+        """Ejecuta un atajo salvo que el foco esté en un campo de texto"""
+        if not isinstance(event.widget, (tk.Entry, tk.Text, tk.Spinbox)):
+            command()
+    
+    def _on_profile_selected(self, event=None):
+        """Avisa al controlador del perfil elegido en el selector"""
+        index = self.profile_combo.current()
+        if 0 <= index < len(self.profile_ids):
+            self.controller.switch_profile(self.profile_ids[index])
+    
     def _show_table_menu(self, event):
         """Muestra el menú contextual de la tabla"""
         item = self.books_table.identify_row(event.y)
@@ -510,6 +672,7 @@ class MainView(tk.Tk):
         self.logo_frame.grid(row=0, column=0, columnspan=2, pady=(0, 20))
         self.logo_label.pack(side='left', padx=10)
         self.title_label.pack(side='left')
+        self.goal_label.pack(side='left', padx=20)
         
         # Sección 2: Nuevos libros (fila 1, columna 0)
         self.new_book_frame.grid(row=1, column=0, sticky='nsew', padx=(0, 10))
@@ -536,6 +699,16 @@ class MainView(tk.Tk):
                 data[field] = var.get()
         return data
     
+    def fill_form(self, data: Dict):
+        """Completa los campos vacíos del formulario sin pisar lo ya cargado"""
+        for field, value in data.items():
+            var = self.form_vars.get(field)
+            if var is None or field == 'comentario' or value in (None, ''):
+                continue
+            current = var.get()
+            if current in ('', 0, 0.0):
+                var.set(value)
+    
     def clear_form(self):
         """Limpia el formulario"""
         for field, var in self.form_vars.items():
@@ -545,21 +718,92 @@ class MainView(tk.Tk):
                 var.set('')
         
         # Establecer valores por defecto
+        self.form_vars['estado'].set(self.reading_states[0])
         self.form_vars['anio_lectura'].set(datetime.now().year)
         self.form_vars['calificacion'].set(3.0)
     
     def populate_books_table(self, books: List[Dict]):
-        """Llena la tabla con los libros"""
-        # Limpiar tabla
-        for item in self.books_table.get_children():
-            self.books_table.delete(item)
+        """Llena la tabla con los libros.
+        
+        El primer lote se inserta en el acto y el resto en tiempo ocioso,
+        así la ventana sigue respondiendo con bibliotecas grandes. Una
+        nueva carga cancela la que esté en curso.
+        """
+        if self._load_job:
+            self.after_cancel(self._load_job)
+            self._load_job = None
+        
+        # Limpiar tabla en una sola llamada
+        children = self.books_table.get_children()
+        if children:
+            self.books_table.delete(*children)
+        self._row_covers.clear()
+        
+        self._insert_book_batch(books, 0, self.books_table['columns'])
+    
+    def _insert_book_batch(self, books: List[Dict], start: int, columns):
+        """Inserta un lote de libros y programa el siguiente"""
+        end = min(start + self.load_batch_size, len(books))
+        for book in books[start:end]:
+            # Los libros sin leer no tienen año: None se vería como "None"
+            values = ['' if book.get(col) is None else book[col] for col in columns]
+            item = self.books_table.insert('', 'end', values=values)
+            if book.get('portada') and self.covers:
+                photo = self.covers.obtener(
+                    book['portada'], 'mini',
+                    lambda photo, item=item: self._set_row_cover(item, photo)
+                )
+                if photo:
+                    self._set_row_cover(item, photo)
         
-        # Agregar libros
-        for book in books:
-            values = [book.get(col, '') for col in self.books_table['columns']]
-            self.books_table.insert('', 'end', values=values)
+        if end < len(books):
+            self.load_status.config(text=f"Cargando {end}/{len(books)}...")
+            self._load_job = self.after_idle(self._insert_book_batch, books, end, columns)
+        else:
+            self._load_job = None
+            self._load_summary = f"{len(books)} libros"
+            self.load_status.config(text=self._load_summary)
+    
+    def _set_row_cover(self, item: str, photo):
+        """Muestra la miniatura en una fila si todavía existe"""
+        if self.books_table.exists(item):
+            self.books_table.item(item, image=photo)
+            # Mantener referencia mientras la fila la muestre
+            self._row_covers[item] = photo
+    
+    def set_cover_cache(self, covers):
+        """Asigna la caché de portadas que usa la interfaz"""
+        self.covers = covers
+        covers.iniciar(self)
+    
+    def _choose_cover(self, var: tk.StringVar):
+        """Elige un archivo de imagen para la portada"""
+        file_path = filedialog.askopenfilename(
+            filetypes=[('Imágenes', '*.png *.gif *.jpg *.jpeg'), ('Todos', '*.*')]
+        )
+        if file_path:
+            var.set(file_path)
+    
+    def populate_profiles(self, profiles: List[Dict], active_id: int):
+        """Llena el selector de perfiles y marca el activo"""
+        self.profile_ids = [profile['id'] for profile in profiles]
+        self.profile_combo['values'] = [profile['nombre'] for profile in profiles]
+        if active_id in self.profile_ids:
+            self.profile_combo.current(self.profile_ids.index(active_id))
+    
+    def _remember_tags(self):
+        """Guarda las etiquetas escritas antes de abrir la lista"""
+        self._typed_tags = self.tags_var.get()
     
-    def populate_filters(self, years: List[int], genres: List[str]):
+    def _add_selected_tag(self, event=None):
+        """Suma la etiqueta elegida en la lista a las ya escritas"""
+        tags = [tag.strip() for tag in self._typed_tags.split(',') if tag.strip()]
+        chosen = self.tags_var.get()
+        if chosen not in tags:
+            tags.append(chosen)
+        self.tags_var.set(', '.join(tags))
+    
+    def populate_filters(self, years: List[int], genres: List[str], tags: Optional[List[str]] = None):
         """Llena los combobox de filtros"""
         self.year_combo['values'] = ['Todos'] + sorted(years, reverse=True)
         self.year_combo.current(0)
@@ -569,6 +813,39 @@ class MainView(tk.Tk):
         
         self.rating_combo['values'] = ['Todas'] + [str(i) for i in range(1, 6)]
         self.rating_combo.current(0)
+        
+        self.tags_combo['values'] = tags or []
+    
+    def set_filters(self, filters: Dict):
+        """Muestra en los combobox los filtros dados"""
+        self.year_var.set(filters.get('anio_lectura', 'Todos'))
+        self.genre_var.set(filters.get('genero', 'Todos'))
+        rating = filters.get('calificacion_min')
+        self.rating_var.set(str(int(rating)) if rating else 'Todas')
+        self.state_var.set(filters.get('estado', 'Todos'))
+        self.tags_var.set(', '.join(filters.get('tags', ())))
+        self.tags_mode_var.set(self.tag_modes[filters.get('tags_modo', 'y')])
+        self.query_var.set(filters.get('consulta', ''))
+    
+    def apply_preferences(self, prefs):
+        """Restaura el estado de la interfaz guardado en las preferencias"""
+        self.load_batch_size = max(1, prefs.tamanio_pagina)
+        if prefs.geometria:
+            self.geometry(prefs.geometria)
+        for col, width in prefs.anchos_columnas.items():
+            if col in self.column_titles:
+                self.books_table.column(col, width=width)
+        self.show_sort_indicator(prefs.orden, prefs.orden_desc)
+    
+    def get_column_widths(self) -> Dict[str, int]:
+        """Retorna el ancho actual de cada columna de la tabla"""
+        return {col: int(self.books_table.column(col, 'width')) for col in self.column_titles}
+    
+    def show_sort_indicator(self, column: Optional[str], desc: bool):
+        """Marca con una flecha la columna por la que está ordenada la tabla"""
+        for col, text in self.column_titles.items():
+            arrow = (' ▼' if desc else ' ▲') if col == column else ''
+            self.books_table.heading(col, text=text + arrow)
     
     def get_selected_book_id(self) -> Optional[int]:
         """Obtiene el ID del libro seleccionado en la tabla"""
@@ -594,6 +871,20 @@ class MainView(tk.Tk):
         if rating and rating != 'Todas':
             filters['calificacion_min'] = int(rating)
         
+        state = self.state_var.get()
+        if state in self.reading_states:
+            filters['estado'] = state
+        
+        tags = [tag.strip() for tag in self.tags_var.get().split(',') if tag.strip()]
+        if tags:
+            filters['tags'] = tags
+            if self.tags_mode_var.get() == self.tag_modes['o']:
+                filters['tags_modo'] = 'o'
+        
+        query = self.query_var.get().strip()
+        if query:
+            filters['consulta'] = query
+        
         return filters
     
     def show_book_details(self, book: Dict):
@@ -606,6 +897,20 @@ class MainView(tk.Tk):
         frame = ttk.Frame(detail_window, padding=10)
         frame.pack(fill='both', expand=True)
         
+        # Portada (se completa cuando la miniatura está lista)
+        if book.get('portada') and self.covers:
+            cover_label = ttk.Label(frame, text="🖼️")
+            cover_label.pack(side='right', anchor='n', padx=(10, 0))
+            
+            def show_cover(photo):
+                if cover_label.winfo_exists():
+                    cover_label.config(image=photo, text='')
+                    cover_label.image = photo  # Mantener referencia
+            
+            photo = self.covers.obtener(book['portada'], 'detalle', show_cover)
+            if photo:
+                show_cover(photo)
+        
         # Título
         ttk.Label(
             frame, 
@@ -630,11 +935,15 @@ class MainView(tk.Tk):
         details_frame = ttk.Frame(frame)
         details_frame.pack(fill='x', pady=10)
         
-        ttk.Label(details_frame, text=f"Año: {book.get('anio_lectura', '')}").grid(row=0, column=0, sticky='w')
+        ttk.Label(details_frame, text=f"Año: {book.get('anio_lectura') or ''}").grid(row=0, column=0, sticky='w')
         ttk.Label(details_frame, text=f"Páginas: {book.get('paginas', '')}").grid(row=0, column=1, sticky='w', padx=10)
         ttk.Label(details_frame, text=f"Editorial: {book.get('editorial', '')}").grid(row=0, column=2, sticky='w')
         
         ttk.Label(details_frame, text=f"Calificación: {book.get('calificacion', '')}/5").grid(row=1, column=0, sticky='w', pady=(5, 0))
+        if book.get('tags'):
+            ttk.Label(details_frame, text=f"Etiquetas: {', '.join(book['tags'])}").grid(
+                row=1, column=1, columnspan=2, sticky='w', padx=10, pady=(5, 0)
+            )
         
         # Comentario
         ttk.Label(frame, text="Comentario:", font=self.style.fonts['subtitle']).pack(anchor='w', pady=(10, 0))
@@ -715,12 +1024,16 @@ class MainView(tk.Tk):
         fields = [
             ('titulo', 'Título:', book_data.get('titulo', '')),
             ('autor', 'Autor:', book_data.get('autor', '')),
+            ('estado', 'Estado:', book_data.get('estado') or self.reading_states[0]),
             ('genero', 'Género:', book_data.get('genero', '')),
             ('subgenero', 'Subgénero:', book_data.get('subgenero', '')),
             ('anio_lectura', 'Año de lectura:', book_data.get('anio_lectura', datetime.now().year)),
             ('calificacion', 'Calificación (1-5):', book_data.get('calificacion', 3)),
             ('paginas', 'Páginas:', book_data.get('paginas', '')),
             ('editorial', 'Editorial:', book_data.get('editorial', '')),
+            ('tags', 'Etiquetas:', book_data.get('tags', '')),
+            ('portada', 'Portada:', book_data.get('portada') or ''),
+            ('isbn', 'ISBN:', book_data.get('isbn') or ''),
             ('comentario', 'Comentario:', book_data.get('comentario', ''))
         ]
         
@@ -780,6 +1093,27 @@ class MainView(tk.Tk):
                 combo.grid(row=i, column=1, padx=5, pady=2, sticky='we')
                 self.edit_vars[field] = var
                 
+            elif field == 'portada':
+                var = tk.StringVar(value=value)
+                ttk.Entry(frame, textvariable=var).grid(row=i, column=1, padx=5, pady=2, sticky='we')
+                ttk.Button(
+                    frame, 
+                    text="...", 
+                    width=3,
+                    command=lambda v=var: self._choose_cover(v)
+                ).grid(row=i, column=2, sticky='w')
+                self.edit_vars[field] = var
+                
+            elif field == 'estado':
+                var = tk.StringVar(value=value)
+                ttk.Combobox(
+                    frame, 
+                    textvariable=var, 
+                    values=self.reading_states,
+                    state='readonly'
+                ).grid(row=i, column=1, padx=5, pady=2, sticky='we')
+                self.edit_vars[field] = var
+                
             elif field == 'calificacion':
                 var = tk.DoubleVar(value=value)
                 spin = tk.Spinbox(
@@ -839,11 +1173,240 @@ class MainView(tk.Tk):
         self.controller.update_book(book_id, data)
         dialog.destroy()
     
-    def show_stats(self, stats: Dict):
-        """Muestra las estadísticas en una ventana emergente"""
+    def show_session_dialog(self, book_id: int):
+        """Muestra el diálogo para registrar una sesión de lectura"""
+        dialog = tk.Toplevel(self)
+        dialog.title("Registrar Sesión")
+        dialog.geometry("400x200")
+        
+        # Frame principal
+        frame = ttk.Frame(dialog, padding=10)
+        frame.pack(fill='both', expand=True)
+        
+        now = datetime.now().replace(second=0, microsecond=0)
+        fields = [
+            ('inicio', 'Inicio (AAAA-MM-DD HH:MM):', now.isoformat(sep=' ', timespec='minutes')),
+            ('fin', 'Fin (AAAA-MM-DD HH:MM):', now.isoformat(sep=' ', timespec='minutes')),
+            ('paginas', 'Páginas leídas:', '')
+        ]
+        
+        session_vars = {}
+        for i, (field, label, value) in enumerate(fields):
+            ttk.Label(frame, text=label).grid(row=i, column=0, sticky='e', pady=5)
+            var = tk.StringVar(value=value)
+            ttk.Entry(frame, textvariable=var).grid(row=i, column=1, sticky='we', pady=5)
+            session_vars[field] = var
+        
+        def save():
+            self.controller.add_session(
+                book_id, {field: var.get() for field, var in session_vars.items()}
+            )
+            dialog.destroy()
+        
+        # Botones
+        btn_frame = ttk.Frame(frame)
+        btn_frame.grid(row=len(fields), column=0, columnspan=2, pady=10)
+        
+        ttk.Button(btn_frame, text="Guardar", command=save).pack(side='left', padx=5)
+        ttk.Button(btn_frame, text="Cancelar", command=dialog.destroy).pack(side='left', padx=5)
+        
+        # Configurar peso de columnas
+        frame.columnconfigure(1, weight=1)
+    
+    @staticmethod
+    def _format_goal(name: str, goal: Optional[Dict]) -> str:
+        """Texto corto con el avance de una meta"""
+        if not goal:
+            return ''
+        return f"{goal['actual']}/{goal['meta']} {name}"
+    
+    def update_goal_progress(self, progress: Optional[Dict]):
+        """Muestra en el encabezado el avance de la meta anual"""
+        if not progress:
+            self.goal_label.config(text="")
+            return
+        
+        parts = [self._format_goal('libros', progress['libros']),
+                 self._format_goal('págs.', progress['paginas'])]
+        text = f"🎯 {progress['anio']}: " + ' · '.join(part for part in parts if part)
+        if any(goal and goal['atrasado'] for goal in (progress['libros'], progress['paginas'])):
+            text += "  ⚠️ a este ritmo no llegás"
+        self.goal_label.config(text=text)
+    
+    def show_goals_dialog(self, year: int, goal: Dict, progress: Optional[Dict]):
+        """Muestra el diálogo para fijar la meta anual y su proyección"""
+        dialog = tk.Toplevel(self)
+        dialog.title(f"Metas {year}")
+        dialog.geometry("420x300")
+        
+        # Frame principal
+        frame = ttk.Frame(dialog, padding=10)
+        frame.pack(fill='both', expand=True)
+        
+        fields = [
+            ('libros', 'Libros en el año:'),
+            ('paginas', 'Páginas en el año:')
+        ]
+        
+        goal_vars = {}
+        for i, (field, label) in enumerate(fields):
+            ttk.Label(frame, text=label).grid(row=i, column=0, sticky='e', pady=5)
+            var = tk.StringVar(value=str(goal.get(field) or ''))
+            ttk.Entry(frame, textvariable=var).grid(row=i, column=1, sticky='we', pady=5)
+            goal_vars[field] = var
+        
+        # Proyección de cada meta
+        row = len(fields)
+        for field, name in (('libros', 'Libros'), ('paginas', 'Páginas')):
+            info = (progress or {}).get(field)
+            if not info:
+                continue
+            estimate = info['fecha_estimada'] or 'sin ritmo reciente'
+            ttk.Label(
+                frame, 
+                text=f"{name}: {info['actual']} de {info['meta']} (esperado hoy {info['esperado']:.0f}), "
+                     f"proyección {info['proyeccion']:.0f}, llegada: {estimate}",
+                wraplength=380
+            ).grid(row=row, column=0, columnspan=2, sticky='w', pady=(5, 0))
+            row += 1
+        
+        def save():
+            self.controller.save_goals(year, {field: var.get() for field, var in goal_vars.items()})
+            dialog.destroy()
+        
+        # Botones
+        btn_frame = ttk.Frame(frame)
+        btn_frame.grid(row=row, column=0, columnspan=2, pady=10)
+        
+        ttk.Button(btn_frame, text="Guardar", command=save).pack(side='left', padx=5)
+        ttk.Button(btn_frame, text="Cancelar", command=dialog.destroy).pack(side='left', padx=5)
+        
+        # Configurar peso de columnas
+        frame.columnconfigure(1, weight=1)
+    
+    def _draw_heatmap(self, parent, heatmap: Dict[str, int]):
+        """Dibuja un mapa de calor de páginas leídas por día (una fila por año)"""
+        cell = 9
+        years = sorted({int(day[:4]) for day in heatmap}, reverse=True)
+        canvas = tk.Canvas(
+            parent,
+            width=54 * cell + 40,
+            height=len(years) * 8 * cell,
+            background=self.style.colors['card'],
+            highlightthickness=0
+        )
+        
+        max_pages = max(heatmap.values()) or 1
+        palette = ['#FFF5E1', '#FBD3C0', '#F8B195', '#F67280', '#C06C84']
+        
+        rows = {year: row for row, year in enumerate(years)}
+        for year, row in rows.items():
+            canvas.create_text(2, row * 8 * cell + 3 * cell, text=str(year), anchor='w', font=self.style.fonts['small'])
+        
+        for day, pages in heatmap.items():
+            date = datetime.strptime(day, '%Y-%m-%d')
+            week = int(date.strftime('%U'))
+            weekday = int(date.strftime('%w'))
+            level = min(len(palette) - 1, 1 + int(pages / max_pages * (len(palette) - 2))) if pages else 0
+            x = 40 + week * cell
+            y = rows[date.year] * 8 * cell + weekday * cell
+            canvas.create_rectangle(
+                x, y, x + cell - 1, y + cell - 1,
+                fill=palette[level], outline=''
+            )
+        
+        return canvas
+    
+    def _draw_bar_chart(self, parent, title: str, series: List[Tuple], width: int = 360,
+                        height: int = 170, label_every: int = 1, color: Optional[str] = None):
+        """Dibuja un gráfico de barras a partir de una serie [(etiqueta, valor), ...]"""
+        canvas = tk.Canvas(
+            parent,
+            width=width,
+            height=height,
+            background=self.style.colors['card'],
+            highlightthickness=0
+        )
+        canvas.create_text(6, 4, text=title, anchor='nw', font=self.style.fonts['body'])
+        if not series:
+            canvas.create_text(width / 2, height / 2, text="Sin datos", font=self.style.fonts['small'])
+            return canvas
+        
+        top, bottom, left, right = 24, height - 18, 28, width - 8
+        max_value = max(value for _, value in series) or 1
+        slot = (right - left) / len(series)
+        bar = max(1, slot * 0.75)
+        
+        canvas.create_line(left, bottom, right, bottom, fill=self.style.colors['text'])
+        canvas.create_text(left - 4, top, text=str(max_value), anchor='e', font=self.style.fonts['small'])
+        canvas.create_text(left - 4, bottom, text='0', anchor='e', font=self.style.fonts['small'])
+        
+        for i, (label, value) in enumerate(series):
+            x = left + i * slot + (slot - bar) / 2
+            y = bottom - (bottom - top) * value / max_value
+            if value:
+                canvas.create_rectangle(
+                    x, y, x + bar, bottom,
+                    fill=color or self.style.colors['secondary'], outline=''
+                )
+            if i % label_every == 0:
+                canvas.create_text(
+                    x + bar / 2, bottom + 2, text=str(label), anchor='n', font=self.style.fonts['small']
+                )
+        
+        return canvas
+    
+    def _draw_genre_chart(self, parent, shares: List[Tuple], width: int = 360,
+                          height: int = 170, max_slices: int = 6):
+        """Dibuja el reparto de géneros como torta con leyenda"""
+        canvas = tk.Canvas(
+            parent,
+            width=width,
+            height=height,
+            background=self.style.colors['card'],
+            highlightthickness=0
+        )
+        canvas.create_text(6, 4, text="Reparto de géneros", anchor='nw', font=self.style.fonts['body'])
+        total = sum(count for _, count in shares)
+        if not total:
+            canvas.create_text(width / 2, height / 2, text="Sin datos", font=self.style.fonts['small'])
+            return canvas
+        
+        # Los géneros menos leídos se agrupan en "Otros"
+        slices = list(shares[:max_slices])
+        rest = sum(count for _, count in shares[max_slices:])
+        if rest:
+            slices.append(('Otros', rest))
+        
+        palette = ['#F8B195', '#F67280', '#C06C84', '#6C5B7B', '#A8E6CF', '#FFD3B6', '#DCE2F1']
+        size = height - 34
+        start = 90.0
+        for i, (genre, count) in enumerate(slices):
+            extent = 360.0 * count / total
+            color = palette[i % len(palette)]
+            canvas.create_arc(
+                10, 26, 10 + size, 26 + size,
+                start=start, extent=-min(extent, 359.9), fill=color, outline=self.style.colors['card']
+            )
+            start -= extent
+            
+            y = 30 + i * 18
+            canvas.create_rectangle(size + 24, y, size + 34, y + 10, fill=color, outline='')
+            canvas.create_text(
+                size + 40, y + 5, anchor='w', font=self.style.fonts['small'],
+                text=f"{genre} ({count * 100 / total:.0f}%)"
+            )
+        
+        return canvas
+    
+    def show_stats(self, stats: Dict, heatmap: Optional[Dict[str, int]] = None):
+        """Muestra las estadísticas con gráficos en una ventana emergente.
+        
+        Las series llegan ya calculadas; acá solo se dibujan.
+        """
         stats_window = tk.Toplevel(self)
         stats_window.title("Estadísticas de Lectura")
-        stats_window.geometry("500x400")
+        stats_window.geometry("780x700")
         
         # Frame principal
         frame = ttk.Frame(stats_window, padding=10)
@@ -856,48 +1419,224 @@ class MainView(tk.Tk):
             font=self.style.fonts['title']
         ).pack(pady=(0, 10))
         
-        # Total de libros
+        # Resumen
+        by_state = stats.get('libros_por_estado', {})
         ttk.Label(
             frame, 
-            text=f"📚 Total de libros leídos: {stats.get('total_libros', 0)}",
+            text=f"📚 Total de libros leídos: {stats.get('total_libros', 0)}   "
+                 f"⭐ Promedio de calificación: {stats.get('promedio_calificacion', 0):.1f}/5",
             font=self.style.fonts['subtitle']
         ).pack(anchor='w', pady=5)
-        
-        # Libros por año
         ttk.Label(
             frame, 
-            text="📅 Libros por año:",
-            font=self.style.fonts['subtitle']
-        ).pack(anchor='w', pady=(10, 0))
+            text=f"📖 Leyendo: {by_state.get('leyendo', 0)}   🔖 Por leer: {by_state.get('por leer', 0)}"
+        ).pack(anchor='w')
+        
+        # Gráficos
+        charts = ttk.Frame(frame)
+        charts.pack(anchor='w', pady=(10, 0))
+        
+        months = [(period[5:], count) for period, count in stats.get('libros_por_mes', [])]
+        self._draw_bar_chart(
+            charts, "📅 Libros por mes", months, label_every=3
+        ).grid(row=0, column=0, padx=(0, 10), pady=(0, 10))
+        
+        years = sorted(stats.get('libros_por_anio', []))[-12:]
+        self._draw_bar_chart(
+            charts, "📆 Libros por año", [(str(year), count) for year, count in years],
+            color=self.style.colors['accent']
+        ).grid(row=0, column=1, pady=(0, 10))
+        
+        ratings = [
+            (f"{rating:g}" if rating == int(rating) else '', count)
+            for rating, count in stats.get('histograma_calificacion', [])
+        ]
+        self._draw_bar_chart(
+            charts, "⭐ Calificaciones", ratings, color=self.style.colors['primary']
+        ).grid(row=1, column=0, padx=(0, 10))
         
-        books_per_year = stats.get('libros_por_anio', [])
-        for year, count in books_per_year:
-            ttk.Label(frame, text=f"  {year}: {count} libros").pack(anchor='w')
+        self._draw_genre_chart(charts, stats.get('reparto_generos', [])).grid(row=1, column=1)
+        
+        # Mapa de calor de sesiones de lectura
+        if heatmap:
+            ttk.Label(
+                frame, 
+                text="🔥 Páginas leídas por día:",
+                font=self.style.fonts['subtitle']
+            ).pack(anchor='w', pady=(10, 0))
+            self._draw_heatmap(frame, heatmap).pack(anchor='w', pady=5)
+        
+        # Botón de cerrar
+        ttk.Button(
+            frame, 
+            text="Cerrar", 
+            command=stats_window.destroy
+        ).pack(pady=(10, 0))
+    
+    def set_status(self, text: str):
+        """Muestra un texto breve de estado junto a los filtros (vacío restaura el conteo)"""
+        self.load_status.config(text=text or self._load_summary)
+    
+    def show_duplicates(self, groups: List[List[Dict]]):
+        """Muestra los grupos de libros duplicados en una ventana emergente"""
+        dup_window = tk.Toplevel(self)
+        dup_window.title("Libros Duplicados")
+        dup_window.geometry("600x400")
+        
+        # Frame principal
+        frame = ttk.Frame(dup_window, padding=10)
+        frame.pack(fill='both', expand=True)
         
-        # Promedio de calificación
         ttk.Label(
             frame, 
-            text=f"⭐ Promedio de calificación: {stats.get('promedio_calificacion', 0):.1f}/5",
+            text=f"Grupos de posibles duplicados: {len(groups)}", 
             font=self.style.fonts['subtitle']
-        ).pack(anchor='w', pady=(10, 0))
+        ).pack(anchor='w', pady=(0, 10))
+        
+        # Árbol con un nodo por grupo y sus libros como hijos
+        tree = ttk.Treeview(
+            frame,
+            columns=['id', 'autor', 'anio_lectura'],
+            show='tree headings',
+            height=12
+        )
+        tree.heading('#0', text='Título')
+        tree.heading('id', text='ID')
+        tree.heading('autor', text='Autor')
+        tree.heading('anio_lectura', text='Año')
+        tree.column('id', width=40, anchor='center')
+        tree.column('anio_lectura', width=50, anchor='center')
+        
+        for i, group in enumerate(groups, start=1):
+            node = tree.insert('', 'end', text=f"Grupo {i} ({len(group)} libros)", open=True)
+            for book in group:
+                tree.insert(node, 'end', text=book.get('titulo', ''), values=[
+                    '' if book.get(col) is None else book[col] for col in ('id', 'autor', 'anio_lectura')
+                ])
+        
+        tree.pack(fill='both', expand=True)
+        
+        # Botón de cerrar
+        ttk.Button(
+            frame, 
+            text="Cerrar", 
+            command=dup_window.destroy
+        ).pack(pady=(10, 0))
+    
+    def show_similar_books(self, title: str, books: List[Dict]):
+        """Muestra los libros más parecidos al seleccionado"""
+        similar_window = tk.Toplevel(self)
+        similar_window.title("Libros Similares")
+        similar_window.geometry("550x350")
+        
+        # Frame principal
+        frame = ttk.Frame(similar_window, padding=10)
+        frame.pack(fill='both', expand=True)
         
-        # Géneros más leídos
         ttk.Label(
             frame, 
-            text="Géneros más leídos:",
+            text=f"Parecidos a «{title}»", 
             font=self.style.fonts['subtitle']
-        ).pack(anchor='w', pady=(10, 0))
+        ).pack(anchor='w', pady=(0, 10))
+        
+        tree = ttk.Treeview(
+            frame,
+            columns=['id', 'autor', 'similitud'],
+            show='tree headings',
+            height=10
+        )
+        tree.heading('#0', text='Título')
+        tree.heading('id', text='ID')
+        tree.heading('autor', text='Autor')
+        tree.heading('similitud', text='Similitud')
+        tree.column('id', width=40, anchor='center')
+        tree.column('similitud', width=70, anchor='center')
+        
+        for book in books:
+            tree.insert('', 'end', text=book.get('titulo', ''), values=[
+                book.get('id', ''), book.get('autor', ''), f"{book.get('similitud', 0) * 100:.0f}%"
+            ])
         
-        popular_genres = stats.get('generos_populares', [])
-        for genre, count in popular_genres:
-            ttk.Label(frame, text=f"  {genre}: {count} libros").pack(anchor='w')
+        tree.pack(fill='both', expand=True)
         
         # Botón de cerrar
         ttk.Button(
             frame, 
             text="Cerrar", 
-            command=stats_window.destroy
-        ).pack(pady=(20, 0))
+            command=similar_window.destroy
+        ).pack(pady=(10, 0))
+    
+    def show_maintenance(self, report: Dict):
+        """Muestra el informe de la base y las acciones de mantenimiento"""
+        maint_window = tk.Toplevel(self)
+        maint_window.title("Mantenimiento de la Base")
+        maint_window.geometry("640x460")
+        
+        # Frame principal
+        frame = ttk.Frame(maint_window, padding=10)
+        frame.pack(fill='both', expand=True)
+        
+        ttk.Label(
+            frame, 
+            text="Estado de la Base de Datos", 
+            font=self.style.fonts['title']
+        ).pack(pady=(0, 10))
+        
+        lines = [
+            f"📁 Archivo: {report.get('archivo', '')}",
+            f"💾 Tamaño: {report.get('tamanio_bytes', 0) / 1024:.0f} KB",
+            f"📄 Páginas: {report.get('paginas', 0)} ({report.get('paginas_libres', 0)} libres)",
+            f"🧩 Fragmentación: {report.get('fragmentacion', 0) * 100:.1f}%",
+            f"🕑 Último respaldo: {report.get('ultimo_respaldo') or 'nunca'}",
+            f"🕑 Última compactación: {report.get('ultima_compactacion') or 'nunca'}"
+        ]
+        if 'catalogo' in report:
+            lines.append(f"📚 Catálogo ISBN: {report['catalogo']} ediciones")
+        if report.get('bibliotecas'):
+            lines.append(f"🗂️ Bibliotecas adjuntas: {', '.join(report['bibliotecas'])}")
+        cache = report.get('cache_consultas')
+        if cache:
+            lines.append(
+                f"⚡ Caché de consultas: {cache['entradas']} consultas, {cache['filas']} filas, "
+                f"{cache['tasa_aciertos'] * 100:.0f}% aciertos"
+            )
+        for line in lines:
+            ttk.Label(frame, text=line).pack(anchor='w')
+        
+        tables = report.get('tablas', {})
+        if tables:
+            ttk.Label(
+                frame, 
+                text="Tamaño por tabla:",
+                font=self.style.fonts['subtitle']
+            ).pack(anchor='w', pady=(10, 0))
+            for name, info in list(tables.items())[:6]:
+                ttk.Label(frame, text=f"  {name}: {info['bytes'] / 1024:.0f} KB").pack(anchor='w')
+        
+        # Estado de la última acción
+        self.maintenance_status = ttk.Label(frame, text="")
+        self.maintenance_status.pack(anchor='w', pady=(10, 0))
+        
+        # Botones
+        btn_frame = ttk.Frame(frame)
+        btn_frame.pack(pady=(10, 0))
+        
+        ttk.Button(btn_frame, text="Respaldar...", command=self.controller.backup_database).pack(side='left', padx=5)
+        ttk.Button(btn_frame, text="Compactar", command=self.controller.compact_database).pack(side='left', padx=5)
+        ttk.Button(btn_frame, text="Importar catálogo...", command=self.controller.import_catalogue).pack(side='left', padx=5)
+        ttk.Button(btn_frame, text="Completar por ISBN", command=self.controller.enrich_library).pack(side='left', padx=5)
+        ttk.Button(btn_frame, text="Cerrar", command=maint_window.destroy).pack(side='left', padx=5)
+        
+        libraries_frame = ttk.Frame(frame)
+        libraries_frame.pack(pady=(5, 0))
+        ttk.Button(libraries_frame, text="Adjuntar biblioteca...", command=self.controller.attach_library).pack(side='left', padx=5)
+        ttk.Button(libraries_frame, text="Estadísticas combinadas", command=self.controller.show_combined_stats).pack(side='left', padx=5)
+    
+    def update_maintenance_status(self, text: str):
+        """Actualiza el texto de estado de la ventana de mantenimiento"""
+        status = getattr(self, 'maintenance_status', None)
+        if status is not None and status.winfo_exists():
+            status.config(text=text)
     
     def show_message(self, title: str, message: str, type: str = 'info'):
         """Muestra un mensaje al usuario"""
@@ -912,14 +1651,25 @@ class MainView(tk.Tk):
         """Pide confirmación al usuario"""
         return messagebox.askyesno(title, message)
     
-    def get_save_path(self, default_name: str) -> Optional[str]:
+    def ask_text(self, title: str, prompt: str) -> Optional[str]:
+        """Pide un texto al usuario"""
+        return simpledialog.askstring(title, prompt, parent=self)
+    
+    def get_save_path(self, default_name: str, extension: str = '.csv',
+                      filetypes: Optional[List] = None,
+                      confirm_overwrite: bool = True) -> Optional[str]:
         """Obtiene una ruta para guardar archivo"""
         return filedialog.asksaveasfilename(
-            defaultextension='.csv',
+            defaultextension=extension,
             initialfile=default_name,
-            filetypes=[('CSV Files', '*.csv')]
+            filetypes=filetypes or [('CSV Files', '*.csv')],
+            confirmoverwrite=confirm_overwrite
         )
     
+    def get_open_path(self, filetypes: Optional[List] = None) -> Optional[str]:
+        """Obtiene la ruta de un archivo a abrir"""
+        return filedialog.askopenfilename(filetypes=filetypes or [('Todos', '*.*')])
+    
     def update_user_info(self, user_data: Dict):
         """Actualiza la información del usuario en la interfaz"""
         self.user_name.config(text=user_data.get('nombre', ''))
@@ -927,12 +1677,19 @@ class MainView(tk.Tk):
         
         # Actualizar foto si existe
         avatar = user_data.get('avatar', '')
-        if avatar and os.path.exists(avatar):
+        self.user_photo.config(image='', text="👤")
+        if avatar and self.covers:
+            # Reutiliza la imagen ya decodificada en lugar de leer el archivo cada vez
+            photo = self.covers.obtener(avatar, 'avatar', self._set_user_photo)
+            if photo:
+                self._set_user_photo(photo)
+        elif avatar and os.path.exists(avatar):
             try:
-                photo = PhotoImage(file=avatar)
-                self.user_photo.config(image=photo)
-                self.user_photo.image = photo  # Mantener referencia
+                self._set_user_photo(PhotoImage(file=avatar))
             except:
-                self.user_photo.config(text="👤")
-        else:
-            self.user_photo.config(text="👤")
\ No newline at end of file
+                pass
+    
+    def _set_user_photo(self, photo):
+        """Muestra la foto del usuario"""
+        self.user_photo.config(image=photo, text='')
+        self.user_photo.image = photo  # Mantener referencia
\ No newline at end of file